@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+截圖後端效能比較
+比較各截圖後端的全螢幕與區域截圖耗時
+
+Linux 無實體螢幕時可在 Xvfb 下執行，例如：
+    Xvfb :99 -screen 0 3840x2160x24 &
+    DISPLAY=:99 python benchmark_capture.py --iterations 50
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from src.image_recognition import CAPTURE_BACKENDS
+
+def measure(backend, region, iterations: int) -> dict:
+    """重複截圖並統計耗時（毫秒）"""
+    backend.grab(region)  # 預熱
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        backend.grab(region)
+        durations.append((time.perf_counter() - start) * 1000)
+
+    durations.sort()
+    return {
+        'mean': statistics.mean(durations),
+        'median': statistics.median(durations),
+        'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    }
+
+def main():
+    """主函數"""
+    parser = argparse.ArgumentParser(description="比較截圖後端效能")
+    parser.add_argument("--iterations", type=int, default=30, help="每項測試的截圖次數")
+    parser.add_argument("--region", type=int, nargs=4, metavar=("LEFT", "TOP", "WIDTH", "HEIGHT"),
+                        help="區域截圖範圍，預設為螢幕右下角 400x300")
+    parser.add_argument("--backends", nargs="+", default=list(CAPTURE_BACKENDS.keys()),
+                        help="要比較的後端名稱")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("截圖後端效能比較")
+    print("=" * 60)
+
+    for name in args.backends:
+        backend_class = CAPTURE_BACKENDS.get(name)
+        if backend_class is None:
+            print(f"⚠️ 未知的截圖後端: {name}")
+            continue
+
+        try:
+            backend = backend_class()
+        except Exception as e:
+            print(f"⚠️ 無法建立截圖後端 {name}: {e}")
+            continue
+
+        width, height = backend.screen_size()
+        region = tuple(args.region) if args.region else (width - 400, height - 300, 400, 300)
+
+        print(f"\n📷 {name} ({width}x{height})")
+        for label, target in (("全螢幕", None), (f"區域 {region}", region)):
+            result = measure(backend, target, args.iterations)
+            print(f"  {label}: 平均 {result['mean']:.2f} ms, "
+                  f"中位數 {result['median']:.2f} ms, P95 {result['p95']:.2f} ms")
+
+        backend.close()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
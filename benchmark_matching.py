@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+模板匹配效能比較
+在 1080p、1440p 與 4K 的合成畫面上比較：
+    - pyautogui.locate（原本的匹配方式，未安裝 pyautogui 時略過）
+    - 原尺寸 TM_CCOEFF_NORMED（PYRAMID_MATCH_ENABLED = False）
+    - 由粗到細匹配（先在縮小的金字塔層找候選位置，達到閾值即提前結束）
+
+用法：
+    python benchmark_matching.py --iterations 20
+    python benchmark_matching.py --template assets/send_button.png --absent
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition
+
+try:
+    import pyautogui
+except ImportError:
+    pyautogui = None
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4K": (3840, 2160),
+}
+
+def make_frame(template: np.ndarray, size, absent: bool) -> np.ndarray:
+    """建立深色背景加雜訊的合成畫面，按鈕貼在右下方聊天面板附近"""
+    width, height = size
+    rng = np.random.default_rng(0)
+    frame = np.full((height, width, 3), 30, dtype=np.uint8)
+    frame += rng.integers(0, 20, frame.shape, dtype=np.uint8)
+    if not absent:
+        top, left = height - 137, width - 413
+        frame[top:top + template.shape[0], left:left + template.shape[1]] = template
+    return frame
+
+def measure(func, iterations: int) -> dict:
+    """重複執行並統計耗時（毫秒）與結果"""
+    result = func()  # 預熱
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    durations.sort()
+    return {
+        'mean': statistics.mean(durations),
+        'median': statistics.median(durations),
+        'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        'result': result
+    }
+
+def main():
+    """主函數"""
+    parser = argparse.ArgumentParser(description="比較模板匹配效能")
+    parser.add_argument("--iterations", type=int, default=10, help="每項測試的匹配次數")
+    parser.add_argument("--template", type=Path, default=config.STOP_BUTTON_IMAGE, help="模板圖像")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS.keys()),
+                        choices=list(RESOLUTIONS.keys()), help="要測試的解析度")
+    parser.add_argument("--absent", action="store_true", help="畫面中不放按鈕（測試找不到時的耗時）")
+    args = parser.parse_args()
+
+    # 使用獨立的辨識器：學習到的 ROI 寫入暫存檔，不影響本機快取
+    roi_file = Path(tempfile.mkdtemp(prefix="benchmark_")) / "learned_rois.json"
+    recognizer = ImageRecognition(learned_roi_file=roi_file)
+    handle = recognizer.templates.resolve(args.template)
+    if handle is None:
+        print(f"❌ 模板圖像不存在: {args.template}")
+        return 1
+    confidence = config.IMAGE_CONFIDENCE
+    pyramid_enabled = config.PYRAMID_MATCH_ENABLED
+
+    print("=" * 60)
+    print(f"模板匹配效能比較 ({handle.path.name} {handle.width}x{handle.height}, 信心度 {confidence})")
+    print("=" * 60)
+    use_pyautogui = pyautogui is not None and hasattr(pyautogui, "locate")
+    if not use_pyautogui:
+        print("⚠️ 未安裝 pyautogui，略過 pyautogui.locate")
+
+    for label in args.resolutions:
+        frame = make_frame(handle.color, RESOLUTIONS[label], args.absent)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        def run_full(image):
+            config.PYRAMID_MATCH_ENABLED = False
+            try:
+                return recognizer._match_handle(image, handle, threshold=confidence)
+            finally:
+                config.PYRAMID_MATCH_ENABLED = pyramid_enabled
+
+        def run_pyramid(image):
+            config.PYRAMID_MATCH_ENABLED = True
+            try:
+                return recognizer._match_handle(image, handle, threshold=confidence)
+            finally:
+                config.PYRAMID_MATCH_ENABLED = pyramid_enabled
+
+        cases = []
+        if use_pyautogui:
+            cases.append(("pyautogui.locate", lambda: pyautogui.locate(
+                handle.color, frame, confidence=confidence)))
+        cases += [
+            ("原尺寸 (彩色)", lambda: run_full(frame)),
+            ("原尺寸 (灰階)", lambda: run_full(gray)),
+            (f"由粗到細 L{recognizer._pyramid_level(frame, handle)} (彩色)", lambda: run_pyramid(frame)),
+            (f"由粗到細 L{recognizer._pyramid_level(gray, handle)} (灰階)", lambda: run_pyramid(gray)),
+        ]
+
+        print(f"\n🖥️ {label} {RESOLUTIONS[label][0]}x{RESOLUTIONS[label][1]}")
+        for name, func in cases:
+            try:
+                result = measure(func, args.iterations)
+            except Exception as e:
+                print(f"  {name}: ⚠️ 執行失敗: {e}")
+                continue
+            found = result['result']
+            if isinstance(found, tuple) and len(found) == 2:
+                score, box = found
+                found = f"分數 {score:.4f} 位置 ({box.left}, {box.top})" if box and score >= confidence else "未找到"
+            else:
+                found = f"位置 ({found[0]}, {found[1]})" if found else "未找到"
+            print(f"  {name}: 平均 {result['mean']:.2f} ms, 中位數 {result['median']:.2f} ms, "
+                  f"P95 {result['p95']:.2f} ms — {found}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+模板信心度閾值校正工具
+從錄製的檢測畫面（config.DETECTION_RECORD_ENABLED）收集 stop / send 按鈕在正例與反例畫面上的分數，
+為每個模板選擇能區分兩者的閾值，依本機與螢幕解析度寫入 config.CALIBRATED_THRESHOLD_FILE
+
+標註來源：資料夾內的 labels.json（檔名 -> 狀態），或加上 --use-recorded-decisions 以錄製當下的判斷作為標註
+
+用法：
+    python calibrate_thresholds.py ExecutionResult/DetectionFrames/*
+    python calibrate_thresholds.py <資料夾> --use-recorded-decisions --dry-run
+"""
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition
+from src.threshold_calibration import ThresholdCalibrator, save_thresholds, machine_id
+
+def main():
+    """主函數"""
+    parser = argparse.ArgumentParser(description="依錄製畫面校正模板信心度閾值")
+    parser.add_argument("sessions", nargs="+", type=Path, help="錄製資料夾（包含 index.jsonl）")
+    parser.add_argument("--use-recorded-decisions", action="store_true",
+                        help="沒有人工標註的畫面以錄製當下的判斷作為標註")
+    parser.add_argument("--min-samples", type=int, default=config.CALIBRATION_MIN_SAMPLES,
+                        help="正例與反例各自至少需要的畫面數")
+    parser.add_argument("--dry-run", action="store_true", help="只顯示結果，不寫入閾值檔案")
+    args = parser.parse_args()
+
+    # 使用獨立的辨識器：學習到的 ROI 寫入暫存檔，不影響本機快取
+    roi_file = Path(tempfile.mkdtemp(prefix="calibration_")) / "learned_rois.json"
+    calibrator = ThresholdCalibrator(ImageRecognition(learned_roi_file=roi_file))
+
+    frames = 0
+    for session in args.sessions:
+        if not (session / "index.jsonl").exists():
+            print(f"⚠️ 找不到錄製索引: {session}")
+            continue
+        frames += calibrator.add_corpus(session, args.use_recorded_decisions)
+
+    if not frames:
+        print("❌ 沒有已標註的畫面可供校正")
+        return 1
+
+    results = calibrator.calibrate(args.min_samples)
+
+    print("=" * 60)
+    print(f"閾值校正結果 (機器: {machine_id()}, 畫面數: {frames})")
+    print("=" * 60)
+    for result in results:
+        threshold = f"{result.threshold:.4f}" if result.threshold is not None else "-"
+        print(f"{result.resolution} {result.template}: 閾值 {threshold} "
+              f"(正例 {result.positives}, 反例 {result.negatives}, 差距 {result.margin:+.4f}) {result.message}")
+
+    if args.dry_run:
+        print("\n(--dry-run，未寫入閾值檔案)")
+        return 0
+
+    saved = save_thresholds(results)
+    print(f"\n📄 已寫入 {saved} 個閾值: {config.CALIBRATED_THRESHOLD_FILE}")
+    return 0 if saved else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,7 @@ class Config:
     LOGS_DIR = PROJECT_ROOT / "logs"
     ASSETS_DIR = PROJECT_ROOT / "assets"
     PROJECTS_DIR = PROJECT_ROOT / "projects"
+    CACHE_DIR = PROJECT_ROOT / "cache"  # 執行期間學習到的資料（ROI 等），每台機器各自保存
     
     # 提示詞檔案路徑
     PROMPT_FILE_PATH = PROJECT_ROOT / "prompt.txt"
@@ -25,18 +26,50 @@ class Config:
     VSCODE_STARTUP_DELAY = 5   # VS Code 啟動等待時間（秒）
     VSCODE_STARTUP_TIMEOUT = 30  # VS Code 啟動超時時間（秒）
     VSCODE_COMMAND_DELAY = 1    # 命令執行間隔時間（秒）
+    VSCODE_USER_DATA_DIR = None  # VS Code 的 user-data-dir（設定時以 --user-data-dir 啟動），None 表示使用預設位置
     
     # Copilot Chat 相關設定
     COPILOT_RESPONSE_TIMEOUT = 90   # Copilot 回應超時時間（秒） - 增加到90秒
     COPILOT_CHECK_INTERVAL = 5      # 檢查回應完成間隔（秒）
     COPILOT_COPY_RETRY_MAX = 3      # 複製回應重試次數
     COPILOT_COPY_RETRY_DELAY = 2    # 複製重試間隔（秒）
+    RESPONSE_CAPTURE_BACKEND = "clipboard"  # 回應擷取方式："clipboard"（鍵盤操作複製）、"session"（讀取 VS Code 保存的聊天工作階段 JSON）、"export"（以匯出聊天命令存成 JSON 後讀取）、"atspi"（Linux：讀取 VS Code 的無障礙樹）
+    CHAT_EXPORT_COMMAND = "Chat: Export Chat..."  # 命令面板中匯出聊天工作階段的命令
+    CHAT_EXPORT_DIR = PROJECT_ROOT / "ExecutionResult" / "ChatExports"  # 匯出的聊天工作階段 JSON 目錄
+    CHAT_EXPORT_DIALOG_DELAY = 1.5  # 執行匯出命令後等待存檔對話框開啟的時間（秒）
+    CHAT_EXPORT_TIMEOUT = 10  # 等待匯出檔案寫入完成的最長時間（秒）
+    CHAT_SESSION_POLL_INTERVAL = 0.5  # 檢查聊天工作階段檔案是否變動的間隔（秒）
+    ATSPI_POLL_INTERVAL = 0.25  # 讀取無障礙樹的間隔（秒），需要 PyGObject 與 AT-SPI（python3-gi、gir1.2-atspi-2.0）
+    ATSPI_MAX_NODES = 20000  # 完整走訪無障礙樹時最多讀取的節點數
+    ATSPI_CHAT_LIST_PATTERN = r"\bChat\b"  # 聊天清單（list）無障礙名稱的正規表示式
+    ATSPI_STOP_BUTTON_PATTERN = r"^(Stop|Cancel)\b"  # stop 按鈕無障礙名稱的正規表示式
+    ATSPI_SEND_BUTTON_PATTERN = r"^Send\b"  # send 按鈕無障礙名稱的正規表示式
+    COPILOT_LOG_COMPLETION = False  # 追蹤 Copilot Chat 擴充套件日誌取得請求結束時間，找不到日誌或沒有事件時改用畫面檢測
+    COPILOT_LOG_EXTENSION_DIR = "GitHub.copilot-chat"  # user-data-dir/logs/<工作階段>/window<N>/exthost 下的擴充套件日誌目錄
+    COPILOT_LOG_FINISH_PATTERN = r"ccreq:\S+\s*\|\s*(?P<status>success|cancell?ed|failed|error)\b"  # 請求結束的日誌行（status 群組為結束狀態）
+    COPILOT_LOG_START_PATTERN = r"\b[Ss](?:ending|tarting) (?:chat )?request\b"  # 請求開始的日誌行
+    COPILOT_LOG_SETTLE_SECONDS = 1.5  # 請求結束後多久沒有新的請求才視為回應完成（代理模式一次提示詞有多個請求）
+    COPILOT_LOG_POLL_INTERVAL = 0.1  # 無法使用 inotify 時檢查日誌的間隔（秒）
     
     # 智能等待設定
     SMART_WAIT_ENABLED = True    # 是否啟用智能等待
     SMART_WAIT_MAX_ATTEMPTS = 30  # 智能等待最大嘗試次數 - 增加到30次
     SMART_WAIT_INTERVAL = 2      # 智能等待檢查間隔（秒） - 減少到2秒提高響應性
     SMART_WAIT_TIMEOUT = 90      # 智能等待最大時間（秒） - 與主超時時間保持一致
+    SMART_WAIT_VISUAL_PROGRESS = False  # 以回應區域畫面變化判斷是否仍在輸出，輸出中不做剪貼簿複製探測（選用）
+    SMART_WAIT_MODE = "clipboard"  # 智能等待模式："clipboard"（定期以剪貼簿複製確認內容穩定）、"visual"（只依 stop / send 按鈕與回應區域畫面判斷，完成後複製一次）
+    SMART_WAIT_VISUAL_INTERVAL = 0.5  # visual 模式的檢測間隔（秒）
+    CHAT_PROGRESS_WIDTH = 700          # 回應區域寬度（由聊天區域右緣往左，像素）
+    CHAT_PROGRESS_HEIGHT = 600         # 回應區域高度（由聊天區域上緣往上，像素）
+    CHAT_PROGRESS_STABLE_SECONDS = 3.0  # 回應區域多久沒有變化視為輸出結束（秒）
+    CHAT_PROGRESS_MIN_CHANGED_ROWS = 2  # 至少幾列像素變化才視為有新內容（忽略游標閃爍等雜訊）
+    
+    # 背景狀態監控設定（選用）
+    STATE_MONITOR_ENABLED = False  # 智能等待改由背景執行緒檢測狀態並等待 idle 事件
+    STATE_MONITOR_RATE = 4.0       # 每秒檢測次數
+    STATE_MONITOR_CONFIRM_SAMPLES = 2  # 狀態需連續出現幾次才視為轉換
+    STATE_MONITOR_QUEUE_SIZE = 100     # 狀態轉換佇列長度
+    STATE_MONITOR_START_TIMEOUT = 15   # 等待回應開始（stop 按鈕出現）的最長時間（秒）
     
     # Copilot 記憶清除命令序列
     COPILOT_CLEAR_MEMORY_COMMANDS = [
@@ -51,11 +84,78 @@ class Config:
     # 圖像辨識設定
     IMAGE_CONFIDENCE = 0.9  # 圖像匹配信心度
     SCREENSHOT_DELAY = 0.5  # 截圖間隔時間
+    CAPTURE_BACKEND = "auto"  # 截圖後端："auto"（優先 mss）、"mss"、"pyautogui"、"xdamage"（Linux，聊天區域未重繪時不截圖）
+    X11_DISPLAY = None  # xdamage 後端與視窗查詢連線的 X display，None 表示使用 $DISPLAY
+    WINDOW_BOUNDED_CAPTURE = True  # Linux 下找到 VS Code 視窗時，全畫面檢測只截取該視窗範圍
+    WINDOW_LOOKUP_TIMEOUT = 5.0  # 啟動後等待 VS Code 視窗出現的最長時間（秒）
+    XDAMAGE_MAX_RECTS = 64  # 累積的重繪矩形超過此數量時合併為外接矩形
+    CAPTURE_CHAT_ROI_ONLY = True  # 已學習到聊天區域時只截取該區域
+    DETECTION_GRAYSCALE = True  # 檢測時直接截取灰階畫面並寫入預先配置的緩衝區
     IMAGE_RECOGNITION_REQUIRED = False  # 是否強制要求圖像檔案
+    TEMPLATE_PYRAMID_LEVELS = 3  # 模板預先計算的金字塔縮小層數（每層縮小一半）
+    PYRAMID_MATCH_ENABLED = True  # 整張截圖搜尋時先在縮小的金字塔層找候選位置，再回到原尺寸精確匹配
+    PYRAMID_MATCH_LEVEL = 2  # 粗搜尋最多縮小的層數（2 = 1/4、3 = 1/8），受模板縮小後的尺寸限制
+    PYRAMID_MIN_TEMPLATE_SIDE = 8  # 粗搜尋層的模板最短邊不得小於此像素，否則改用較淺的層
+    PYRAMID_MIN_FRAME_PIXELS = 640 * 480  # 截圖像素數低於此值時直接以原尺寸匹配（例如 ROI 區域）
+    PYRAMID_CANDIDATES = 3  # 每個模板最多精確匹配的候選位置數
+    PYRAMID_CANDIDATE_MARGIN = 0.2  # 第一個以外的候選位置，粗搜尋分數需達到閾值減去此值
+    PYRAMID_REFINE_PADDING = 4  # 精確匹配時候選位置向外擴展的像素（原尺寸）
+    TEMPLATE_RELOAD_CHECK_INTERVAL = 2.0  # 檢查模板檔案是否變動的間隔（秒）
+    TEMPLATE_THEME_DIR = ASSETS_DIR / "themes"  # 各主題的按鈕模板（themes/<主題>/stop_button.png、send_button.png）
+    TEMPLATE_VARIANT_SCALES = (1.0, 1.25, 1.5)  # 每個主題額外產生的顯示縮放版本
+    TEMPLATE_VARIANT_RETRY_INTERVAL = 10.0  # 尚未辨識到主題時，重新嘗試辨識的最短間隔（秒）
+    ROI_SEARCH_ENABLED = True  # 是否優先在上次找到按鈕的位置附近搜尋
+    ROI_PADDING = 80  # 學習到的 ROI 向外擴展的像素
+    LEARNED_ROI_FILE = CACHE_DIR / "learned_rois.json"  # 依螢幕解析度保存的 ROI
+    FRAME_RING_ENABLED = False  # 由單一背景執行緒截圖寫入共享記憶體環狀緩衝，檢測、進度追蹤與診斷畫面共用同一張畫面
+    FRAME_RING_SLOTS = 4  # 環狀緩衝的畫面槽數
+    FRAME_RING_RATE_HZ = 4.0  # 背景截圖頻率（每秒次數）
+    FRAME_RING_MAX_AGE = 1.0  # 最新畫面超過此時間（秒）未更新時改為自行截圖
+    FRAME_GATE_ENABLED = True  # 聊天區域未變動時沿用上次檢測結果
+    FRAME_GATE_DOWNSAMPLE = 4  # 計算畫面簽章時的縮小倍數
+    FRAME_GATE_THRESHOLD = 8  # 簽章像素最大差異（0-255）不超過此值視為未變動
+    FRAME_GATE_MAX_AGE = 10.0  # 沿用快取結果的最長時間（秒），超過則強制重新匹配
+    USE_CALIBRATED_THRESHOLDS = True  # 優先使用 calibrate_thresholds.py 依本機與解析度校正的模板閾值
+    CALIBRATED_THRESHOLD_FILE = CACHE_DIR / "calibrated_thresholds.json"  # 校正閾值（機器 -> 解析度 -> 模板）
+    CALIBRATION_MIN_SAMPLES = 5  # 校正時正例與反例各自至少需要的畫面數
+    CALIBRATION_THRESHOLD_RANGE = (0.6, 0.98)  # 校正閾值允許範圍
+    UI_CLASSIFIER_ENABLED = False  # 以縮圖最近鄰分類聊天區域狀態（需先以 train_ui_classifier.py 訓練），確定為 idle / responding 時不做模板匹配
+    UI_CLASSIFIER_MODEL = CACHE_DIR / "ui_state_classifier.npz"  # 分類器範例檔案
+    UI_CLASSIFIER_THUMBNAIL_SIZE = (32, 32)  # 縮圖大小（寬, 高）
+    UI_CLASSIFIER_MIN_SIMILARITY = 0.9  # 與最近範例的相似度低於此值時改用模板匹配
+    UI_CLASSIFIER_MIN_MARGIN = 0.05  # 最近範例與其他標籤範例的相似度差距低於此值時改用模板匹配
+    DETECTION_RECORD_ENABLED = False  # 執行時錄製檢測畫面，供 replay_detection.py 離線重播
+    DETECTION_RECORD_DIR = PROJECT_ROOT / "ExecutionResult" / "DetectionFrames"  # 錄製畫面根目錄（每個專案一個資料夾）
+    DETECTION_RECORD_MAX_FRAMES = 2000  # 每個錄製資料夾最多保留的畫面數，超過刪除最舊的
+    DETECTION_RECORD_ROI_ONLY = True  # 已學習到聊天區域時只保存該區域
+    DETECTION_RECORD_PNG_COMPRESSION = 3  # PNG 壓縮等級（0-9，越高檔案越小但越耗時）
+    FRAME_DUMP_ENABLED = False  # 異常發生時（錯誤訊息、通知遮擋、等待超時、錯誤處理）保存當下畫面（選用）
+    FRAME_DUMP_DIR = PROJECT_ROOT / "ExecutionResult" / "DiagnosticFrames"  # 診斷畫面目錄
+    FRAME_DUMP_FORMAT = "webp"  # 診斷畫面格式：webp、png、jpg
+    FRAME_DUMP_QUALITY = 80  # webp / jpg 品質（0-100）
+    FRAME_DUMP_PNG_COMPRESSION = 3  # png 壓縮等級（0-9）
+    FRAME_DUMP_QUEUE_SIZE = 8  # 等待背景寫入的畫面數上限，超過時捨棄新畫面
+    FRAME_DUMP_MAX_QUEUED_MB = 200  # 等待背景寫入的畫面總記憶體上限（MB）
+    FRAME_DUMP_DISK_QUOTA_MB = 500  # 診斷畫面目錄的磁碟配額（MB），超過時刪除最舊的畫面
+    FRAME_DUMP_MIN_INTERVAL = 1.0  # 兩次保存診斷畫面的最短間隔（秒），同一異常由多處回報時只保存一次
     
     # 圖像資源路徑（更新後的版本）
     STOP_BUTTON_IMAGE = ASSETS_DIR / "stop_button.png"        # Copilot 停止按鈕
     SEND_BUTTON_IMAGE = ASSETS_DIR / "send_button.png"        # Copilot 發送按鈕
+    NOTIFICATION_CLOSE_IMAGE = ASSETS_DIR / "notification_close.png"  # 通知右上角的關閉按鈕（選用，需自行擷取，見 README；缺少時改用命令面板清除全部通知）
+    NOTIFICATION_TOAST_WIDTH = 450  # VS Code 通知寬度（像素），用於估計通知是否遮擋聊天區域
+    NOTIFICATION_CLEAR_SETTLE = 1.5  # 清除通知後等待按鈕重新出現的最長時間（秒）
+    
+    # Copilot 錯誤狀態模板（選用，需自行擷取，見 README；檔案不存在的模板會略過，啟動時記錄無法檢測的類別）：類別 -> 模板圖像列表
+    COPILOT_ERROR_TEMPLATES = {
+        "rate_limit": [ASSETS_DIR / "error_rate_limit.png"],          # 達到使用上限（rate limited）
+        "auth": [ASSETS_DIR / "error_sign_in.png"],                   # 需要登入 GitHub
+        "transient": [ASSETS_DIR / "error_something_went_wrong.png",  # 暫時性錯誤 / 網路錯誤
+                      ASSETS_DIR / "error_network.png"],
+    }
+    COPILOT_ERROR_SEARCH_WIDTH = 700   # 由聊天區域右下角往左搜尋錯誤訊息的寬度（像素）
+    COPILOT_ERROR_SEARCH_HEIGHT = 600  # 由聊天區域右下角往上搜尋錯誤訊息的高度（像素）
+    COPILOT_RATE_LIMIT_BACKOFF = 120   # 遇到 rate limit 時重試前的等待時間（秒）
     # 以下圖像不再使用，但保留以防需要
     # REGENERATE_BUTTON_IMAGE = ASSETS_DIR / "regenerate_button.png"
     # COPY_BUTTON_IMAGE = ASSETS_DIR / "copy_button.png"
@@ -90,7 +190,7 @@ class Config:
     @classmethod
     def ensure_directories(cls):
         """確保所有必要目錄存在"""
-        directories = [cls.LOGS_DIR, cls.ASSETS_DIR, cls.PROJECTS_DIR]
+        directories = [cls.LOGS_DIR, cls.ASSETS_DIR, cls.PROJECTS_DIR, cls.CACHE_DIR]
         for directory in directories:
             directory.mkdir(parents=True, exist_ok=True)
     
@@ -22,6 +22,7 @@ from src.vscode_controller import VSCodeController
 from src.copilot_handler import CopilotHandler
 from src.image_recognition import ImageRecognition
 from src.ui_manager import UIManager
+from src.frame_dump import frame_dump_writer
 from src.error_handler import (
     ErrorHandler, RetryHandler, RecoveryManager,
     AutomationError, ErrorType, RecoveryAction
@@ -38,10 +39,11 @@ class HybridUIAutomationScript:
         self.project_manager = ProjectManager()
         self.vscode_controller = VSCodeController()
         self.error_handler = ErrorHandler()
-        self.copilot_handler = CopilotHandler(self.error_handler)  # 傳入 error_handler
+        # 傳入 error_handler，以及開啟專案的 VS Code 進程（讀取無障礙樹時使用）
+        self.copilot_handler = CopilotHandler(self.error_handler, self.vscode_controller.auto_opened_pids)
         self.image_recognition = ImageRecognition()
         self.retry_handler = RetryHandler(self.error_handler)
-        self.recovery_manager = RecoveryManager()
+        self.recovery_manager = RecoveryManager(self.error_handler)
         self.ui_manager = UIManager()
         
         # 執行選項
@@ -177,6 +179,7 @@ class HybridUIAutomationScript:
                 self.logger.warning("圖像資源驗證失敗，但繼續執行（使用替代方案）")
                 # 可以選擇中止或繼續
                 # return False
+            self.image_recognition.check_optional_templates()
             
             # 確保乾淨的執行環境
             if not self.vscode_controller.ensure_clean_environment():
@@ -251,6 +254,7 @@ class HybridUIAutomationScript:
         """
         project_logger = None
         start_time = time.time()
+        metrics_started = False  # 已為此專案重設統計（被跳過的專案不記錄前一個專案的統計）
         
         try:
             # 檢查是否收到中斷請求
@@ -262,6 +266,15 @@ class HybridUIAutomationScript:
             project_logger = create_project_logger(project.name)
             project_logger.log("開始處理專案")
             
+            # 每個專案分別統計圖像檢測耗時與命中率，以及各階段耗時
+            self.copilot_handler.image_recognition.reset_detection_metrics()
+            self.copilot_handler.reset_stage_timings()
+            metrics_started = True
+            
+            # 錄製此專案的檢測畫面（供離線重播調校）
+            if config.DETECTION_RECORD_ENABLED:
+                self.copilot_handler.image_recognition.start_recording(project.name)
+            
             # 更新專案狀態為處理中
             self.project_manager.update_project_status(project.name, "processing")
             
@@ -301,6 +314,15 @@ class HybridUIAutomationScript:
             
             self.logger.error(f"處理專案 {project.name} 時發生未捕獲的錯誤: {error_msg}")
             return False
+        
+        finally:
+            if metrics_started:
+                self.project_manager.record_detection_metrics(
+                    project.name, self.copilot_handler.image_recognition.get_detection_metrics()
+                )
+                self.project_manager.record_stage_timings(project.name, self.copilot_handler.get_stage_timings())
+            if config.DETECTION_RECORD_ENABLED:
+                self.copilot_handler.image_recognition.stop_recording()
     
     def _execute_project_automation(self, project: ProjectInfo, project_logger) -> bool:
         """
@@ -323,6 +345,14 @@ class HybridUIAutomationScript:
             if not self.vscode_controller.open_project(project.path):
                 raise AutomationError("無法開啟專案", ErrorType.VSCODE_ERROR)
             
+            # 找到 VS Code 視窗時只截取該視窗範圍
+            window = self.vscode_controller.window
+            self.copilot_handler.image_recognition.set_capture_bounds(window.rect if window else None)
+            
+            # 由單一背景執行緒截圖，檢測、進度追蹤與診斷畫面共用
+            if config.FRAME_RING_ENABLED:
+                self.copilot_handler.image_recognition.start_frame_ring()
+            
             # 檢查中斷請求
             if self.error_handler.emergency_stop_requested:
                 raise AutomationError("收到中斷請求", ErrorType.USER_INTERRUPT)
@@ -385,6 +415,13 @@ class HybridUIAutomationScript:
             # 如果使用智能等待，表示已經在 _smart_wait_for_response 中等待回應完成
             # 但我們仍需要進行最後確認
             if self.use_smart_wait:
+                # 只有剪貼簿探測的等待方式需要最後確認；其他方式（工作階段檔案、無障礙樹、
+                # 擴充套件日誌、狀態監控、畫面等待）已在回應完成後取得並儲存一次，不再重複複製或匯出
+                wait_mode = self.copilot_handler.get_stage_timings().get('wait_mode')
+                if wait_mode != "clipboard":
+                    self.logger.info(f"等待方式 {wait_mode}：回應已取得，直接關閉專案")
+                    return self.vscode_controller.close_current_project(force=False)
+                
                 self.logger.info("使用智能等待模式，進行最後確認...")
                 
                 # 最後一次確認回應內容
@@ -508,6 +545,12 @@ class HybridUIAutomationScript:
             # 確保 VS Code 已關閉
             self.vscode_controller.ensure_clean_environment()
             
+            # 停止背景截圖並釋放共享記憶體
+            self.copilot_handler.image_recognition.stop_frame_ring()
+            
+            # 等待背景寫入的診斷畫面完成
+            frame_dump_writer.close()
+            
             # 可以添加其他清理邏輯
             
             self.logger.info("✅ 環境清理完成")
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+檢測畫面重播工具
+將執行時錄製的畫面（config.DETECTION_RECORD_ENABLED）重新餵給圖像辨識，
+回報每張畫面的耗時、判斷結果，以及與人工標註（labels.json）比對的準確度
+
+用法：
+    python replay_detection.py ExecutionResult/DetectionFrames/<專案>_<時間>
+    python replay_detection.py <資料夾> --no-gate --output replay_report.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from src.detection_replay import DetectionReplay
+
+def main():
+    """主函數"""
+    parser = argparse.ArgumentParser(description="重播錄製的檢測畫面")
+    parser.add_argument("sessions", nargs="+", type=Path, help="錄製資料夾（包含 index.jsonl）")
+    parser.add_argument("--no-gate", action="store_true", help="關閉畫面變動閘門，每張畫面都重新匹配")
+    parser.add_argument("--output", type=Path, help="將逐張結果與統計寫入 JSON 檔案")
+    parser.add_argument("--show-errors", action="store_true", help="列出與標註不符的畫面")
+    args = parser.parse_args()
+
+    replay = DetectionReplay(use_frame_gate=not args.no_gate)
+    reports = []
+
+    for session in args.sessions:
+        if not (session / "index.jsonl").exists():
+            print(f"⚠️ 找不到錄製索引: {session}")
+            continue
+
+        report = replay.run(session)
+        reports.append(report)
+        summary = report['summary']
+
+        print("=" * 60)
+        print(f"📼 {session}")
+        print("=" * 60)
+        if not summary['frames']:
+            print("沒有可重播的畫面")
+            continue
+
+        print(f"畫面數: {summary['frames']} (閘門沿用 {summary['cache_hits']} 張)")
+        print(f"耗時: 平均 {summary['latency_mean_ms']:.2f} ms, 中位數 {summary['latency_median_ms']:.2f} ms, "
+              f"P95 {summary['latency_p95_ms']:.2f} ms, 最大 {summary['latency_max_ms']:.2f} ms")
+        print(f"判斷分布: {summary['decisions']}")
+        print(f"與錄製時判斷不同: {summary['changed_from_recording']} 張")
+        if summary['labelled']:
+            print(f"標註準確度: {summary['accuracy']:.2%} ({summary['labelled']} 張已標註)")
+            if summary['errors']:
+                print(f"誤判 (標註->判斷): {summary['errors']}")
+        else:
+            print("沒有標註資料（可在資料夾內建立 labels.json：{\"frame_000001.png\": \"idle\"}）")
+
+        if args.show_errors:
+            for frame in report['frames']:
+                if frame['correct'] is False:
+                    print(f"  ❌ {frame['file']}: 標註 {frame['label']}, 判斷 {frame['decision']}, "
+                          f"分數 {frame['scores']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 結果已寫入: {args.output}")
+
+    return 0 if reports else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - AT-SPI 聊天面板讀取模組
+VS Code 以 --force-renderer-accessibility 啟動時，Electron 透過 AT-SPI 公開 DOM 的無障礙樹；
+直接讀取自動開啟的 VS Code 中 Copilot Chat 的最後一則回應與 stop / send 按鈕狀態，
+不需要截圖、剪貼簿或切換焦點，在無螢幕的 Xvfb 上也能使用
+（僅 Linux，需要 PyGObject 與 AT-SPI 的 GObject introspection 資料，例如 python3-gi、gir1.2-atspi-2.0）
+"""
+
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple, List, Callable, Iterable, Set
+import sys
+
+# 導入配置和日誌
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from src.logger import get_logger
+
+@dataclass
+class AtspiChatState:
+    """一次讀取的聊天面板狀態"""
+    has_stop_button: bool
+    has_send_button: bool
+    response_text: str          # 聊天清單最後一個項目的文字（沒有項目時為空字串）
+    nodes_visited: int          # 讀取的無障礙節點數
+    elapsed: float              # 讀取耗時（秒）
+
+class AtspiNode:
+    """
+    AT-SPI 無障礙物件的最小介面（角色、名稱、文字、是否顯示、子節點）
+    每個屬性都是一次 D-Bus 呼叫，只在需要時讀取
+    """
+
+    def __init__(self, accessible):
+        self.accessible = accessible
+
+    @property
+    def role(self) -> str:
+        return self.accessible.get_role_name() or ""
+
+    @property
+    def name(self) -> str:
+        return self.accessible.get_name() or ""
+
+    @property
+    def showing(self) -> bool:
+        from gi.repository import Atspi  # 選用相依套件
+        return self.accessible.get_state_set().contains(Atspi.StateType.SHOWING)
+
+    @property
+    def text(self) -> str:
+        from gi.repository import Atspi  # 選用相依套件
+        if self.accessible.get_text_iface() is None:
+            return ""
+        return Atspi.Text.get_text(self.accessible, 0, Atspi.Text.get_character_count(self.accessible)) or ""
+
+    def children(self) -> List["AtspiNode"]:
+        return [AtspiNode(self.accessible.get_child_at_index(i))
+                for i in range(self.accessible.get_child_count())]
+
+def find_application(pids: Iterable[int]) -> Optional[AtspiNode]:
+    """
+    在 AT-SPI 桌面找出屬於指定進程的應用程式
+
+    Raises:
+        ImportError: 未安裝 PyGObject 或 AT-SPI introspection 資料
+    """
+    import gi  # 選用相依套件
+    gi.require_version("Atspi", "2.0")
+    from gi.repository import Atspi
+
+    pids = set(pids)
+    desktop = Atspi.get_desktop(0)
+    for i in range(desktop.get_child_count()):
+        application = desktop.get_child_at_index(i)
+        try:
+            if application is not None and application.get_process_id() in pids:
+                return AtspiNode(application)
+        except Exception:
+            # 應用程式在列舉期間結束
+            continue
+    return None
+
+def item_text(node, max_nodes: int = 500) -> str:
+    """清單項目的文字：優先使用無障礙名稱（VS Code 以回應內容作為 aria-label），否則組合子節點的文字"""
+    name = node.name.strip()
+    if name:
+        return name
+    chunks = []
+    stack = [node]
+    visited = 0
+    while stack and visited < max_nodes:
+        current = stack.pop()
+        visited += 1
+        text = current.text
+        if text:
+            chunks.append(text)
+            continue
+        stack.extend(reversed(current.children()))
+    return "\n".join(chunk.strip() for chunk in chunks if chunk.strip())
+
+def scan_chat(root, max_nodes: int = None) -> Tuple[AtspiChatState, Optional[object], Optional[object]]:
+    """
+    走訪無障礙樹，找出聊天清單與 stop / send 按鈕
+
+    Args:
+        root: 起始節點（應用程式或先前找到的聊天面板）
+        max_nodes: 最多讀取的節點數
+
+    Returns:
+        Tuple: (狀態, 聊天清單節點, 按鈕所在的工具列節點)，找不到時節點為 None
+    """
+    start = time.perf_counter()
+    max_nodes = max_nodes or config.ATSPI_MAX_NODES
+    stop_pattern = re.compile(config.ATSPI_STOP_BUTTON_PATTERN)
+    send_pattern = re.compile(config.ATSPI_SEND_BUTTON_PATTERN)
+    list_pattern = re.compile(config.ATSPI_CHAT_LIST_PATTERN)
+
+    chat_list = toolbar = None
+    has_stop = has_send = False
+    stack = [(root, None)]
+    visited = 0
+    while stack and visited < max_nodes:
+        node, parent = stack.pop()
+        visited += 1
+        role = node.role
+        if role == "push button":
+            name = node.name
+            if stop_pattern.search(name) and node.showing:
+                has_stop, toolbar = True, parent
+            elif send_pattern.search(name) and node.showing:
+                has_send, toolbar = True, parent
+            continue
+        if role == "list" and chat_list is None and list_pattern.search(node.name):
+            chat_list = node
+            continue
+        stack.extend((child, node) for child in reversed(node.children()))
+
+    state = AtspiChatState(has_stop, has_send, last_item_text(chat_list), visited,
+                           time.perf_counter() - start)
+    return state, chat_list, toolbar
+
+def last_item_text(chat_list) -> str:
+    """聊天清單最後一個項目（最新的回應）的文字"""
+    if chat_list is None:
+        return ""
+    items = [child for child in chat_list.children() if child.role == "list item"]
+    return item_text(items[-1]) if items else ""
+
+class AtspiChatReader:
+    """讀取自動開啟的 VS Code 的 Copilot Chat 面板，記住聊天清單與工具列以減少後續讀取的節點數"""
+
+    def __init__(self, pid_provider: Callable[[], Set[int]]):
+        """
+        初始化讀取器
+
+        Args:
+            pid_provider: 返回 VS Code 相關進程 PID 的函數（VS Code 重新啟動後 PID 會改變）
+        """
+        self.logger = get_logger("AtspiChatReader")
+        self.pid_provider = pid_provider
+        self.application = None
+        self._chat_list = None
+        self._toolbar = None
+        self.last_state: Optional[AtspiChatState] = None
+        self.scan_count = 0
+
+    def read(self) -> Optional[AtspiChatState]:
+        """
+        讀取聊天面板狀態
+
+        Returns:
+            Optional[AtspiChatState]: 找不到 VS Code 應用程式、未啟用無障礙或未安裝 AT-SPI 時返回 None
+        """
+        try:
+            state = self._read_cached()
+            if state is None:
+                state = self._scan()
+        except ImportError as e:
+            self.logger.debug(f"無法使用 AT-SPI: {str(e)}")
+            return None
+        except Exception as e:
+            # 節點已失效（例如面板重新繪製或 VS Code 重新啟動），下次重新走訪
+            self.logger.debug(f"讀取無障礙樹失敗: {str(e)}")
+            self.application = self._chat_list = self._toolbar = None
+            return None
+        self.last_state = state
+        return state
+
+    def _read_cached(self) -> Optional[AtspiChatState]:
+        """只讀取先前找到的聊天清單與工具列；工具列沒有任何按鈕時視為失效"""
+        if self._chat_list is None or self._toolbar is None:
+            return None
+        start = time.perf_counter()
+        state, _, _ = scan_chat(self._toolbar, max_nodes=200)
+        if not (state.has_stop_button or state.has_send_button):
+            return None
+        state.response_text = last_item_text(self._chat_list)
+        state.elapsed = time.perf_counter() - start
+        return state
+
+    def _scan(self) -> Optional[AtspiChatState]:
+        if self.application is None:
+            self.application = find_application(self.pid_provider())
+            if self.application is None:
+                return None
+        state, self._chat_list, self._toolbar = scan_chat(self.application)
+        self.scan_count += 1
+        self.logger.debug(f"走訪無障礙樹: {state.nodes_visited} 個節點, {state.elapsed * 1000:.0f} ms")
+        return state
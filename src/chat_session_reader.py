@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - Copilot Chat 工作階段讀取模組
+VS Code 將聊天工作階段以 JSON 保存在 user-data-dir 的 workspaceStorage/<雜湊>/chatSessions 下，
+依開啟的專案找到對應的工作階段檔案，只在檔案變動時重新解析，
+由保存的請求狀態判斷回應是否完成，不需要透過剪貼簿與鍵盤複製回應
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, List, Dict, Callable, Set, Tuple
+from urllib.parse import urlparse, unquote
+import sys
+
+# 導入配置和日誌
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from src.logger import get_logger
+
+@dataclass
+class ChatResponse:
+    """工作階段中最新一次請求的回應"""
+    session_id: str
+    request_id: str
+    text: str
+    complete: bool
+    canceled: bool = False
+    error: Optional[str] = None   # 回應失敗時的錯誤訊息（result.errorDetails.message）
+
+def default_user_data_dir() -> Path:
+    """VS Code 預設的 user-data-dir"""
+    if sys.platform == "win32":
+        return Path(os.environ.get("APPDATA", Path.home() / "AppData" / "Roaming")) / "Code"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Application Support" / "Code"
+    return Path(os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config")) / "Code"
+
+def _uri_to_path(uri: str) -> Optional[str]:
+    """將 file:// URI 轉為正規化的本機路徑，其他協定（例如 vscode-remote）返回 None"""
+    parsed = urlparse(uri)
+    if parsed.scheme != "file":
+        return None
+    path = unquote(parsed.path)
+    # Windows：file:///c%3A/Users/... -> c:/Users/...
+    if len(path) > 2 and path[0] == "/" and path[2] == ":":
+        path = path[1:]
+    return os.path.normcase(os.path.normpath(path))
+
+def find_workspace_storage(project_path, user_data_dir: Path = None) -> Optional[Path]:
+    """
+    找出專案資料夾對應的 workspaceStorage 目錄
+
+    Args:
+        project_path: 以 VS Code 開啟的專案資料夾
+        user_data_dir: VS Code 的 user-data-dir，None 表示使用配置值或預設位置
+
+    Returns:
+        Optional[Path]: 多個目錄符合時（例如重新安裝過 VS Code）返回最近修改的，找不到時返回 None
+    """
+    storage_root = Path(user_data_dir or config.VSCODE_USER_DATA_DIR or default_user_data_dir()) \
+        / "User" / "workspaceStorage"
+    target = os.path.normcase(os.path.normpath(str(Path(project_path).resolve())))
+    candidates = []
+    for workspace_file in storage_root.glob("*/workspace.json"):
+        try:
+            with open(workspace_file, 'r', encoding='utf-8') as f:
+                folder = json.load(f).get("folder")
+        except (OSError, ValueError):
+            continue
+        if folder and _uri_to_path(folder) == target:
+            candidates.append(workspace_file.parent)
+    if not candidates:
+        return None
+    return max(candidates, key=lambda path: path.stat().st_mtime)
+
+def _response_text(parts: List) -> str:
+    """將回應片段組合為 Markdown 文字（與 Copilot Chat 的「複製」內容相同的文字部分）"""
+    chunks = []
+    for part in parts or []:
+        if not isinstance(part, dict):
+            continue
+        kind = part.get("kind")
+        if kind in (None, "markdownContent"):
+            value = part.get("value")
+            if isinstance(value, dict):
+                value = value.get("value")
+            if value is None and isinstance(part.get("content"), dict):
+                value = part["content"].get("value")
+            if isinstance(value, str):
+                chunks.append(value)
+        elif kind == "inlineReference":
+            reference = part.get("inlineReference") or {}
+            name = part.get("name") or reference.get("name") or Path(
+                reference.get("path") or (reference.get("uri") or {}).get("path", "")).name
+            if name:
+                chunks.append(f"`{name}`")
+    return "".join(chunks)
+
+def _request_state(request: Dict) -> Tuple[bool, bool, Optional[str]]:
+    """
+    由保存的請求判斷 (是否完成, 是否取消, 錯誤訊息)
+
+    回應完成後 VS Code 才寫入 result；較新的版本另以 modelState.value 記錄狀態（0 表示仍在回應）
+    """
+    canceled = bool(request.get("isCanceled"))
+    result = request.get("result")
+    error = None
+    if isinstance(result, dict) and isinstance(result.get("errorDetails"), dict):
+        error = result["errorDetails"].get("message") or "unknown error"
+    model_state = request.get("modelState")
+    if isinstance(model_state, dict) and "value" in model_state:
+        complete = model_state["value"] != 0
+    else:
+        complete = result is not None
+    return complete or canceled, canceled, error
+
+def parse_session(data: Dict) -> Optional[ChatResponse]:
+    """
+    解析工作階段 JSON 中最新一次請求的回應
+
+    Returns:
+        Optional[ChatResponse]: 沒有任何請求時返回 None
+    """
+    requests = data.get("requests") or []
+    if not requests:
+        return None
+    request = requests[-1]
+    complete, canceled, error = _request_state(request)
+    return ChatResponse(
+        session_id=str(data.get("sessionId", "")),
+        request_id=str(request.get("requestId", len(requests) - 1)),
+        text=_response_text(request.get("response")),
+        complete=complete,
+        canceled=canceled,
+        error=error
+    )
+
+class ChatSessionReader:
+    """追蹤一個專案的聊天工作階段檔案，取得送出提示詞後的新回應"""
+
+    def __init__(self, project_path, user_data_dir: Path = None):
+        """
+        初始化讀取器
+
+        Args:
+            project_path: 以 VS Code 開啟的專案資料夾
+            user_data_dir: VS Code 的 user-data-dir，None 表示使用配置值或預設位置
+        """
+        self.logger = get_logger("ChatSessionReader")
+        self.project_path = Path(project_path)
+        self.user_data_dir = user_data_dir
+        self.storage_dir: Optional[Path] = None
+        self._stats: Dict[Path, Tuple[int, int]] = {}          # 檔案 -> (mtime_ns, size)
+        self._responses: Dict[Path, Optional[ChatResponse]] = {}
+        self._baseline: Set[Tuple[str, str]] = set()            # 送出提示詞前已存在的 (工作階段, 請求)
+        self._baseline_time_ns = 0
+        self.parse_count = 0
+        self.last_response: Optional[ChatResponse] = None
+
+    def _session_files(self) -> List[Path]:
+        if self.storage_dir is None:
+            self.storage_dir = find_workspace_storage(self.project_path, self.user_data_dir)
+            if self.storage_dir is None:
+                return []
+            self.logger.info(f"工作階段目錄: {self.storage_dir}")
+        return list((self.storage_dir / "chatSessions").glob("*.json"))
+
+    def _refresh(self) -> None:
+        """只重新解析大小或修改時間改變的檔案"""
+        for path in self._session_files():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            key = (stat.st_mtime_ns, stat.st_size)
+            if self._stats.get(path) == key:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                # VS Code 正在寫入，下次再讀
+                continue
+            self._stats[path] = key
+            self._responses[path] = parse_session(data)
+            self.parse_count += 1
+
+    def mark_baseline(self) -> None:
+        """
+        記錄目前已存在的請求（送出提示詞前呼叫），之後只返回新的請求
+        此時尚未找到工作階段目錄的話，之後找到的檔案只採用記錄後才修改過的
+        """
+        # 檔案系統的修改時間精度較粗，保留一秒餘裕
+        self._baseline_time_ns = time.time_ns() - 1_000_000_000
+        self._refresh()
+        self._baseline = {(response.session_id, response.request_id)
+                          for response in self._responses.values() if response is not None}
+        self.last_response = None
+
+    def poll(self) -> Optional[ChatResponse]:
+        """
+        檢查工作階段檔案是否有新的回應
+
+        Returns:
+            Optional[ChatResponse]: 送出提示詞後最新的請求回應，尚未出現時返回 None
+        """
+        self._refresh()
+        candidates = [(self._stats[path][0], response) for path, response in self._responses.items()
+                      if response is not None and self._stats[path][0] >= self._baseline_time_ns
+                      and (response.session_id, response.request_id) not in self._baseline]
+        if not candidates:
+            return None
+        response = max(candidates, key=lambda item: item[0])[1]
+        if self.last_response is None or len(response.text) != len(self.last_response.text):
+            self.logger.debug(f"回應更新: {len(response.text)} 字元 (完成: {response.complete})")
+        self.last_response = response
+        return response
+
+    def wait_for_completion(self, timeout: float, abort: Callable[[], bool] = None,
+                            interval: float = None) -> Optional[ChatResponse]:
+        """
+        等待新的請求完成
+
+        Args:
+            timeout: 最長等待時間（秒）
+            abort: 返回 True 時停止等待
+            interval: 檢查檔案的間隔（秒）
+
+        Returns:
+            Optional[ChatResponse]: 完成的回應，超時或中斷時返回 None（最後讀到的內容保存在 last_response）
+        """
+        interval = interval or config.CHAT_SESSION_POLL_INTERVAL
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if abort is not None and abort():
+                return None
+            response = self.poll()
+            if response is not None and response.complete:
+                return response
+            time.sleep(interval)
+        return None
@@ -8,29 +8,67 @@ Hybrid UI Automation Script - Copilot Chat 操作模組
 import pyautogui
 import pyperclip
 import psutil
+import json
 import time
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Dict, Callable, Set
 import sys
 
 # 導入配置和日誌
 sys.path.append(str(Path(__file__).parent.parent))
 from config.config import config
 from src.logger import get_logger
-from src.image_recognition import image_recognition
+from src.image_recognition import image_recognition, CopilotUIState, ChatProgressTracker
+from src.chat_session_reader import ChatSessionReader, parse_session
+from src.copilot_log_tail import CopilotLogWatcher
+from src.atspi_reader import AtspiChatReader
+from src.error_handler import AutomationError, ErrorType, RecoveryAction
 
 class CopilotHandler:
     """Copilot Chat 操作處理器"""
     
-    def __init__(self, error_handler=None):
-        """初始化 Copilot 處理器"""
+    def __init__(self, error_handler=None, vscode_pids: Callable[[], Set[int]] = None):
+        """
+        初始化 Copilot 處理器
+        
+        Args:
+            error_handler: 錯誤處理器
+            vscode_pids: 返回開啟專案的 VS Code 相關進程 PID 的函數（VSCodeController.auto_opened_pids），
+                         讀取無障礙樹時用來找出該 VS Code
+        """
         self.logger = get_logger("CopilotHandler")
         self.is_chat_open = False
         self.last_response = ""
         self.error_handler = error_handler  # 添加 error_handler 引用
+        self.vscode_pids = vscode_pids
         self.image_recognition = image_recognition  # 添加圖像識別引用
+        self.stage_timings: Dict = {}  # 目前專案各階段耗時（秒）與剪貼簿探測統計
+        self.session_reader: Optional[ChatSessionReader] = None  # 讀取聊天工作階段檔案（RESPONSE_CAPTURE_BACKEND = "session"）
+        self.log_watcher: Optional[CopilotLogWatcher] = None  # 追蹤 Copilot Chat 擴充套件日誌（COPILOT_LOG_COMPLETION）
+        self.atspi_reader: Optional[AtspiChatReader] = None  # 讀取 VS Code 無障礙樹（RESPONSE_CAPTURE_BACKEND = "atspi"）
+        self._atspi_baseline = ""  # 送出提示詞前聊天清單最後一個項目的文字
+        self._atspi_response: Optional[str] = None  # 無障礙樹讀到的完成回應
+        self.reset_stage_timings()
         self.logger.info("Copilot Chat 處理器初始化完成")
     
+    def reset_stage_timings(self) -> None:
+        """清除階段耗時（每個專案開始時呼叫）"""
+        self.stage_timings = {'clipboard_probes': 0, 'clipboard_probe_time': 0.0}
+    
+    def _record_stage(self, stage: str, seconds: float) -> None:
+        """累加一個階段的耗時（重試時同一階段會執行多次）"""
+        self.stage_timings[stage] = round(self.stage_timings.get(stage, 0.0) + seconds, 3)
+    
+    def get_stage_timings(self) -> Dict:
+        """
+        取得目前專案的階段耗時
+        
+        Returns:
+            Dict: 各階段耗時（秒）、等待模式，以及等待期間剪貼簿探測的次數與耗時
+                  （clipboard_probe_time 即 visual 模式可節省的時間）
+        """
+        return dict(self.stage_timings)
+    
     def open_copilot_chat(self) -> bool:
         """
         開啟 Copilot Chat (使用 Ctrl+Shift+I)
@@ -150,9 +188,32 @@ class CopilotHandler:
             
             self.logger.info(f"等待 Copilot 回應 (超時: {timeout}秒, 智能等待: {'開啟' if use_smart_wait else '關閉'})...")
             
+            # 讀取聊天工作階段檔案時，由保存的請求狀態判斷完成
+            if self.session_reader is not None:
+                self.stage_timings['wait_mode'] = "session"
+                return self._session_wait_for_response(timeout, use_smart_wait)
+            
+            # 讀取無障礙樹時，由 stop / send 按鈕與回應文字判斷完成，不需要截圖
+            if self.atspi_reader is not None:
+                self.stage_timings['wait_mode'] = "atspi"
+                return self._atspi_wait_for_response(timeout, use_smart_wait)
+            
+            # 追蹤擴充套件日誌時，由請求結束事件判斷完成，不需要截圖
+            if self.log_watcher is not None:
+                self.stage_timings['wait_mode'] = "copilot_log"
+                return self._log_wait_for_response(timeout, use_smart_wait)
+            
             if use_smart_wait:
+                if config.STATE_MONITOR_ENABLED:
+                    self.stage_timings['wait_mode'] = "monitor"
+                    return self._monitor_wait_for_response(timeout)
+                if config.SMART_WAIT_MODE == "visual":
+                    self.stage_timings['wait_mode'] = "visual"
+                    return self._visual_wait_for_response(timeout)
+                self.stage_timings['wait_mode'] = "clipboard"
                 return self._smart_wait_for_response(timeout)
             else:
+                self.stage_timings['wait_mode'] = "fixed"
                 # 使用固定等待時間，避免圖像識別複雜度
                 wait_time = min(timeout, 60)  # 最多等待60秒
                 
@@ -167,10 +228,435 @@ class CopilotHandler:
                 self.logger.copilot_interaction("回應等待完成", "SUCCESS", f"等待時間: {wait_time}秒")
                 return True
             
+        except AutomationError:
+            raise
         except Exception as e:
             self.logger.copilot_interaction("等待回應", "ERROR", str(e))
             return False
     
+    def _raise_copilot_error(self, category: str) -> None:
+        """
+        將畫面上檢測到的 Copilot 錯誤訊息轉換為對應的 AutomationError
+        
+        Args:
+            category: 錯誤類別（rate_limit / auth / transient）
+        """
+        self.image_recognition.save_diagnostic_frame(f"copilot_{category}")
+        if category == "rate_limit":
+            raise AutomationError("Copilot 使用量達到上限 (rate limited)", ErrorType.COPILOT_RATE_LIMIT,
+                                  recoverable=True, suggested_action=RecoveryAction.BACKOFF)
+        if category == "auth":
+            raise AutomationError("Copilot 需要登入", ErrorType.COPILOT_AUTH_ERROR,
+                                  recoverable=False, suggested_action=RecoveryAction.ABORT)
+        raise AutomationError(f"Copilot 回應錯誤 ({category})", ErrorType.COPILOT_TRANSIENT_ERROR,
+                              recoverable=True, suggested_action=RecoveryAction.RETRY)
+    
+    def start_session_capture(self, project_path: str) -> bool:
+        """
+        開始追蹤專案的聊天工作階段檔案（送出提示詞前呼叫，記錄已存在的請求）
+        
+        Args:
+            project_path: 以 VS Code 開啟的專案資料夾
+            
+        Returns:
+            bool: 是否找到專案的工作階段目錄（找不到時仍會在等待期間重新尋找）
+        """
+        self.session_reader = ChatSessionReader(project_path)
+        self.session_reader.mark_baseline()
+        if self.session_reader.storage_dir is None:
+            self.logger.warning(f"尚未找到專案的聊天工作階段目錄: {project_path}")
+            return False
+        return True
+    
+    def _session_wait_for_response(self, timeout: int, use_smart_wait: bool) -> bool:
+        """
+        讀取聊天工作階段檔案等待回應完成，不需要畫面檢測或剪貼簿
+        
+        STATE_MONITOR_START_TIMEOUT 內沒有出現新的請求時（例如找不到工作階段檔案或格式不同），
+        停止讀取檔案，剩餘時間改用原本的等待方式
+        
+        Args:
+            timeout: 超時時間（秒）
+            use_smart_wait: 改用原本等待方式時是否使用智能等待
+            
+        Returns:
+            bool: 是否成功等到回應
+        """
+        start_time = time.time()
+        reader = self.session_reader
+        
+        def abort_requested() -> bool:
+            return bool(self.error_handler and self.error_handler.emergency_stop_requested)
+        
+        self.logger.info(f"讀取聊天工作階段等待 Copilot 回應，最長等待 {timeout} 秒...")
+        response = reader.wait_for_completion(min(config.STATE_MONITOR_START_TIMEOUT, timeout), abort_requested)
+        if response is None and reader.last_response is None and not abort_requested():
+            self.logger.warning("⚠️ 工作階段檔案中沒有出現新的請求，改用原本的等待方式")
+            self.session_reader = None
+            remaining = max(1, int(timeout - (time.time() - start_time)))
+            return self.wait_for_response(remaining, use_smart_wait)
+        if response is None:
+            remaining = max(0.0, timeout - (time.time() - start_time))
+            response = reader.wait_for_completion(remaining, abort_requested)
+        if abort_requested():
+            self.logger.warning("收到中斷請求，停止等待 Copilot 回應")
+            return False
+        
+        if response is None:
+            self.logger.warning(f"⏰ 工作階段等待超時 ({timeout}秒)")
+            self.image_recognition.save_diagnostic_frame("response_timeout")
+            partial = reader.last_response
+            if partial is not None and len(partial.text.strip()) > 50:
+                self.logger.warning("💾 超時但有部分內容，嘗試使用現有回應")
+                self.last_response = partial.text
+                return True
+            self.logger.error("❌ 超時且無有效回應內容")
+            return False
+        
+        if response.error:
+            self.logger.error(f"Copilot 回應失敗: {response.error}")
+            message = response.error.lower()
+            if "rate limit" in message or "quota" in message:
+                self._raise_copilot_error("rate_limit")
+            if "sign in" in message or "auth" in message:
+                self._raise_copilot_error("auth")
+            self._raise_copilot_error("transient")
+        if response.canceled:
+            self.logger.warning("⚠️ Copilot 請求已被取消")
+        if not response.text.strip():
+            self.logger.error("❌ 回應已完成但沒有內容")
+            return False
+        
+        self.last_response = response.text
+        self.logger.info(f"🎉 完成等待！(工作階段檔案, {time.time() - start_time:.1f}秒, "
+                         f"{len(response.text)}字元, 解析 {reader.parse_count} 次)")
+        return True
+    
+    def start_log_capture(self) -> bool:
+        """
+        從目前的結尾開始追蹤 Copilot Chat 擴充套件日誌（送出提示詞前呼叫）
+        
+        Returns:
+            bool: 目前是否已有擴充套件日誌（還沒有時繼續等待擴充套件建立日誌，
+                  STATE_MONITOR_START_TIMEOUT 內沒有請求事件才改用畫面檢測）
+        """
+        self.log_watcher = CopilotLogWatcher()
+        if not self.log_watcher.mark():
+            self.logger.warning("尚未找到 Copilot Chat 擴充套件日誌，等待擴充套件建立日誌")
+            return False
+        return True
+    
+    def _log_wait_for_response(self, timeout: int, use_smart_wait: bool) -> bool:
+        """
+        等待擴充套件日誌中的請求結束事件
+        
+        STATE_MONITOR_START_TIMEOUT 內日誌沒有任何請求事件（例如日誌格式不同），或等待超時，
+        剩餘時間改用畫面檢測
+        
+        Args:
+            timeout: 超時時間（秒）
+            use_smart_wait: 改用畫面檢測時是否使用智能等待
+            
+        Returns:
+            bool: 是否成功等到回應
+        """
+        start_time = time.time()
+        watcher = self.log_watcher
+        self.log_watcher = None  # 改用畫面檢測時不再進入此流程
+        
+        def abort_requested() -> bool:
+            return bool(self.error_handler and self.error_handler.emergency_stop_requested)
+        
+        def remaining() -> int:
+            return max(1, int(timeout - (time.time() - start_time)))
+        
+        try:
+            self.logger.info(f"追蹤 Copilot Chat 日誌等待回應，最長等待 {timeout} 秒...")
+            if not watcher.wait_for_activity(min(config.STATE_MONITOR_START_TIMEOUT, timeout), abort_requested):
+                if abort_requested():
+                    self.logger.warning("收到中斷請求，停止等待 Copilot 回應")
+                    return False
+                self.logger.warning("⚠️ Copilot Chat 日誌沒有請求事件，改用畫面檢測")
+                return self.wait_for_response(remaining(), use_smart_wait)
+            
+            event = watcher.wait_for_finish(max(0.0, timeout - (time.time() - start_time)), abort_requested)
+            if abort_requested():
+                self.logger.warning("收到中斷請求，停止等待 Copilot 回應")
+                return False
+            if event is None:
+                self.logger.warning("⏰ Copilot Chat 日誌等待超時，改用畫面檢測確認")
+                return self.wait_for_response(remaining(), use_smart_wait)
+            
+            if event.status in ("failed", "error"):
+                self.logger.error(f"Copilot 請求失敗: {event.line.strip()}")
+                self._raise_copilot_error("transient")
+            
+            # 日誌記錄的結束時間到偵測到完成的延遲（含確認沒有後續請求的時間）
+            self._record_stage('log_completion_latency', max(0.0, time.time() - event.timestamp))
+            self.logger.info(f"🎉 完成等待！(Copilot Chat 日誌, {time.time() - start_time:.1f}秒, "
+                             f"{len(watcher.events)} 個事件, 狀態: {event.status})")
+            return True
+        finally:
+            watcher.close()
+    
+    def start_atspi_capture(self) -> bool:
+        """
+        開始讀取自動開啟的 VS Code 的無障礙樹（送出提示詞前呼叫，記錄目前最後一個聊天項目）
+        
+        Returns:
+            bool: 是否讀到聊天面板（讀不到時仍會在等待期間重試）
+        """
+        self._atspi_response = None
+        if self.vscode_pids is None:
+            self.logger.warning("未提供 VS Code 進程，無法讀取無障礙樹，改用原本的等待方式")
+            self.atspi_reader = None
+            return False
+        self.atspi_reader = AtspiChatReader(self.vscode_pids)
+        state = self.atspi_reader.read()
+        self._atspi_baseline = state.response_text if state is not None else ""
+        if state is None:
+            self.logger.warning("尚未讀到 VS Code 的無障礙樹（需以 --force-renderer-accessibility 啟動並安裝 AT-SPI）")
+            return False
+        return True
+    
+    def _atspi_wait_for_response(self, timeout: int, use_smart_wait: bool) -> bool:
+        """
+        讀取無障礙樹等待回應完成，不需要截圖、剪貼簿或切換焦點
+        
+        完成條件與畫面等待相同：看到 stop 按鈕後，send 按鈕出現且沒有 stop 按鈕，
+        並且回應文字持續 CHAT_PROGRESS_STABLE_SECONDS 秒沒有變化。
+        STATE_MONITOR_START_TIMEOUT 內都讀不到無障礙樹時，剩餘時間改用原本的等待方式
+        
+        Args:
+            timeout: 超時時間（秒）
+            use_smart_wait: 改用原本等待方式時是否使用智能等待
+            
+        Returns:
+            bool: 是否成功等到回應
+        """
+        start_time = time.time()
+        reader = self.atspi_reader
+        stable_seconds = config.CHAT_PROGRESS_STABLE_SECONDS
+        responding_seen = False
+        state_seen = False
+        last_text = None
+        stable_since = None
+        read_time = 0.0
+        reads = 0
+        
+        self.logger.info(f"讀取無障礙樹等待 Copilot 回應，最長等待 {timeout} 秒...")
+        while (time.time() - start_time) < timeout:
+            if self.error_handler and self.error_handler.emergency_stop_requested:
+                self.logger.warning("收到中斷請求，停止等待 Copilot 回應")
+                return False
+            
+            state = reader.read()
+            now = time.time()
+            if state is None:
+                if not state_seen and now - start_time >= config.STATE_MONITOR_START_TIMEOUT:
+                    self.logger.warning("⚠️ 讀不到 VS Code 的無障礙樹，改用原本的等待方式")
+                    self.atspi_reader = None
+                    remaining = max(1, int(timeout - (now - start_time)))
+                    return self.wait_for_response(remaining, use_smart_wait)
+                time.sleep(config.ATSPI_POLL_INTERVAL)
+                continue
+            state_seen = True
+            reads += 1
+            read_time += state.elapsed
+            
+            if state.response_text != last_text:
+                last_text = state.response_text
+                stable_since = now
+            
+            if state.has_stop_button:
+                if not responding_seen:
+                    self.logger.info("✅ 檢測到 Copilot 開始回應（stop 按鈕）")
+                    responding_seen = True
+            elif state.has_send_button:
+                started = responding_seen or now - start_time >= config.STATE_MONITOR_START_TIMEOUT
+                has_new_text = bool(last_text.strip()) and last_text != self._atspi_baseline
+                if started and has_new_text and now - stable_since >= stable_seconds:
+                    self._atspi_response = last_text
+                    self.last_response = last_text
+                    self._record_stage('atspi_read_time', read_time)
+                    self.logger.info(f"🎉 完成等待！(無障礙樹, {now - start_time:.1f}秒, {len(last_text)}字元, "
+                                     f"讀取 {reads} 次, 平均 {read_time / reads * 1000:.1f} ms)")
+                    return True
+            
+            time.sleep(config.ATSPI_POLL_INTERVAL)
+        
+        self._record_stage('atspi_read_time', read_time)
+        self.logger.warning(f"⏰ 無障礙樹等待超時 ({timeout}秒)")
+        if last_text and last_text != self._atspi_baseline and len(last_text.strip()) > 50:
+            self.logger.warning("💾 超時但有部分內容，嘗試使用現有回應")
+            self._atspi_response = last_text
+            self.last_response = last_text
+            return True
+        self.logger.error("❌ 超時且無有效回應內容")
+        return False
+    
+    def _monitor_wait_for_response(self, timeout: int) -> bool:
+        """
+        使用背景狀態監控等待 Copilot 回應完成
+        先等待 stop 按鈕出現（回應開始），再阻塞等待 idle 狀態事件
+        
+        Args:
+            timeout: 超時時間（秒）
+            
+        Returns:
+            bool: 是否成功等到回應
+        """
+        start_time = time.time()
+        
+        def abort_requested() -> bool:
+            return bool(self.error_handler and self.error_handler.emergency_stop_requested)
+        
+        monitor = self.image_recognition.start_state_monitor()
+        try:
+            self.logger.info(f"背景監控等待 Copilot 回應，最長等待 {timeout} 秒...")
+            
+            started = monitor.wait_for_state(
+                {CopilotUIState.RESPONDING, CopilotUIState.ERROR_BANNER},
+                min(config.STATE_MONITOR_START_TIMEOUT, timeout),
+                abort_requested
+            )
+            if abort_requested():
+                self.logger.warning("收到中斷請求，停止等待 Copilot 回應")
+                return False
+            if started == CopilotUIState.ERROR_BANNER:
+                # 使用確認狀態時的取樣；last_status 可能已被之後未確認的取樣覆寫
+                self._raise_copilot_error(monitor.state_status.error)
+            if started is None:
+                self.logger.warning("⚠️ 未檢測到 Copilot 開始回應（stop 按鈕），直接等待完成狀態")
+            else:
+                self.logger.info("✅ 檢測到 Copilot 開始回應")
+            
+            idle = None
+            while idle is None:
+                remaining = max(0.0, timeout - (time.time() - start_time))
+                state = monitor.wait_for_state(
+                    {CopilotUIState.IDLE, CopilotUIState.NOTIFICATION_OVERLAY, CopilotUIState.ERROR_BANNER},
+                    remaining, abort_requested
+                )
+                if abort_requested():
+                    self.logger.warning("收到中斷請求，停止等待 Copilot 回應")
+                    return False
+                if state is None:
+                    break
+                if state == CopilotUIState.ERROR_BANNER:
+                    self._raise_copilot_error(monitor.state_status.error)
+                if state == CopilotUIState.NOTIFICATION_OVERLAY:
+                    # 通知遮擋聊天區域，關閉後繼續等待
+                    self.image_recognition.save_diagnostic_frame("notification_overlay")
+                    self.image_recognition.clear_occluding_notifications(monitor.state_status)
+                    monitor.wait_for_state(
+                        {CopilotUIState.RESPONDING, CopilotUIState.IDLE, CopilotUIState.UNKNOWN},
+                        config.NOTIFICATION_CLEAR_SETTLE, abort_requested
+                    )
+                    continue
+                idle = state
+            
+            elapsed_time = time.time() - start_time
+            if idle is not None:
+                self.logger.info(f"🎉 完成等待！(背景監控, {elapsed_time:.1f}秒)")
+                return True
+            
+            # 超時時，如果有回應內容就使用，否則返回失敗
+            self.logger.warning(f"⏰ 背景監控等待超時 ({timeout}秒)")
+            self.image_recognition.save_diagnostic_frame("response_timeout")
+            partial_response = self._try_copy_response_without_logging()
+            if partial_response and len(partial_response.strip()) > 50:
+                self.logger.warning("💾 超時但有部分內容，嘗試使用現有回應")
+                self.last_response = partial_response
+                return True
+            
+            self.logger.error("❌ 超時且無有效回應內容")
+            return False
+            
+        except AutomationError:
+            raise
+        except Exception as e:
+            self.logger.error(f"背景監控等待時發生錯誤: {str(e)}")
+            return False
+        finally:
+            self.image_recognition.stop_state_monitor()
+    
+    def _visual_wait_for_response(self, timeout: int) -> bool:
+        """
+        只依畫面判斷 Copilot 回應完成，等待期間不做剪貼簿複製探測
+        
+        完成條件：send 按鈕出現且沒有 stop 按鈕，並且回應區域持續 CHAT_PROGRESS_STABLE_SECONDS 秒沒有變化；
+        未學習到回應區域時改為 send 按鈕持續出現同樣的時間。尚未看到 stop 按鈕時，
+        需超過 STATE_MONITOR_START_TIMEOUT 才接受完成（避免提示詞送出前的 send 按鈕被誤判）。
+        回應內容由呼叫端在完成後複製一次；只有超時時才在此複製部分內容
+        
+        Args:
+            timeout: 超時時間（秒）
+            
+        Returns:
+            bool: 是否成功等到回應
+        """
+        try:
+            self.logger.info(f"畫面等待 Copilot 回應，最長等待 {timeout} 秒...")
+            
+            start_time = time.time()
+            stable_seconds = config.CHAT_PROGRESS_STABLE_SECONDS
+            progress = ChatProgressTracker(self.image_recognition)
+            responding_seen = False
+            idle_since = None
+            
+            while (time.time() - start_time) < timeout:
+                if self.error_handler and self.error_handler.emergency_stop_requested:
+                    self.logger.warning("收到中斷請求，停止等待 Copilot 回應")
+                    return False
+                
+                copilot_status = self.image_recognition.check_copilot_response_status_with_auto_clear()
+                if copilot_status.get('error_state'):
+                    self._raise_copilot_error(copilot_status['error_state'])
+                streaming = progress.sample()
+                now = time.time()
+                
+                if copilot_status['has_stop_button']:
+                    if not responding_seen:
+                        self.logger.info("✅ 檢測到 Copilot 開始回應（stop 按鈕）")
+                        responding_seen = True
+                    idle_since = None
+                elif copilot_status['has_send_button'] and not streaming:
+                    if idle_since is None:
+                        idle_since = now
+                    started = responding_seen or now - start_time >= config.STATE_MONITOR_START_TIMEOUT
+                    # 回應區域已穩定 stable_seconds 秒（sample 返回 False）；無法取樣時以 send 按鈕持續時間判斷
+                    stable = streaming is False or (streaming is None and now - idle_since >= stable_seconds)
+                    # send 按鈕至少連續出現兩次檢測
+                    if started and stable and now - idle_since >= config.SMART_WAIT_VISUAL_INTERVAL:
+                        if not responding_seen:
+                            self.logger.warning("⚠️ 未檢測到 stop 按鈕，依 send 按鈕與畫面穩定判斷完成")
+                        self.logger.info(f"🎉 完成等待！(畫面判斷, {now - start_time:.1f}秒, "
+                                         f"回應區域變化 {progress.change_count} 次)")
+                        return True
+                else:
+                    idle_since = None
+                
+                time.sleep(config.SMART_WAIT_VISUAL_INTERVAL)
+            
+            # 超時時，如果有回應內容就使用，否則返回失敗
+            self.logger.warning(f"⏰ 畫面等待超時 ({timeout}秒)")
+            self.image_recognition.save_diagnostic_frame("response_timeout")
+            partial_response = self._try_copy_response_without_logging()
+            if partial_response and len(partial_response.strip()) > 50:
+                self.logger.warning("💾 超時但有部分內容，嘗試使用現有回應")
+                self.last_response = partial_response
+                return True
+            
+            self.logger.error("❌ 超時且無有效回應內容")
+            return False
+            
+        except AutomationError:
+            raise
+        except Exception as e:
+            self.logger.error(f"畫面等待時發生錯誤: {str(e)}")
+            return False
+    
     def _smart_wait_for_response(self, timeout: int) -> bool:
         """
         簡化的智能等待 Copilot 回應完成 (只使用圖像辨識和穩定性檢查)
@@ -197,6 +683,9 @@ class CopilotHandler:
             first_content_detected = False
             last_change_time = start_time
             
+            # 以回應區域畫面變化判斷是否仍在輸出，輸出中不透過剪貼簿複製探測
+            progress = ChatProgressTracker(self.image_recognition) if config.SMART_WAIT_VISUAL_PROGRESS else None
+            
             # 初始等待時間
             initial_wait = 2
             self.logger.info(f"初始等待 {initial_wait} 秒...")
@@ -210,6 +699,7 @@ class CopilotHandler:
                     return False
                 
                 # 使用新的自動清除通知的狀態檢查
+                copilot_status = {}
                 try:
                     copilot_status = self.image_recognition.check_copilot_response_status_with_auto_clear()
                     
@@ -217,6 +707,10 @@ class CopilotHandler:
                     if copilot_status.get('notifications_cleared', False):
                         self.logger.info("🔄 已清除 VS Code 通知，繼續檢測...")
                     
+                    # 畫面上出現錯誤訊息時立即結束等待
+                    if copilot_status.get('error_state'):
+                        self._raise_copilot_error(copilot_status['error_state'])
+                    
                     # 圖像檢測優先判斷
                     if copilot_status['has_send_button'] and not copilot_status['has_stop_button']:
                         # 檢測到 send 按鈕且沒有 stop 按鈕，認為回應完成
@@ -238,9 +732,22 @@ class CopilotHandler:
                     # 記錄詳細狀態
                     self.logger.debug(f"狀態: {copilot_status['status_message']}")
                     
+                except AutomationError:
+                    raise
                 except Exception as e:
                     self.logger.debug(f"圖像檢測錯誤: {e}")
                 
+                # 仍顯示 stop 按鈕或回應區域仍在變化時，跳過剪貼簿複製探測
+                if progress is not None:
+                    streaming = progress.sample()
+                    if copilot_status.get('has_stop_button') or streaming:
+                        if not first_content_detected and progress.change_count > 0:
+                            self.logger.info("✅ 檢測到 Copilot 開始回應（回應區域有變化）")
+                            first_content_detected = True
+                        self.logger.debug(f"回應輸出中 (變化列數: {progress.changed_rows})，跳過複製探測")
+                        time.sleep(check_interval)
+                        continue
+                
                 # 獲取並檢查回應內容穩定性
                 current_response = self._try_copy_response_without_logging()
                 elapsed_time = time.time() - start_time
@@ -314,6 +821,11 @@ class CopilotHandler:
             
             # 超時處理
             self.logger.warning(f"⏰ 智能等待超時 ({timeout}秒)")
+            self.image_recognition.save_diagnostic_frame("response_timeout")
+            
+            # 輸出期間跳過了複製探測，超時時補做一次
+            if progress is not None and not last_response:
+                last_response = self._try_copy_response_without_logging()
             
             # 超時時，如果有回應內容就使用，否則返回失敗
             if last_response and len(last_response.strip()) > 50:
@@ -324,6 +836,8 @@ class CopilotHandler:
                 self.logger.error("❌ 超時且無有效回應內容")
                 return False
             
+        except AutomationError:
+            raise
         except Exception as e:
             self.logger.error(f"智能等待時發生錯誤: {str(e)}")
             return False
@@ -359,6 +873,9 @@ class CopilotHandler:
         Returns:
             str: 回應內容，若複製失敗則返回空字串
         """
+        probe_start = time.perf_counter()
+        original_clipboard = ""
+        test_marker = ""
         try:
             # 保存當前剪貼簿內容
             original_clipboard = ""
@@ -404,6 +921,8 @@ class CopilotHandler:
                     pyperclip.copy(original_clipboard)
             except:
                 pass
+            self.stage_timings['clipboard_probes'] = self.stage_timings.get('clipboard_probes', 0) + 1
+            self._record_stage('clipboard_probe_time', time.perf_counter() - probe_start)
     
     def _try_copy_method_context_menu(self) -> str:
         """使用右鍵選單複製"""
@@ -506,6 +1025,28 @@ class CopilotHandler:
         Returns:
             Optional[str]: 回應內容，若複製失敗則返回 None
         """
+        # 已從聊天工作階段檔案讀到完成的回應時不需要鍵盤操作
+        session_response = self.session_reader.last_response if self.session_reader is not None else None
+        if session_response is not None and session_response.complete and session_response.text.strip():
+            self.last_response = session_response.text
+            self.logger.copilot_interaction("讀取回應", "SUCCESS",
+                                            f"工作階段檔案, 長度: {len(session_response.text)} 字元")
+            return session_response.text
+        
+        # 已從無障礙樹讀到回應時不需要鍵盤操作
+        if self.atspi_reader is not None and self._atspi_response:
+            self.last_response = self._atspi_response
+            self.logger.copilot_interaction("讀取回應", "SUCCESS",
+                                            f"無障礙樹, 長度: {len(self._atspi_response)} 字元")
+            return self._atspi_response
+        
+        # 以匯出聊天命令取得回應，失敗時才改用鍵盤操作複製
+        if config.RESPONSE_CAPTURE_BACKEND == "export":
+            response = self.export_response()
+            if response:
+                return response
+            self.logger.warning("匯出聊天失敗，改用鍵盤操作複製回應")
+        
         for attempt in range(config.COPILOT_COPY_RETRY_MAX):
             try:
                 self.logger.info(f"複製 Copilot 回應 (第 {attempt + 1}/{config.COPILOT_COPY_RETRY_MAX} 次)...")
@@ -560,6 +1101,89 @@ class CopilotHandler:
         self.logger.copilot_interaction("複製回應", "ERROR", f"重試 {config.COPILOT_COPY_RETRY_MAX} 次後仍然失敗")
         return None
     
+    def export_response(self, target: Path = None) -> Optional[str]:
+        """
+        以命令面板執行匯出聊天命令，將目前的聊天工作階段存成 JSON 後讀取最新的回應
+        
+        存檔對話框的檔名欄位以貼上的方式輸入產生的完整路徑（避免輸入法問題）
+        
+        Args:
+            target: 匯出檔案路徑，None 表示在 CHAT_EXPORT_DIR 下產生新的檔名
+            
+        Returns:
+            Optional[str]: 回應內容，匯出失敗或回應為空時返回 None
+        """
+        if target is None:
+            target = Path(config.CHAT_EXPORT_DIR) / f"chat_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        target = Path(target).resolve()
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists():
+                target.unlink()
+            
+            self.logger.info(f"匯出聊天工作階段: {target.name}")
+            
+            # 聚焦到 Copilot Chat，匯出命令作用於目前的聊天工作階段
+            pyautogui.hotkey('ctrl', 'shift', 'i')
+            time.sleep(0.5)
+            
+            # 命令面板執行匯出命令
+            pyautogui.hotkey('ctrl', 'shift', 'p')
+            time.sleep(1)
+            pyperclip.copy(config.CHAT_EXPORT_COMMAND)
+            pyautogui.hotkey('ctrl', 'v')
+            time.sleep(0.8)
+            pyautogui.press('enter')
+            time.sleep(config.CHAT_EXPORT_DIALOG_DELAY)
+            
+            # 存檔對話框：以完整路徑取代預設檔名
+            pyperclip.copy(str(target))
+            pyautogui.hotkey('ctrl', 'a')
+            time.sleep(0.2)
+            pyautogui.hotkey('ctrl', 'v')
+            time.sleep(0.3)
+            pyautogui.press('enter')
+            
+            data = self._wait_for_export(target, config.CHAT_EXPORT_TIMEOUT)
+            if data is None:
+                self.logger.copilot_interaction("匯出聊天", "ERROR", f"{config.CHAT_EXPORT_TIMEOUT} 秒內未產生 {target.name}")
+                # 存檔對話框可能仍開著
+                pyautogui.press('escape')
+                return None
+            
+            response = parse_session(data)
+            if response is None or not response.text.strip():
+                self.logger.copilot_interaction("匯出聊天", "ERROR", "匯出的工作階段沒有回應內容")
+                return None
+            if not response.complete:
+                self.logger.warning("⚠️ 匯出時回應尚未完成，使用目前的內容")
+            
+            self.last_response = response.text
+            self.logger.copilot_interaction("匯出聊天", "SUCCESS", f"長度: {len(response.text)} 字元")
+            return response.text
+            
+        except Exception as e:
+            self.logger.copilot_interaction("匯出聊天", "ERROR", str(e))
+            return None
+    
+    def _wait_for_export(self, path: Path, timeout: float) -> Optional[dict]:
+        """
+        等待匯出檔案出現並可完整解析
+        
+        Returns:
+            Optional[dict]: 匯出的工作階段，超時返回 None
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if path.exists():
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        return json.load(f)
+                except (OSError, ValueError):
+                    pass  # 仍在寫入
+            time.sleep(0.1)
+        return None
+    
     def test_vscode_close_ready(self) -> bool:
         """
         測試 VS Code 是否可以關閉（檢測 Copilot 是否已完成回應）
@@ -661,30 +1285,67 @@ class CopilotHandler:
             project_name = Path(project_path).name
             self.logger.create_separator(f"處理專案: {project_name}")
             
+            # 送出提示詞前記錄工作階段檔案中已存在的請求
+            self.session_reader = None
+            if config.RESPONSE_CAPTURE_BACKEND == "session":
+                self.start_session_capture(project_path)
+            self.atspi_reader = None
+            if config.RESPONSE_CAPTURE_BACKEND == "atspi":
+                self.start_atspi_capture()
+            self.log_watcher = None
+            if config.COPILOT_LOG_COMPLETION:
+                self.start_log_capture()
+            
             # 步驟1: 開啟 Copilot Chat
-            if not self.open_copilot_chat():
+            stage_start = time.perf_counter()
+            opened = self.open_copilot_chat()
+            self._record_stage('open_chat', time.perf_counter() - stage_start)
+            if not opened:
                 return False, "無法開啟 Copilot Chat"
             
             # 步驟2: 發送提示詞
-            if not self.send_prompt():
+            stage_start = time.perf_counter()
+            sent = self.send_prompt()
+            self._record_stage('send_prompt', time.perf_counter() - stage_start)
+            if not sent:
                 return False, "無法發送提示詞"
             
             # 步驟3: 等待回應 (使用指定的等待模式)
-            if not self.wait_for_response(use_smart_wait=use_smart_wait):
+            stage_start = time.perf_counter()
+            try:
+                completed = self.wait_for_response(use_smart_wait=use_smart_wait)
+            finally:
+                self._record_stage('wait_response', time.perf_counter() - stage_start)
+            if not completed:
                 return False, "等待回應超時"
             
             # 步驟4: 複製回應
+            stage_start = time.perf_counter()
             response = self.copy_response()
+            self._record_stage('copy_response', time.perf_counter() - stage_start)
             if not response:
                 return False, "無法複製回應內容"
             
             # 步驟5: 儲存到檔案
-            if not self.save_response_to_file(project_path, response, is_success=True):
+            stage_start = time.perf_counter()
+            saved = self.save_response_to_file(project_path, response, is_success=True)
+            self._record_stage('save_response', time.perf_counter() - stage_start)
+            if not saved:
                 return False, "無法儲存回應到檔案"
             
+            self.logger.info(f"⏱️ 階段耗時: {self.get_stage_timings()}")
+            
             self.logger.copilot_interaction("專案處理完成", "SUCCESS", project_name)
             return True, None
             
+        except AutomationError as e:
+            # Copilot 錯誤狀態交由呼叫端依錯誤類型退避或中止
+            self.logger.copilot_interaction("專案處理", "ERROR", e.message)
+            try:
+                self.save_response_to_file(project_path, e.message, is_success=False)
+            except:
+                pass
+            raise
         except Exception as e:
             error_msg = f"處理專案時發生錯誤: {str(e)}"
             self.logger.copilot_interaction("專案處理", "ERROR", error_msg)
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - Copilot Chat 擴充套件日誌追蹤模組
+Copilot Chat 擴充套件將每次模型請求的開始與結束寫入 user-data-dir/logs/<工作階段>/window<N>/exthost 下的日誌，
+從上次讀取的位置增量讀取新增的行，取得請求結束的精確時間，不需要截圖；
+Linux 上以 inotify 在檔案寫入時立即喚醒，其他平台以短間隔輪詢；
+擴充套件仍在啟動時日誌尚未建立，之後建立的日誌檔案也會被發現並從頭讀取
+"""
+
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Dict, Callable, Set
+import sys
+
+# 導入配置和日誌
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from src.logger import get_logger
+from src.chat_session_reader import default_user_data_dir
+
+# 日誌行開頭的時間戳，例如 "2025-01-10 12:34:56.789 [info] ..."
+TIMESTAMP_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)?)")
+
+# inotify 事件（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CREATE = 0x00000100
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")  # struct inotify_event 的固定部分：wd、mask、cookie、len
+
+# 定期重新尋找日誌檔案的間隔（秒），補足 inotify 無法監看尚未存在的目錄
+RESCAN_INTERVAL = 1.0
+
+@dataclass
+class LogEvent:
+    """日誌中的請求開始或結束"""
+    kind: str                  # "start" 或 "finish"
+    timestamp: float           # 日誌行記錄的時間（epoch 秒），無法解析時為讀取時間
+    status: Optional[str]      # 結束狀態（success / cancelled / failed ...）
+    line: str
+
+def find_copilot_logs(user_data_dir: Path = None) -> List[Path]:
+    """
+    找出最新一次 VS Code 執行的 Copilot Chat 擴充套件日誌
+
+    Args:
+        user_data_dir: VS Code 的 user-data-dir，None 表示使用配置值或預設位置
+
+    Returns:
+        List[Path]: 各視窗的日誌檔案（尚未開啟任何視窗時為空）
+    """
+    session = latest_log_session(user_data_dir)
+    if session is None:
+        return []
+    return sorted(session.glob(f"window*/exthost/{config.COPILOT_LOG_EXTENSION_DIR}/*.log"))
+
+def logs_root(user_data_dir: Path = None) -> Path:
+    """VS Code 的日誌根目錄（user-data-dir/logs）"""
+    return Path(user_data_dir or config.VSCODE_USER_DATA_DIR or default_user_data_dir()) / "logs"
+
+def latest_log_session(user_data_dir: Path = None) -> Optional[Path]:
+    """最新一次 VS Code 執行的日誌目錄，沒有任何執行紀錄時返回 None"""
+    sessions = sorted((path for path in logs_root(user_data_dir).glob("*") if path.is_dir()),
+                      key=lambda path: path.name)
+    return sessions[-1] if sessions else None
+
+def watch_directories(user_data_dir: Path = None) -> List[Path]:
+    """
+    需要監看的目錄：日誌根目錄、最新一次執行、各視窗與其 exthost 目錄，以及已存在的擴充套件日誌目錄
+    監看上層目錄才能在擴充套件第一次建立日誌目錄與檔案時收到 IN_CREATE
+    """
+    root = logs_root(user_data_dir)
+    if not root.is_dir():
+        return []
+    directories = [root]
+    session = latest_log_session(user_data_dir)
+    if session is not None:
+        directories.append(session)
+        for window in sorted(session.glob("window*")):
+            directories.append(window)
+            exthost = window / "exthost"
+            directories.append(exthost)
+            directories.append(exthost / config.COPILOT_LOG_EXTENSION_DIR)
+    return [directory for directory in directories if directory.is_dir()]
+
+def parse_log_line(line: str) -> Optional[LogEvent]:
+    """
+    解析一行日誌
+
+    Returns:
+        Optional[LogEvent]: 符合請求開始或結束樣式時返回事件，否則返回 None
+    """
+    finish = re.search(config.COPILOT_LOG_FINISH_PATTERN, line)
+    start = None if finish else re.search(config.COPILOT_LOG_START_PATTERN, line)
+    if finish is None and start is None:
+        return None
+
+    timestamp = time.time()
+    match = TIMESTAMP_PATTERN.match(line)
+    if match:
+        try:
+            timestamp = datetime.strptime(match.group(1).ljust(23, "0")[:23], "%Y-%m-%d %H:%M:%S.%f").timestamp()
+        except ValueError:
+            pass
+    if finish is not None:
+        status = finish.groupdict().get("status")
+        return LogEvent("finish", timestamp, status.lower() if status else None, line)
+    return LogEvent("start", timestamp, None, line)
+
+class LogTail:
+    """從上次讀取的位置增量讀取日誌檔案新增的完整行"""
+
+    def __init__(self, path: Path, from_end: bool = True):
+        self.path = Path(path)
+        self.offset = self.path.stat().st_size if from_end and self.path.exists() else 0
+        self._partial = b""
+
+    def read_lines(self) -> List[str]:
+        """讀取新增的完整行（最後一行尚未寫完時留到下次）"""
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return []
+        if size < self.offset:
+            # 日誌被截斷或輪替，從頭讀取
+            self.offset = 0
+            self._partial = b""
+        if size == self.offset:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+        data = self._partial + data
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+        return [line.decode("utf-8", errors="replace").rstrip("\r") for line in lines]
+
+class InotifyWatcher:
+    """以 inotify 等待目錄內的檔案寫入（僅 Linux）"""
+
+    def __init__(self, directories: List[Path]):
+        """
+        Raises:
+            OSError: 無法使用 inotify（非 Linux 或超過 watch 上限）
+        """
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or libc_name is None:
+            raise OSError("inotify 只支援 Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失敗")
+        try:
+            for directory in directories:
+                self.add(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def add(self, directory: Path) -> None:
+        """
+        監看目錄（重複加入同一目錄沒有影響）
+
+        Raises:
+            OSError: 目錄不存在或超過 watch 上限
+        """
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(str(directory)),
+                                        IN_MODIFY | IN_CREATE | IN_MOVED_TO) < 0:
+            raise OSError(ctypes.get_errno(), f"無法監看 {directory}")
+
+    def wait(self, timeout: float) -> int:
+        """
+        等待任何監看中的檔案變動
+
+        Returns:
+            int: 期間所有事件的 mask 聯集（逾時返回 0）
+        """
+        readable, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not readable:
+            return 0
+        # 清空事件佇列，只保留事件種類（實際內容由 LogTail 讀取）
+        mask = 0
+        try:
+            while True:
+                data = os.read(self.fd, 4096)
+                if not data:
+                    break
+                offset = 0
+                while offset + INOTIFY_EVENT.size <= len(data):
+                    _, event_mask, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+                    mask |= event_mask
+                    offset += INOTIFY_EVENT.size + name_length
+        except BlockingIOError:
+            pass
+        return mask
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class CopilotLogWatcher:
+    """追蹤 Copilot Chat 擴充套件日誌，等待送出提示詞後的請求結束"""
+
+    def __init__(self, user_data_dir: Path = None):
+        """
+        初始化日誌追蹤
+
+        Args:
+            user_data_dir: VS Code 的 user-data-dir，None 表示使用配置值或預設位置
+        """
+        self.logger = get_logger("CopilotLogWatcher")
+        self.user_data_dir = user_data_dir
+        self.tails: Dict[Path, LogTail] = {}
+        self.watcher: Optional[InotifyWatcher] = None
+        self.events: List[LogEvent] = []
+        self.last_activity = 0.0     # 最後一次讀到請求開始或結束的時間（monotonic）
+        self.finished: Optional[LogEvent] = None
+        self._watched: Set[Path] = set()
+        self._last_scan = 0.0
+        self._rescan_requested = False
+
+    def mark(self) -> bool:
+        """
+        從目前的日誌結尾開始追蹤（送出提示詞前呼叫）
+        之後才建立的日誌檔案（例如擴充套件仍在啟動）在 poll 時被發現並從頭讀取
+
+        Returns:
+            bool: 目前是否已有擴充套件日誌
+        """
+        self.close()
+        self.tails = {}
+        self.events = []
+        self.finished = None
+        self._watched = set()
+        try:
+            self.watcher = InotifyWatcher([])
+        except OSError as e:
+            self.logger.debug(f"無法使用 inotify，改為輪詢: {str(e)}")
+            self.watcher = None
+        self._discover(from_end=True)
+        self.logger.info(f"追蹤 Copilot Chat 日誌: {len(self.tails)} 個檔案 "
+                         f"({'inotify' if self.watcher else '輪詢'})")
+        return bool(self.tails)
+
+    def _discover(self, from_end: bool = False) -> None:
+        """尋找新的日誌檔案與需要監看的目錄；mark 之後才出現的檔案從頭讀取"""
+        self._last_scan = time.monotonic()
+        self._rescan_requested = False
+        if self.watcher is not None:
+            for directory in watch_directories(self.user_data_dir):
+                if directory in self._watched:
+                    continue
+                try:
+                    self.watcher.add(directory)
+                    self._watched.add(directory)
+                except OSError as e:
+                    self.logger.debug(f"無法監看 {directory}: {str(e)}")
+        for path in find_copilot_logs(self.user_data_dir):
+            if path not in self.tails:
+                self.tails[path] = LogTail(path, from_end=from_end)
+                if not from_end:
+                    self.logger.info(f"發現新的 Copilot Chat 日誌: {path}")
+
+    def poll(self) -> List[LogEvent]:
+        """讀取所有日誌新增的行（必要時先尋找新的日誌檔案），返回新的請求事件"""
+        if self._rescan_requested or time.monotonic() - self._last_scan >= RESCAN_INTERVAL:
+            self._discover()
+        events = []
+        for tail in self.tails.values():
+            for line in tail.read_lines():
+                event = parse_log_line(line)
+                if event is not None:
+                    events.append(event)
+        if events:
+            self.last_activity = time.monotonic()
+            self.events.extend(events)
+            for event in events:
+                self.logger.debug(f"Copilot 日誌事件: {event.kind} {event.status or ''}")
+                if event.kind == "finish":
+                    self.finished = event
+                else:
+                    # 代理模式一次提示詞可能包含多個模型請求，新的請求開始時前一個結束不算完成
+                    self.finished = None
+        return events
+
+    def _wait_for_change(self, timeout: float) -> None:
+        if self.watcher is not None:
+            if self.watcher.wait(timeout) & (IN_CREATE | IN_MOVED_TO):
+                self._rescan_requested = True
+        else:
+            time.sleep(min(timeout, config.COPILOT_LOG_POLL_INTERVAL))
+
+    def wait_for_activity(self, timeout: float, abort: Callable[[], bool] = None) -> bool:
+        """
+        等待日誌出現任何請求事件
+
+        Returns:
+            bool: 是否出現事件
+        """
+        deadline = time.monotonic() + timeout
+        while not self.events:
+            if self.poll():
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (abort is not None and abort()):
+                return False
+            self._wait_for_change(min(remaining, 0.5))
+        return True
+
+    def wait_for_finish(self, timeout: float, abort: Callable[[], bool] = None,
+                        settle: float = None) -> Optional[LogEvent]:
+        """
+        等待請求結束，且之後 settle 秒內沒有新的請求
+
+        Args:
+            timeout: 最長等待時間（秒）
+            abort: 返回 True 時停止等待
+            settle: 請求結束後確認沒有後續請求的時間（秒）
+
+        Returns:
+            Optional[LogEvent]: 最後一個請求的結束事件，超時或中斷時返回 None
+        """
+        settle = config.COPILOT_LOG_SETTLE_SECONDS if settle is None else settle
+        deadline = time.monotonic() + timeout
+        while True:
+            self.poll()
+            now = time.monotonic()
+            if self.finished is not None and now - self.last_activity >= settle:
+                return self.finished
+            if now >= deadline or (abort is not None and abort()):
+                return None
+            wait = deadline - now
+            if self.finished is not None:
+                wait = min(wait, settle - (now - self.last_activity))
+            self._wait_for_change(min(wait, 0.5))
+
+    def close(self) -> None:
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - 檢測統計模組
+記錄每個模板的截圖耗時、匹配耗時、最佳分數、命中率與 ROI / 全螢幕搜尋次數，
+以直方圖保存，每個專案輸出到摘要報告
+"""
+
+import bisect
+import threading
+from typing import Dict, Sequence
+
+# 耗時直方圖區間上限（毫秒）
+TIME_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# 分數直方圖區間上限
+SCORE_BUCKETS = tuple(round(0.05 * i, 2) for i in range(1, 21))
+# 命中分數距離閾值在此範圍內視為接近閾值（主題或縮放變動時分數會往閾值靠近）
+NEAR_THRESHOLD_MARGIN = 0.03
+
+class Histogram:
+    """固定區間直方圖"""
+
+    def __init__(self, bounds: Sequence[float]):
+        """
+        初始化直方圖
+
+        Args:
+            bounds: 各區間上限（遞增），超過最後一個上限的數值歸入溢位區間
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value: float) -> None:
+        """加入一個數值"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def percentile(self, q: float) -> float:
+        """以區間上限估計百分位數"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.bounds[index] if index < len(self.bounds) else self.maximum
+        return self.maximum
+
+    def to_dict(self, digits: int = 3) -> Dict:
+        """轉換為報告格式"""
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, digits) if self.count else 0.0,
+            'min': round(self.minimum, digits) if self.minimum is not None else None,
+            'max': round(self.maximum, digits) if self.maximum is not None else None,
+            'p50': round(self.percentile(0.5), digits),
+            'p95': round(self.percentile(0.95), digits),
+            'buckets': {label: count for label, count in zip(labels, self.counts) if count}
+        }
+
+class TemplateMetrics:
+    """單一模板的匹配統計"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.roi_searches = 0
+        self.roi_hits = 0
+        self.full_searches = 0
+        self.near_threshold_hits = 0
+        self.match_time_ms = Histogram(TIME_BUCKETS_MS)
+        self.scores = Histogram(SCORE_BUCKETS)
+        self.hit_scores = Histogram(SCORE_BUCKETS)
+
+    def to_dict(self) -> Dict:
+        return {
+            'attempts': self.attempts,
+            'hits': self.hits,
+            'hit_rate': round(self.hits / self.attempts, 4) if self.attempts else 0.0,
+            'roi_searches': self.roi_searches,
+            'roi_hits': self.roi_hits,
+            'full_searches': self.full_searches,
+            'near_threshold_hits': self.near_threshold_hits,
+            'match_time_ms': self.match_time_ms.to_dict(),
+            'best_score': self.scores.to_dict(4),
+            'hit_score': self.hit_scores.to_dict(4)
+        }
+
+class DetectionMetrics:
+    """檢測流程統計（背景監控與呼叫端可能同時記錄，以鎖保護）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """清除統計（每個專案開始時呼叫）"""
+        with self._lock:
+            self.detections = 0
+            self.cache_hits = 0
+            self.states: Dict[str, int] = {}
+            self.capture_time_ms = Histogram(TIME_BUCKETS_MS)
+            self.detection_time_ms = Histogram(TIME_BUCKETS_MS)
+            self.templates: Dict[str, TemplateMetrics] = {}
+
+    def record_match(self, name: str, score: float, found: bool, roi_searched: bool,
+                     full_searched: bool, used_roi: bool, match_time: float, confidence: float) -> None:
+        """
+        記錄單一模板的匹配結果
+
+        Args:
+            name: 模板名稱
+            score: 最佳匹配分數
+            found: 是否找到
+            roi_searched: 是否在 ROI 內搜尋
+            full_searched: 是否搜尋整張截圖
+            used_roi: 是否在 ROI 內命中
+            match_time: 匹配耗時（秒）
+            confidence: 使用的信心度閾值
+        """
+        with self._lock:
+            metrics = self.templates.setdefault(name, TemplateMetrics())
+            metrics.attempts += 1
+            metrics.roi_searches += int(roi_searched)
+            metrics.full_searches += int(full_searched)
+            metrics.match_time_ms.add(match_time * 1000)
+            metrics.scores.add(score)
+            if found:
+                metrics.hits += 1
+                metrics.roi_hits += int(used_roi)
+                metrics.hit_scores.add(score)
+                if score < confidence + NEAR_THRESHOLD_MARGIN:
+                    metrics.near_threshold_hits += 1
+
+    def record_detection(self, state: str, capture_time: float, match_time: float,
+                         from_cache: bool) -> None:
+        """
+        記錄一次狀態檢測
+
+        Args:
+            state: 檢測到的 UI 狀態
+            capture_time: 截圖耗時（秒）
+            match_time: 模板匹配耗時（秒）
+            from_cache: 是否沿用上次結果
+        """
+        with self._lock:
+            self.detections += 1
+            self.cache_hits += int(from_cache)
+            self.states[state] = self.states.get(state, 0) + 1
+            if capture_time:
+                self.capture_time_ms.add(capture_time * 1000)
+            self.detection_time_ms.add((capture_time + match_time) * 1000)
+
+    def snapshot(self) -> Dict:
+        """取得統計報告"""
+        with self._lock:
+            return {
+                'detections': self.detections,
+                'cache_hits': self.cache_hits,
+                'states': dict(self.states),
+                'capture_time_ms': self.capture_time_ms.to_dict(),
+                'detection_time_ms': self.detection_time_ms.to_dict(),
+                'templates': {name: metrics.to_dict() for name, metrics in self.templates.items()}
+            }
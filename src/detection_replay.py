@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - 檢測錄製與重播模組
+實際執行時將檢測用的畫面（或聊天區域）壓縮保存到磁碟上的環狀緩衝，
+離線時再將這些畫面餵回圖像辨識，統計每張畫面的耗時、判斷結果與標註的準確度
+"""
+
+import json
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple, List, Dict, Deque
+import sys
+
+import cv2
+import numpy as np
+
+# 導入配置和日誌
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from src.logger import get_logger
+
+INDEX_FILE = "index.jsonl"
+LABELS_FILE = "labels.json"
+
+@dataclass
+class FrameRecord:
+    """錄製畫面的索引資料"""
+    seq: int
+    file: str
+    timestamp: float
+    origin: Tuple[int, int]                  # 畫面左上角的螢幕座標
+    screen_size: Tuple[int, int]             # 錄製時的螢幕解析度 (寬, 高)
+    decision: str                            # 錄製當下的檢測結果（CopilotUIState 值）
+    scores: Dict[str, float]
+    label: Optional[str] = None              # 人工標註的正確狀態
+
+class FrameRecorder:
+    """
+    檢測畫面錄製器
+    每個錄製階段一個資料夾，畫面以 PNG 壓縮保存，超過上限時刪除最舊的畫面
+    """
+
+    def __init__(self, session_name: str = None, root: Path = None, max_frames: int = None,
+                 compression: int = None):
+        """
+        初始化錄製器
+
+        Args:
+            session_name: 錄製階段名稱（通常為專案名稱）
+            root: 錄製資料根目錄
+            max_frames: 磁碟上最多保留的畫面數
+            compression: PNG 壓縮等級（0-9）
+        """
+        self.logger = get_logger("FrameRecorder")
+        self.max_frames = max(1, max_frames or config.DETECTION_RECORD_MAX_FRAMES)
+        self.compression = config.DETECTION_RECORD_PNG_COMPRESSION if compression is None else compression
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        folder = f"{session_name}_{timestamp}" if session_name else timestamp
+        self.session_dir = Path(root or config.DETECTION_RECORD_DIR) / folder
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.session_dir / INDEX_FILE
+
+        self.frame_count = 0
+        self.dropped_count = 0
+        self._files: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self.logger.info(f"開始錄製檢測畫面: {self.session_dir}")
+
+    def record(self, frame: np.ndarray, status, origin: Tuple[int, int] = (0, 0),
+               screen_size: Tuple[int, int] = None) -> Optional[FrameRecord]:
+        """
+        壓縮保存一張畫面並寫入索引
+
+        Args:
+            frame: 檢測用的畫面（BGR 或灰階）
+            status: 此畫面的 DetectionStatus
+            origin: 畫面左上角的螢幕座標
+            screen_size: 螢幕解析度 (寬, 高)
+
+        Returns:
+            Optional[FrameRecord]: 寫入的索引資料，失敗時為 None
+        """
+        try:
+            ok, encoded = cv2.imencode(".png", frame, [cv2.IMWRITE_PNG_COMPRESSION, self.compression])
+            if not ok:
+                raise ValueError("PNG 編碼失敗")
+
+            with self._lock:
+                self.frame_count += 1
+                record = FrameRecord(
+                    seq=self.frame_count,
+                    file=f"frame_{self.frame_count:06d}.png",
+                    timestamp=status.timestamp or time.time(),
+                    origin=tuple(origin),
+                    screen_size=tuple(screen_size or (frame.shape[1], frame.shape[0])),
+                    decision=status.state.value,
+                    scores={name: round(score, 4) for name, score in status.to_dict()['scores'].items()}
+                )
+                (self.session_dir / record.file).write_bytes(encoded.tobytes())
+                with open(self.index_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+
+                self._files.append(record.file)
+                while len(self._files) > self.max_frames:
+                    (self.session_dir / self._files.popleft()).unlink(missing_ok=True)
+                    self.dropped_count += 1
+            return record
+
+        except Exception as e:
+            self.logger.debug(f"錄製檢測畫面失敗: {str(e)}")
+            return None
+
+    def close(self) -> None:
+        """結束錄製"""
+        self.logger.info(f"錄製結束: 共 {self.frame_count} 張，保留 {len(self._files)} 張")
+
+def load_corpus(session_dir: Path) -> List[FrameRecord]:
+    """
+    讀取錄製資料夾的索引，已被環狀緩衝刪除的畫面會略過
+    標註可寫在索引的 label 欄位，或另存於 labels.json（檔名 -> 狀態）
+    """
+    session_dir = Path(session_dir)
+    labels: Dict[str, str] = {}
+    labels_path = session_dir / LABELS_FILE
+    if labels_path.exists():
+        with open(labels_path, 'r', encoding='utf-8') as f:
+            labels = json.load(f)
+
+    records = []
+    with open(session_dir / INDEX_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            data['origin'] = tuple(data['origin'])
+            data['screen_size'] = tuple(data['screen_size'])
+            record = FrameRecord(**data)
+            record.label = labels.get(record.file, record.label)
+            if (session_dir / record.file).exists():
+                records.append(record)
+    return records
+
+class DetectionReplay:
+    """將錄製的畫面重新餵給圖像辨識，統計耗時與準確度"""
+
+    def __init__(self, recognizer=None, use_frame_gate: bool = True):
+        """
+        初始化重播器
+
+        Args:
+            recognizer: 圖像辨識器，None 時建立獨立的實例（學習到的 ROI 寫入暫存檔，不影響本機快取）
+            use_frame_gate: 是否保留畫面變動閘門（關閉時每張畫面都重新匹配）
+        """
+        if recognizer is None:
+            from src.image_recognition import ImageRecognition
+            roi_file = Path(tempfile.mkdtemp(prefix="detection_replay_")) / "learned_rois.json"
+            recognizer = ImageRecognition(learned_roi_file=roi_file)
+        self.recognizer = recognizer
+        self.use_frame_gate = use_frame_gate
+        self.logger = get_logger("DetectionReplay")
+
+    def run(self, session_dir: Path) -> Dict:
+        """
+        重播一個錄製資料夾
+
+        Returns:
+            Dict: 每張畫面的結果（frames）與彙總統計（summary）
+        """
+        session_dir = Path(session_dir)
+        read_flag = cv2.IMREAD_GRAYSCALE if config.DETECTION_GRAYSCALE else cv2.IMREAD_COLOR
+        results = []
+
+        for record in load_corpus(session_dir):
+            frame = cv2.imread(str(session_dir / record.file), read_flag)
+            if frame is None:
+                self.logger.warning(f"無法讀取畫面: {record.file}")
+                continue
+
+            if not self.use_frame_gate:
+                self.recognizer.reset_frame_gate()
+
+            start = time.perf_counter()
+            status = self.recognizer.detect_copilot_state(frame, origin=record.origin,
+                                                          screen_size=record.screen_size)
+            latency = (time.perf_counter() - start) * 1000
+
+            decision = status.state.value
+            results.append({
+                'seq': record.seq,
+                'file': record.file,
+                'latency_ms': round(latency, 3),
+                'decision': decision,
+                'recorded_decision': record.decision,
+                'label': record.label,
+                'correct': None if record.label is None else decision == record.label,
+                'from_cache': status.from_cache,
+                'scores': {name: round(score, 4) for name, score in status.to_dict()['scores'].items()}
+            })
+
+        return {'session': str(session_dir), 'frames': results, 'summary': summarize(results)}
+
+def summarize(results: List[Dict]) -> Dict:
+    """彙總重播結果：耗時分布、判斷分布、與錄製時判斷的差異及標註準確度"""
+    if not results:
+        return {'frames': 0}
+
+    latencies = sorted(r['latency_ms'] for r in results)
+    labelled = [r for r in results if r['label'] is not None]
+    confusion = Counter(f"{r['label']}->{r['decision']}" for r in labelled if not r['correct'])
+
+    return {
+        'frames': len(results),
+        'latency_mean_ms': round(statistics.mean(latencies), 3),
+        'latency_median_ms': round(statistics.median(latencies), 3),
+        'latency_p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'latency_max_ms': latencies[-1],
+        'cache_hits': sum(1 for r in results if r['from_cache']),
+        'decisions': dict(Counter(r['decision'] for r in results)),
+        'changed_from_recording': sum(1 for r in results if r['decision'] != r['recorded_decision']),
+        'labelled': len(labelled),
+        'accuracy': round(sum(1 for r in labelled if r['correct']) / len(labelled), 4) if labelled else None,
+        'errors': dict(confusion)
+    }
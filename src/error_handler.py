@@ -27,6 +27,9 @@ class ErrorType(Enum):
     SYSTEM_ERROR = "system_error"
     USER_INTERRUPT = "user_interrupt"
     TIMEOUT_ERROR = "timeout_error"
+    COPILOT_RATE_LIMIT = "copilot_rate_limit"            # Copilot 使用量達到上限
+    COPILOT_AUTH_ERROR = "copilot_auth_error"            # Copilot 需要登入
+    COPILOT_TRANSIENT_ERROR = "copilot_transient_error"  # Copilot 暫時性錯誤（網路等）
     UNKNOWN_ERROR = "unknown_error"
 
 class RecoveryAction(Enum):
@@ -37,6 +40,7 @@ class RecoveryAction(Enum):
     CLEAN_ENVIRONMENT = "clean_environment"
     ABORT = "abort"
     CONTINUE = "continue"
+    BACKOFF = "backoff"  # 長時間等待後重試
 
 class AutomationError(Exception):
     """自動化腳本專用異常類"""
@@ -118,6 +122,13 @@ class ErrorHandler:
             
             # 記錄到日誌
             self.logger.error(f"[{error_type.value}] {context}: {str(error)}")
+            self._save_error_frame(error_type)
+            
+            # 未登入時後續專案也會失敗，停止整個執行
+            if error_type == ErrorType.COPILOT_AUTH_ERROR:
+                self.logger.emergency_stop("Copilot 需要登入，停止處理後續專案")
+                self.emergency_stop_requested = True
+                return RecoveryAction.ABORT
             
             # 檢查是否需要緊急停止
             if self._should_emergency_stop():
@@ -132,6 +143,17 @@ class ErrorHandler:
             self.logger.critical(f"錯誤處理器本身發生錯誤: {str(handler_error)}")
             return RecoveryAction.ABORT
     
+    def _save_error_frame(self, error_type: ErrorType) -> None:
+        """保存錯誤發生當下的畫面（背景寫入，失敗不影響錯誤處理）"""
+        if not config.FRAME_DUMP_ENABLED or error_type == ErrorType.USER_INTERRUPT:
+            return
+        try:
+            # 延遲導入：圖像辨識模組較重，且只有實際發生錯誤時才需要
+            from src.image_recognition import image_recognition
+            image_recognition.save_diagnostic_frame(f"error_{error_type.value}")
+        except Exception as e:
+            self.logger.debug(f"無法保存錯誤畫面: {str(e)}")
+    
     def _classify_error(self, error: Exception) -> ErrorType:
         """
         分類錯誤類型
@@ -181,6 +203,12 @@ class ErrorHandler:
             return RecoveryAction.RESTART_VSCODE
         elif error_type == ErrorType.COPILOT_ERROR:
             return RecoveryAction.RETRY
+        elif error_type == ErrorType.COPILOT_RATE_LIMIT:
+            return RecoveryAction.BACKOFF
+        elif error_type == ErrorType.COPILOT_AUTH_ERROR:
+            return RecoveryAction.ABORT
+        elif error_type == ErrorType.COPILOT_TRANSIENT_ERROR:
+            return RecoveryAction.RETRY
         elif error_type == ErrorType.IMAGE_RECOGNITION_ERROR:
             return RecoveryAction.RETRY
         elif error_type == ErrorType.PROJECT_ERROR:
@@ -239,6 +267,24 @@ class ErrorHandler:
             "last_error": self.error_history[-1] if self.error_history else None
         }
 
+def interruptible_sleep(seconds: float, error_handler: ErrorHandler = None) -> bool:
+    """
+    分段等待，收到中斷請求時提前結束
+    
+    Args:
+        seconds: 等待時間（秒）
+        error_handler: 檢查 emergency_stop_requested 的錯誤處理器，None 表示不檢查
+        
+    Returns:
+        bool: 是否完整等待（False 表示收到中斷請求）
+    """
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        if error_handler is not None and error_handler.emergency_stop_requested:
+            return False
+        time.sleep(max(0.0, min(1.0, deadline - time.time())))
+    return True
+
 class RetryHandler:
     """重試處理器"""
     
@@ -294,15 +340,21 @@ class RetryHandler:
                         self.logger.warning(f"⏭️ {context} 跳過此次嘗試")
                         return False, None
                     
-                    self.logger.warning(f"⏱️ {context} 等待 {delay:.1f} 秒後重試...")
-                    time.sleep(delay)
+                    wait_time = delay
+                    if recovery_action == RecoveryAction.BACKOFF:
+                        wait_time = max(delay, config.COPILOT_RATE_LIMIT_BACKOFF)
+                    
+                    self.logger.warning(f"⏱️ {context} 等待 {wait_time:.1f} 秒後重試...")
+                    if not interruptible_sleep(wait_time, self.error_handler):
+                        self.logger.warning(f"收到中斷請求，停止重試 {context}")
+                        return False, None
                     delay *= backoff_factor
                 else:
                     self.logger.error(f"❌ {context} 達到最大重試次數，放棄執行")
                     return False, None
         
         return False, None
-
+    
 def error_handler_decorator(error_type: ErrorType = ErrorType.UNKNOWN_ERROR,
                           recoverable: bool = True,
                           suggested_action: RecoveryAction = RecoveryAction.RETRY):
@@ -333,9 +385,15 @@ def error_handler_decorator(error_type: ErrorType = ErrorType.UNKNOWN_ERROR,
 class RecoveryManager:
     """恢復管理器"""
     
-    def __init__(self):
-        """初始化恢復管理器"""
+    def __init__(self, error_handler: ErrorHandler = None):
+        """
+        初始化恢復管理器
+        
+        Args:
+            error_handler: 錯誤處理器，長時間等待期間檢查其中斷請求
+        """
         self.logger = get_logger("RecoveryManager")
+        self.error_handler = error_handler
         self.logger.info("恢復管理器初始化完成")
     
     def execute_recovery_action(self, action: RecoveryAction, context: str = "") -> bool:
@@ -379,6 +437,13 @@ class RecoveryManager:
                 # 繼續執行
                 return True
                 
+            elif action == RecoveryAction.BACKOFF:
+                # 長時間等待後重試（例如 Copilot rate limit），收到中斷請求時提前結束
+                if not interruptible_sleep(config.COPILOT_RATE_LIMIT_BACKOFF, self.error_handler):
+                    self.logger.warning("收到中斷請求，停止等待")
+                    return False
+                return True
+                
             else:
                 self.logger.warning(f"未知的恢復動作: {action.value}")
                 return False
@@ -416,7 +481,7 @@ class RecoveryManager:
 # 創建全域實例
 error_handler = ErrorHandler()
 retry_handler = RetryHandler(error_handler)
-recovery_manager = RecoveryManager()
+recovery_manager = RecoveryManager(error_handler)
 
 # 便捷函數
 def handle_error(error: Exception, context: str = "") -> RecoveryAction:
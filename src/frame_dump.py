@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - 診斷畫面背景寫入模組
+異常發生時的截圖交由背景執行緒壓縮並寫入磁碟，UI 等待迴圈只需把畫面放入佇列；
+佇列以畫面數與總位元組數限制記憶體用量，寫入的檔案超過磁碟配額時刪除最舊的檔案
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Deque, Tuple, Dict
+import sys
+
+import cv2
+import numpy as np
+
+# 導入配置和日誌
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from src.logger import get_logger
+
+# 支援的壓縮格式（副檔名）
+IMAGE_FORMATS = ("webp", "png", "jpg")
+
+class FrameDumpWriter:
+    """
+    診斷畫面背景寫入器
+    submit() 不做任何編碼或磁碟操作；佇列已滿或超過記憶體上限時直接捨棄該畫面並計數
+    """
+
+    def __init__(self, root: Path = None, image_format: str = None, queue_size: int = None,
+                 max_queued_bytes: int = None, quota_bytes: int = None):
+        """
+        初始化寫入器
+
+        Args:
+            root: 診斷畫面根目錄（未指定檔案路徑時寫入此處，並計入磁碟配額）
+            image_format: 壓縮格式（webp / png / jpg）
+            queue_size: 佇列中最多等待寫入的畫面數
+            max_queued_bytes: 佇列中畫面的總位元組上限
+            quota_bytes: 根目錄內診斷畫面的磁碟配額
+        """
+        self.logger = get_logger("FrameDumpWriter")
+        self.root = Path(root or config.FRAME_DUMP_DIR)
+        self.image_format = (image_format or config.FRAME_DUMP_FORMAT).lower().lstrip(".")
+        if self.image_format not in IMAGE_FORMATS:
+            self.logger.warning(f"不支援的診斷畫面格式 {self.image_format}，改用 png")
+            self.image_format = "png"
+        self.max_queued_bytes = (config.FRAME_DUMP_MAX_QUEUED_MB * 1024 * 1024
+                                 if max_queued_bytes is None else max_queued_bytes)
+        self.quota_bytes = (config.FRAME_DUMP_DISK_QUOTA_MB * 1024 * 1024
+                            if quota_bytes is None else quota_bytes)
+
+        self._queue: "queue.Queue[Optional[Tuple[np.ndarray, Path]]]" = queue.Queue(
+            maxsize=max(1, queue_size or config.FRAME_DUMP_QUEUE_SIZE))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._files: Optional[Deque[Tuple[Path, int]]] = None  # 根目錄內的檔案（由舊到新）
+        self._disk_bytes = 0
+        self.queued_bytes = 0
+        self.written_count = 0
+        self.written_bytes = 0
+        self.dropped_count = 0
+        self.evicted_count = 0
+        self.failed_count = 0
+
+    def submit(self, frame: np.ndarray, path: Path = None, reason: str = None) -> Optional[Path]:
+        """
+        將畫面放入寫入佇列（呼叫端之後不得再修改此陣列）
+
+        Args:
+            frame: BGR 或灰階畫面
+            path: 檔案路徑，None 表示依時間與原因命名並寫入根目錄
+            reason: 檔名中的原因說明
+
+        Returns:
+            Optional[Path]: 將寫入的檔案路徑，畫面被捨棄時返回 None
+        """
+        if frame is None:
+            return None
+        if path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+            name = f"{timestamp}_{reason}" if reason else timestamp
+            path = self.root / f"{name}.{self.image_format}"
+        path = Path(path)
+
+        with self._lock:
+            if self.queued_bytes + frame.nbytes > self.max_queued_bytes:
+                self.dropped_count += 1
+                self.logger.debug(f"診斷畫面佇列超過記憶體上限，捨棄: {path.name}")
+                return None
+            try:
+                self._queue.put_nowait((frame, path))
+            except queue.Full:
+                self.dropped_count += 1
+                self.logger.debug(f"診斷畫面佇列已滿，捨棄: {path.name}")
+                return None
+            self.queued_bytes += frame.nbytes
+            self._ensure_thread()
+        return path
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待佇列中的畫面寫入完成，返回是否在時間內完成"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+    def close(self, timeout: float = 10.0) -> bool:
+        """寫完佇列中的畫面後停止背景執行緒"""
+        finished = self.flush(timeout)
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+            thread.join(timeout=1.0)
+        return finished
+
+    def stats(self) -> Dict:
+        """寫入統計"""
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'queued_bytes': self.queued_bytes,
+                'written': self.written_count,
+                'written_bytes': self.written_bytes,
+                'dropped': self.dropped_count,
+                'evicted': self.evicted_count,
+                'failed': self.failed_count,
+                'disk_bytes': self._disk_bytes
+            }
+
+    def _ensure_thread(self) -> None:
+        """第一次寫入時才啟動背景執行緒（呼叫端需持有鎖）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="FrameDumpWriter", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        """背景執行緒：依序編碼並寫入佇列中的畫面"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                frame, path = item
+                with self._lock:
+                    self.queued_bytes -= frame.nbytes
+                self._write(frame, path)
+            except Exception as e:
+                self.failed_count += 1
+                self.logger.error(f"寫入診斷畫面失敗: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _encode_params(self, suffix: str) -> list:
+        """依副檔名取得壓縮參數"""
+        if suffix == ".webp":
+            return [cv2.IMWRITE_WEBP_QUALITY, config.FRAME_DUMP_QUALITY]
+        if suffix in (".jpg", ".jpeg"):
+            return [cv2.IMWRITE_JPEG_QUALITY, config.FRAME_DUMP_QUALITY]
+        if suffix == ".png":
+            return [cv2.IMWRITE_PNG_COMPRESSION, config.FRAME_DUMP_PNG_COMPRESSION]
+        return []
+
+    def _write(self, frame: np.ndarray, path: Path) -> None:
+        """編碼並寫入單一畫面，根目錄內的檔案計入磁碟配額"""
+        suffix = path.suffix.lower()
+        ok, encoded = cv2.imencode(suffix or f".{self.image_format}", frame, self._encode_params(suffix))
+        if not ok:
+            raise ValueError(f"無法編碼畫面: {path}")
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        encoded.tofile(str(path))
+        size = int(encoded.nbytes)
+        with self._lock:
+            self.written_count += 1
+            self.written_bytes += size
+        self.logger.debug(f"診斷畫面已儲存: {path}")
+
+        if self._is_under_root(path):
+            self._enforce_quota(path, size)
+
+    def _is_under_root(self, path: Path) -> bool:
+        try:
+            path.resolve().relative_to(self.root.resolve())
+            return True
+        except ValueError:
+            return False
+
+    def _enforce_quota(self, path: Path, size: int) -> None:
+        """記錄新檔案，超過磁碟配額時刪除最舊的檔案（不刪除剛寫入的檔案）"""
+        if self._files is None:
+            # 第一次寫入時載入先前執行留下的檔案
+            existing = sorted((p for p in self.root.glob("*") if p.is_file() and p != path),
+                              key=lambda p: p.stat().st_mtime)
+            self._files = deque((p, p.stat().st_size) for p in existing)
+            self._disk_bytes = sum(file_size for _, file_size in self._files)
+
+        self._files.append((path, size))
+        self._disk_bytes += size
+        while self._disk_bytes > self.quota_bytes and len(self._files) > 1:
+            oldest, oldest_size = self._files.popleft()
+            try:
+                oldest.unlink()
+            except FileNotFoundError:
+                pass
+            self._disk_bytes -= oldest_size
+            self.evicted_count += 1
+
+# 創建全域診斷畫面寫入器實例
+frame_dump_writer = FrameDumpWriter()
+
+# 便捷函數
+def dump_frame(frame: np.ndarray, reason: str = None, path: Path = None) -> Optional[Path]:
+    """便捷函數：非同步保存診斷畫面"""
+    return frame_dump_writer.submit(frame, path, reason)
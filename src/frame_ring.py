@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - 共享記憶體畫面環狀緩衝模組
+單一截圖執行緒將畫面寫入共享記憶體中的環狀緩衝，並為每張畫面編上序號；
+檢測、錄製、診斷畫面與進度追蹤等使用者直接讀取最新畫面的視圖（不複製），
+無論同時進行多少分析，每張畫面都只截圖一次
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Optional, Tuple, Dict
+import sys
+
+import numpy as np
+
+# 導入配置和日誌
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from src.logger import get_logger
+
+MAGIC = 0x46524D52494E4731  # "FRMRING1"
+# 標頭：MAGIC、槽數、高、寬、通道數、最新序號
+HEADER_FIELDS = 8
+# 每個槽：版本（寫入中為奇數）、序號、時間戳（奈秒）、原點 x、原點 y
+SLOT_FIELDS = 5
+
+@dataclass
+class RingFrame:
+    """環狀緩衝中的一張畫面（frame 為共享記憶體的唯讀視圖）"""
+    seq: int
+    timestamp: float
+    origin: Tuple[int, int]
+    frame: np.ndarray
+    slot: int
+    version: int
+
+class FrameRing:
+    """
+    共享記憶體畫面環狀緩衝
+    每個槽以版本號保護（seqlock）：寫入前後各加一，讀取端以 is_valid() 確認使用期間沒有被覆寫
+    """
+
+    def __init__(self, shape: Tuple[int, ...] = None, slots: int = None, name: str = None,
+                 create: bool = True):
+        """
+        建立或連接環狀緩衝
+
+        Args:
+            shape: 畫面形狀 (高, 寬) 或 (高, 寬, 通道)，建立時必須提供
+            slots: 槽數（讀取端處理一張畫面的時間內可容許的寫入次數）
+            name: 共享記憶體名稱，None 表示自動命名（建立時）
+            create: True 建立新的緩衝，False 連接既有的緩衝（可在其他進程中使用）
+        """
+        self._owner = create
+        if create:
+            if shape is None:
+                raise ValueError("建立環狀緩衝時必須提供畫面形狀")
+            height, width = shape[:2]
+            channels = shape[2] if len(shape) > 2 else 1
+            slots = max(2, slots or config.FRAME_RING_SLOTS)
+            size = self._layout_size(slots, height, width, channels)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+            header[:] = 0
+            header[:5] = (MAGIC, slots, height, width, channels)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+            if header[0] != MAGIC:
+                self.shm.close()
+                raise ValueError(f"共享記憶體 {name} 不是畫面環狀緩衝")
+            slots, height, width, channels = (int(value) for value in header[1:5])
+
+        self.name = self.shm.name
+        self.slots = slots
+        self.shape = (height, width) if channels == 1 else (height, width, channels)
+        self._header = header
+        offset = HEADER_FIELDS * 8
+        self._slot_meta = np.ndarray((slots, SLOT_FIELDS), dtype=np.int64, buffer=self.shm.buf, offset=offset)
+        offset += slots * SLOT_FIELDS * 8
+        self._data = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=offset)
+        if create:
+            self._slot_meta[:] = 0
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _layout_size(slots: int, height: int, width: int, channels: int) -> int:
+        return HEADER_FIELDS * 8 + slots * SLOT_FIELDS * 8 + slots * height * width * channels
+
+    @property
+    def latest_seq(self) -> int:
+        """最新完成寫入的畫面序號（尚未寫入時為 0）"""
+        return int(self._header[5])
+
+    def write(self, frame: np.ndarray, origin: Tuple[int, int] = (0, 0)) -> int:
+        """
+        寫入一張畫面（只應由單一截圖執行緒呼叫）
+
+        Returns:
+            int: 畫面序號
+        """
+        if frame.shape != self.shape:
+            raise ValueError(f"畫面形狀 {frame.shape} 與環狀緩衝 {self.shape} 不符")
+        seq = self.latest_seq + 1
+        slot = seq % self.slots
+        meta = self._slot_meta[slot]
+        meta[0] += 1  # 奇數：寫入中
+        np.copyto(self._data[slot], frame)
+        meta[1] = seq
+        meta[2] = time.time_ns()
+        meta[3], meta[4] = origin
+        meta[0] += 1  # 偶數：寫入完成
+        self._header[5] = seq
+        with self._condition:
+            self._condition.notify_all()
+        return seq
+
+    def latest(self) -> Optional[RingFrame]:
+        """
+        取得最新畫面的視圖（不複製）
+
+        Returns:
+            Optional[RingFrame]: 尚未寫入任何畫面時返回 None
+        """
+        for _ in range(self.slots):
+            seq = self.latest_seq
+            if seq == 0:
+                return None
+            slot = seq % self.slots
+            meta = self._slot_meta[slot]
+            version = int(meta[0])
+            if version % 2 == 0 and int(meta[1]) == seq:
+                frame = self._data[slot]
+                frame.flags.writeable = False
+                return RingFrame(seq, int(meta[2]) / 1e9, (int(meta[3]), int(meta[4])), frame, slot, version)
+        return None
+
+    def wait_for_newer(self, seq: int, timeout: float) -> Optional[RingFrame]:
+        """
+        等待序號大於 seq 的畫面（同一進程內以條件變數喚醒，其他進程的寫入以短間隔輪詢）
+
+        Returns:
+            Optional[RingFrame]: 逾時時返回 None
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.latest_seq <= seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(min(remaining, 0.05))
+        return self.latest()
+
+    def is_valid(self, ring_frame: RingFrame) -> bool:
+        """讀取端使用畫面後確認該槽沒有被覆寫（覆寫時應捨棄分析結果）"""
+        return int(self._slot_meta[ring_frame.slot][0]) == ring_frame.version
+
+    def close(self) -> None:
+        """中斷連接；建立者另外釋放共享記憶體"""
+        # 先釋放 numpy 視圖，共享記憶體才能關閉
+        self._header = self._slot_meta = self._data = None
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+class FrameCaptureThread:
+    """以固定頻率截取畫面並寫入環狀緩衝的背景執行緒"""
+
+    def __init__(self, backend, ring: FrameRing, rate_hz: float = None,
+                 region: Tuple[int, int, int, int] = None):
+        """
+        初始化截圖執行緒
+
+        Args:
+            backend: 截圖後端（CaptureBackend）
+            ring: 寫入的環狀緩衝
+            rate_hz: 每秒截圖次數
+            region: 截圖區域 (left, top, width, height)，None 表示全螢幕
+        """
+        from src.image_recognition import FrameBufferPool
+        self.logger = get_logger("FrameCaptureThread")
+        self.backend = backend
+        self.ring = ring
+        self.rate_hz = rate_hz or config.FRAME_RING_RATE_HZ
+        self.region = region
+        self.pool = FrameBufferPool()
+        self.capture_count = 0
+        self.error_count = 0
+        self.capture_time = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def origin(self) -> Tuple[int, int]:
+        return (self.region[0], self.region[1]) if self.region else (0, 0)
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="FrameCaptureThread", daemon=True)
+        self._thread.start()
+        self.logger.info(f"開始截圖至環狀緩衝 {self.ring.name} ({self.rate_hz} 次/秒, {self.ring.shape})")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def capture_once(self) -> Optional[int]:
+        """截取一張畫面寫入環狀緩衝，返回序號，失敗時返回 None"""
+        start = time.perf_counter()
+        try:
+            if len(self.ring.shape) == 2:
+                frame = self.backend.grab_gray(self.region, self.pool)
+            else:
+                frame = self.backend.grab(self.region)
+            seq = self.ring.write(frame, self.origin)
+        except Exception as e:
+            self.error_count += 1
+            self.logger.debug(f"截圖失敗: {str(e)}")
+            return None
+        self.capture_count += 1
+        self.capture_time += time.perf_counter() - start
+        return seq
+
+    def stats(self) -> Dict:
+        return {
+            'captures': self.capture_count,
+            'errors': self.error_count,
+            'mean_capture_ms': round(self.capture_time / self.capture_count * 1000, 3)
+            if self.capture_count else 0.0,
+            'latest_seq': self.ring.latest_seq
+        }
+
+    def _run(self) -> None:
+        interval = 1.0 / self.rate_hz
+        while not self._stop.is_set():
+            start = time.monotonic()
+            self.capture_once()
+            self._stop.wait(max(0.0, interval - (time.monotonic() - start)))
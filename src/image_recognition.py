@@ -4,27 +4,1941 @@ Hybrid UI Automation Script - 圖像辨識模組
 處理截圖、圖像匹配、等待回應完成的視覺判斷
 """
 
-import pyautogui
 import cv2
 import numpy as np
 import time
+import hashlib
+import json
+import queue
+import threading
+from collections import namedtuple
+from dataclasses import dataclass, field, replace
+from enum import Enum
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Dict, Iterable, Union
 import sys
 
+try:
+    import pyautogui
+except Exception:  # 無圖形環境（例如離線重播錄製的畫面）時無法載入
+    pyautogui = None
+
 # 導入配置和日誌
 sys.path.append(str(Path(__file__).parent.parent))
 from config.config import config
 from src.logger import get_logger
+from src.detection_metrics import DetectionMetrics
+from src.threshold_calibration import load_thresholds
+from src.frame_dump import frame_dump_writer
+from src.frame_ring import FrameRing, FrameCaptureThread, RingFrame
+from src.ui_state_classifier import (UIStateClassifier, IDLE as CLASSIFIED_IDLE, RESPONDING as CLASSIFIED_RESPONDING,
+                                     ERROR_BANNER as CLASSIFIED_ERROR, NOTIFICATION_OVERLAY as CLASSIFIED_NOTIFICATION)
+
+# 與 pyscreeze.Box 相容的位置格式 (left, top, width, height)
+Box = namedtuple("Box", "left top width height")
+
+# Copilot 狀態檢測使用的模板名稱
+STOP_BUTTON = "stop_button"
+SEND_BUTTON = "send_button"
+NOTIFICATION_CLOSE = "notification_close"
+
+class CopilotUIState(Enum):
+    """Copilot Chat 面板的 UI 狀態"""
+    UNKNOWN = "unknown"
+    RESPONDING = "responding"                      # 顯示 stop 按鈕
+    IDLE = "idle"                                  # 顯示 send 按鈕
+    NOTIFICATION_OVERLAY = "notification_overlay"  # 通知遮擋聊天區域
+    ERROR_BANNER = "error_banner"                  # 顯示錯誤訊息
+
+@dataclass
+class TemplateMatch:
+    """單一模板的匹配結果"""
+    name: str
+    found: bool = False
+    score: float = 0.0
+    box: Optional[Box] = None
+    used_roi: bool = False  # 是否在學習到的 ROI 內找到（未回退全螢幕搜尋）
+
+@dataclass
+class DetectionStatus:
+    """單張截圖對所有模板的檢測結果"""
+    matches: Dict[str, TemplateMatch] = field(default_factory=dict)
+    frame_size: Tuple[int, int] = (0, 0)  # (width, height)
+    capture_time: float = 0.0             # 截圖耗時（秒）
+    match_time: float = 0.0               # 模板匹配耗時（秒）
+    timestamp: float = field(default_factory=time.time)
+    from_cache: bool = False              # 畫面未變動，沿用上次的檢測結果
+    notification: Optional[Box] = None    # 遮擋聊天區域的通知關閉按鈕位置
+    error: Optional[str] = None           # 聊天區域顯示的錯誤類別（rate_limit / auth / transient）
+    classified: Optional[str] = None      # 由縮圖分類器判斷（未做模板匹配）時的分類標籤
+    
+    def is_found(self, name: str) -> bool:
+        """指定模板是否找到"""
+        match = self.matches.get(name)
+        return bool(match and match.found)
+    
+    def score(self, name: str) -> float:
+        """指定模板的最佳匹配分數"""
+        match = self.matches.get(name)
+        return match.score if match else 0.0
+    
+    def box(self, name: str) -> Optional[Box]:
+        """指定模板的匹配位置"""
+        match = self.matches.get(name)
+        return match.box if match and match.found else None
+    
+    @property
+    def has_stop_button(self) -> bool:
+        return self.is_found(STOP_BUTTON)
+    
+    @property
+    def has_send_button(self) -> bool:
+        return self.is_found(SEND_BUTTON)
+    
+    @property
+    def is_responding(self) -> bool:
+        return self.has_stop_button
+    
+    @property
+    def is_ready(self) -> bool:
+        return self.has_send_button and not self.has_stop_button
+    
+    @property
+    def state(self) -> CopilotUIState:
+        """依檢測結果推斷的 UI 狀態"""
+        if self.has_stop_button:
+            return CopilotUIState.RESPONDING
+        if self.error is not None:
+            return CopilotUIState.ERROR_BANNER
+        if self.has_send_button:
+            return CopilotUIState.IDLE
+        if self.notification is not None:
+            return CopilotUIState.NOTIFICATION_OVERLAY
+        return CopilotUIState.UNKNOWN
+    
+    def to_dict(self) -> Dict:
+        """轉換為舊版狀態字典格式，並附上各模板分數與位置"""
+        return {
+            'has_stop_button': self.has_stop_button,
+            'has_send_button': self.has_send_button,
+            'is_responding': self.is_responding,
+            'is_ready': self.is_ready,
+            'status_message': '',
+            'notifications_cleared': False,
+            'notification_overlay': self.notification is not None,
+            'error_state': self.error,
+            'classified': self.classified,
+            'scores': {name: round(m.score, 4) for name, m in self.matches.items()},
+            'boxes': {name: tuple(m.box) if m.box else None for name, m in self.matches.items()}
+        }
+
+@dataclass
+class TemplateHandle:
+    """已解碼的模板影像（彩色、灰階與金字塔層級）"""
+    name: str
+    path: Path
+    color: np.ndarray
+    gray: np.ndarray
+    pyramid: List[np.ndarray]  # 灰階金字塔，pyramid[0] 為原始尺寸，之後每層縮小一半
+    mtime: float
+    digest: str
+    version: int = 1
+    scale: float = 1.0  # 相對於圖像檔案的縮放倍數（模擬 125% / 150% 顯示縮放）
+    
+    @property
+    def width(self) -> int:
+        return self.color.shape[1]
+    
+    @property
+    def height(self) -> int:
+        return self.color.shape[0]
+
+class TemplateRegistry:
+    """模板快取：每個圖像只解碼一次，檔案修改時間或內容變動時才重新載入"""
+    
+    def __init__(self, logger, pyramid_levels: int = None, check_interval: float = None):
+        """
+        初始化模板快取
+        
+        Args:
+            logger: 日誌記錄器
+            pyramid_levels: 金字塔縮小層數
+            check_interval: 檢查檔案變動的最短間隔（秒）
+        """
+        self.logger = logger
+        self.pyramid_levels = (config.TEMPLATE_PYRAMID_LEVELS
+                               if pyramid_levels is None else pyramid_levels)
+        self.check_interval = (config.TEMPLATE_RELOAD_CHECK_INTERVAL
+                               if check_interval is None else check_interval)
+        self._paths: Dict[str, Path] = {}
+        self._scales: Dict[str, float] = {}
+        self._handles: Dict[str, TemplateHandle] = {}
+        self._last_check: Dict[str, float] = {}
+    
+    def register(self, name: str, template_path, scale: float = 1.0) -> Optional[TemplateHandle]:
+        """
+        註冊並立即解碼模板
+        
+        Args:
+            name: 模板名稱
+            template_path: 模板圖像路徑
+            scale: 載入後的縮放倍數
+            
+        Returns:
+            Optional[TemplateHandle]: 模板控制代碼，檔案不存在或無法解碼則返回 None
+        """
+        template_path = Path(template_path)
+        if self._paths.get(name) != template_path or self._scales.get(name, 1.0) != scale:
+            self._handles.pop(name, None)
+        self._paths[name] = template_path
+        self._scales[name] = scale
+        self._last_check.pop(name, None)
+        return self.get(name)
+    
+    def resolve(self, template) -> Optional[TemplateHandle]:
+        """
+        將模板控制代碼、名稱或路徑轉換為最新的控制代碼
+        
+        Args:
+            template: TemplateHandle、已註冊名稱或圖像路徑
+            
+        Returns:
+            Optional[TemplateHandle]: 模板控制代碼
+        """
+        if isinstance(template, TemplateHandle):
+            return self.get(template.name)
+        if isinstance(template, str) and template in self._paths:
+            return self.get(template)
+        
+        template_path = Path(template)
+        for name, path in self._paths.items():
+            if path == template_path:
+                return self.get(name)
+        return self.register(template_path.stem, template_path)
+    
+    def get(self, name: str) -> Optional[TemplateHandle]:
+        """
+        取得模板控制代碼，必要時依檔案變動重新載入
+        
+        Args:
+            name: 模板名稱
+            
+        Returns:
+            Optional[TemplateHandle]: 模板控制代碼
+        """
+        template_path = self._paths.get(name)
+        if template_path is None:
+            return None
+        
+        handle = self._handles.get(name)
+        now = time.monotonic()
+        if handle is not None and now - self._last_check.get(name, 0.0) < self.check_interval:
+            return handle
+        self._last_check[name] = now
+        
+        try:
+            mtime = template_path.stat().st_mtime
+        except OSError:
+            if handle is not None:
+                self.logger.warning(f"模板圖像已不存在: {template_path}")
+                self._handles.pop(name, None)
+            return None
+        
+        if handle is not None and handle.mtime == mtime:
+            return handle
+        
+        return self._load(name, template_path, mtime, handle)
+    
+    def _load(self, name: str, template_path: Path, mtime: float,
+              previous: Optional[TemplateHandle]) -> Optional[TemplateHandle]:
+        """讀取並解碼模板；內容雜湊未變動時只更新修改時間"""
+        try:
+            data = template_path.read_bytes()
+        except OSError as e:
+            self.logger.error(f"無法讀取模板圖像: {template_path} ({str(e)})")
+            return previous
+        
+        digest = hashlib.sha1(data).hexdigest()
+        if previous is not None and previous.digest == digest:
+            previous.mtime = mtime
+            return previous
+        
+        color = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if color is None:
+            self.logger.error(f"無法解碼模板圖像: {template_path}")
+            return previous
+        
+        scale = self._scales.get(name, 1.0)
+        if scale != 1.0:
+            color = cv2.resize(color, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        
+        gray = cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)
+        pyramid = [gray]
+        for _ in range(self.pyramid_levels):
+            if min(pyramid[-1].shape[:2]) < 8:
+                break
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+        
+        handle = TemplateHandle(
+            name=name,
+            path=template_path,
+            color=color,
+            gray=gray,
+            pyramid=pyramid,
+            mtime=mtime,
+            digest=digest,
+            version=previous.version + 1 if previous else 1,
+            scale=scale
+        )
+        self._handles[name] = handle
+        
+        action = "重新載入" if previous else "載入"
+        self.logger.debug(f"{action}模板 {name}: {template_path.name} "
+                          f"({handle.width}x{handle.height}, v{handle.version})")
+        return handle
+    
+    def names(self) -> List[str]:
+        """取得所有已註冊模板名稱"""
+        return list(self._paths.keys())
+    
+    def path(self, name: str) -> Optional[Path]:
+        """取得已註冊模板的路徑"""
+        return self._paths.get(name)
+
+# 偵測介面接受的模板參考：控制代碼、已註冊名稱或圖像路徑
+TemplateRef = Union[TemplateHandle, str, Path]
+
+class FrameBufferPool:
+    """
+    預先配置並重複使用的影像緩衝區
+    截圖、灰階轉換、簽章與匹配結果都寫入固定緩衝區，長時間輪詢時記憶體配置維持平穩
+    """
+    
+    def __init__(self):
+        """初始化緩衝區池"""
+        self._buffers: Dict[str, np.ndarray] = {}
+        self.allocations = 0            # 緩衝區池本身的配置次數
+        self.allocated_bytes = 0
+        self.transient_allocations = 0  # 截圖函式庫內部無法避免的暫時配置
+        self.transient_bytes = 0
+        self.polls = 0
+        self.last_poll_allocations = 0
+        self.last_poll_bytes = 0
+        self._poll_start = (0, 0)
+    
+    def get(self, key: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        取得指定用途的緩衝區，形狀不同時才重新配置
+        
+        Args:
+            key: 緩衝區用途名稱
+            shape: 緩衝區形狀
+            dtype: 資料型別
+            
+        Returns:
+            np.ndarray: 可重複寫入的緩衝區（內容於下次同用途寫入時被覆蓋）
+        """
+        shape = tuple(shape)
+        buffer = self._buffers.get(key)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[key] = buffer
+            self.allocations += 1
+            self.allocated_bytes += buffer.nbytes
+        return buffer
+    
+    def record_transient(self, nbytes: int, count: int = 1) -> None:
+        """記錄截圖函式庫內部的暫時配置（例如 mss 原始緩衝區、PIL 影像）"""
+        self.transient_allocations += count
+        self.transient_bytes += nbytes
+    
+    def begin_poll(self) -> None:
+        """標記一次輪詢開始"""
+        self._poll_start = (self.allocations + self.transient_allocations,
+                            self.allocated_bytes + self.transient_bytes)
+    
+    def end_poll(self) -> None:
+        """標記一次輪詢結束並記錄本次配置量"""
+        self.polls += 1
+        self.last_poll_allocations = (self.allocations + self.transient_allocations
+                                      - self._poll_start[0])
+        self.last_poll_bytes = (self.allocated_bytes + self.transient_bytes
+                                - self._poll_start[1])
+    
+    def stats(self) -> Dict:
+        """
+        取得配置統計
+        
+        Returns:
+            Dict: 總配置次數 / 位元組與每次輪詢的平均及最近一次配置量
+        """
+        total_allocations = self.allocations + self.transient_allocations
+        total_bytes = self.allocated_bytes + self.transient_bytes
+        return {
+            'polls': self.polls,
+            'buffers': len(self._buffers),
+            'buffer_bytes': sum(buffer.nbytes for buffer in self._buffers.values()),
+            'pool_allocations': self.allocations,
+            'pool_bytes': self.allocated_bytes,
+            'transient_allocations': self.transient_allocations,
+            'transient_bytes': self.transient_bytes,
+            'allocations_per_poll': total_allocations / self.polls if self.polls else 0.0,
+            'bytes_per_poll': total_bytes / self.polls if self.polls else 0.0,
+            'last_poll_allocations': self.last_poll_allocations,
+            'last_poll_bytes': self.last_poll_bytes
+        }
+
+class CaptureBackend:
+    """截圖後端介面：返回 BGR 格式的 numpy 陣列"""
+    
+    name = "base"
+    
+    def grab(self, region: Tuple[int, int, int, int] = None) -> np.ndarray:
+        """
+        截取螢幕畫面
+        
+        Args:
+            region: 截圖區域 (left, top, width, height)，None 表示全螢幕
+            
+        Returns:
+            np.ndarray: BGR 格式截圖
+        """
+        raise NotImplementedError
+    
+    def grab_gray(self, region: Tuple[int, int, int, int] = None,
+                  pool: FrameBufferPool = None) -> np.ndarray:
+        """
+        截取螢幕畫面並直接寫入緩衝區池中的灰階緩衝區
+        
+        Args:
+            region: 截圖區域 (left, top, width, height)，None 表示全螢幕
+            pool: 緩衝區池
+            
+        Returns:
+            np.ndarray: 灰階截圖（緩衝區池的視圖，下次截圖時會被覆蓋）
+        """
+        bgr = self.grab(region)
+        pool.record_transient(bgr.nbytes)
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY,
+                            dst=pool.get(f"gray:{bgr.shape[0]}x{bgr.shape[1]}", bgr.shape[:2]))
+    
+    def screen_size(self) -> Tuple[int, int]:
+        """取得螢幕解析度 (width, height)"""
+        raise NotImplementedError
+    
+    def close(self) -> None:
+        """釋放後端資源"""
+        pass
+
+class PyAutoGUICaptureBackend(CaptureBackend):
+    """使用 pyautogui.screenshot 的截圖後端（所有平台可用）"""
+    
+    name = "pyautogui"
+    
+    def grab(self, region: Tuple[int, int, int, int] = None) -> np.ndarray:
+        screenshot = pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
+        return cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_RGB2BGR)
+    
+    def grab_gray(self, region: Tuple[int, int, int, int] = None,
+                  pool: FrameBufferPool = None) -> np.ndarray:
+        # PIL 影像轉 numpy 時必定複製一次，之後直接由 RGB 轉灰階寫入緩衝區
+        screenshot = pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
+        rgb = np.asarray(screenshot)
+        pool.record_transient(rgb.nbytes * 2, count=2)
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY,
+                            dst=pool.get(f"gray:{rgb.shape[0]}x{rgb.shape[1]}", rgb.shape[:2]))
+    
+    def screen_size(self) -> Tuple[int, int]:
+        width, height = pyautogui.size()
+        return int(width), int(height)
+
+class MSSCaptureBackend(CaptureBackend):
+    """
+    使用 mss 的截圖後端
+    直接向 X11（可用時透過 XShm 共享記憶體）/ GDI 取得像素，不經過外部程式與 PIL
+    """
+    
+    name = "mss"
+    
+    def __init__(self):
+        import mss  # 選用相依套件，未安裝時由 create_capture_backend 回退
+        self._mss_module = mss
+        # mss 實例綁定建立它的執行緒，每個執行緒各自建立
+        self._local = threading.local()
+        self._monitor = self._get_mss().monitors[1]
+    
+    def _get_mss(self):
+        instance = getattr(self._local, "instance", None)
+        if instance is None:
+            # 新版 mss 以 mss.MSS 取代已淘汰的 mss.mss()
+            factory = getattr(self._mss_module, "MSS", None) or self._mss_module.mss
+            instance = factory()
+            self._local.instance = instance
+        return instance
+    
+    def grab(self, region: Tuple[int, int, int, int] = None) -> np.ndarray:
+        return cv2.cvtColor(self._grab_bgra(region), cv2.COLOR_BGRA2BGR)
+    
+    def grab_gray(self, region: Tuple[int, int, int, int] = None,
+                  pool: FrameBufferPool = None) -> np.ndarray:
+        # 直接以 mss 原始 BGRA 緩衝區的視圖轉灰階，不經過 BGR 複本
+        bgra = self._grab_bgra(region)
+        pool.record_transient(bgra.nbytes)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY,
+                            dst=pool.get(f"gray:{bgra.shape[0]}x{bgra.shape[1]}", bgra.shape[:2]))
+    
+    def _grab_bgra(self, region: Tuple[int, int, int, int] = None) -> np.ndarray:
+        """截圖並返回 mss 原始 BGRA 緩衝區的視圖（不複製）"""
+        if region:
+            left, top, width, height = region
+            monitor = {
+                "left": self._monitor["left"] + left,
+                "top": self._monitor["top"] + top,
+                "width": width,
+                "height": height
+            }
+        else:
+            monitor = self._monitor
+        
+        shot = self._get_mss().grab(monitor)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+    
+    def screen_size(self) -> Tuple[int, int]:
+        return self._monitor["width"], self._monitor["height"]
+    
+    def close(self) -> None:
+        instance = getattr(self._local, "instance", None)
+        if instance is not None:
+            instance.close()
+            self._local.instance = None
+
+class XDamageCaptureBackend(CaptureBackend):
+    """
+    追蹤 XDamage 事件的截圖後端（Linux / Xvfb）
+    截圖交由 mss（或 pyautogui）完成，另外記錄自上次檢測以來被重繪的區域，
+    聊天區域沒有被重繪時檢測直接沿用上次結果，不截圖也不匹配
+    """
+    
+    name = "xdamage"
+    
+    def __init__(self):
+        from src.x11_damage import DamageTracker  # 需要 python-xlib，無法建立時由 create_capture_backend 回退
+        self.damage = DamageTracker()
+        try:
+            self._inner = MSSCaptureBackend()
+        except Exception:
+            self._inner = PyAutoGUICaptureBackend()
+    
+    def grab(self, region: Tuple[int, int, int, int] = None) -> np.ndarray:
+        return self._inner.grab(region)
+    
+    def grab_gray(self, region: Tuple[int, int, int, int] = None,
+                  pool: FrameBufferPool = None) -> np.ndarray:
+        return self._inner.grab_gray(region, pool)
+    
+    def screen_size(self) -> Tuple[int, int]:
+        return self._inner.screen_size()
+    
+    def close(self) -> None:
+        self.damage.close()
+        self._inner.close()
+
+# 可用的截圖後端（名稱 -> 類別）
+CAPTURE_BACKENDS = {
+    PyAutoGUICaptureBackend.name: PyAutoGUICaptureBackend,
+    MSSCaptureBackend.name: MSSCaptureBackend,
+    XDamageCaptureBackend.name: XDamageCaptureBackend,
+}
+
+def create_capture_backend(name: str = None, logger=None) -> CaptureBackend:
+    """
+    依名稱建立截圖後端
+    
+    Args:
+        name: 後端名稱（"auto"、"pyautogui"、"mss"、"xdamage"），None 表示使用配置值
+        logger: 日誌記錄器
+        
+    Returns:
+        CaptureBackend: 截圖後端；指定後端無法建立時回退 pyautogui
+    """
+    name = (name or config.CAPTURE_BACKEND).lower()
+    candidates = ["mss", "pyautogui"] if name == "auto" else [name]
+    if name == "xdamage":
+        candidates.append("mss")
+    
+    for candidate in candidates:
+        backend_class = CAPTURE_BACKENDS.get(candidate)
+        if backend_class is None:
+            if logger:
+                logger.warning(f"未知的截圖後端: {candidate}")
+            continue
+        try:
+            backend = backend_class()
+            if logger:
+                logger.info(f"使用截圖後端: {backend.name}")
+            return backend
+        except Exception as e:
+            if logger:
+                logger.warning(f"無法建立截圖後端 {candidate}: {str(e)}")
+    
+    if logger:
+        logger.info("回退使用 pyautogui 截圖後端")
+    return PyAutoGUICaptureBackend()
+
+@dataclass
+class StateTransition:
+    """UI 狀態轉換事件"""
+    previous: CopilotUIState
+    current: CopilotUIState
+    timestamp: float
+    status: DetectionStatus
+
+class CopilotStateMonitor:
+    """
+    背景狀態監控器
+    以固定頻率檢測聊天區域，狀態轉換時透過佇列與條件變數發布
+    """
+    
+    def __init__(self, recognizer: "ImageRecognition", rate_hz: float = None,
+                 confirm_samples: int = None):
+        """
+        初始化背景狀態監控器
+        
+        Args:
+            recognizer: 圖像辨識器
+            rate_hz: 每秒檢測次數
+            confirm_samples: 狀態需連續出現幾次才視為轉換（避免畫面閃動誤判）
+        """
+        self.recognizer = recognizer
+        self.logger = recognizer.logger
+        self.rate_hz = rate_hz or config.STATE_MONITOR_RATE
+        self.confirm_samples = max(1, confirm_samples or config.STATE_MONITOR_CONFIRM_SAMPLES)
+        
+        self.transitions: "queue.Queue[StateTransition]" = queue.Queue(
+            maxsize=config.STATE_MONITOR_QUEUE_SIZE)
+        self.state = CopilotUIState.UNKNOWN
+        self.state_since = time.time()
+        self.last_status: Optional[DetectionStatus] = None   # 最近一次取樣（可能尚未確認）
+        self.state_status: Optional[DetectionStatus] = None  # 確認目前狀態的取樣（錯誤類別、通知位置等）
+        self.sample_count = 0
+        
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._candidate = CopilotUIState.UNKNOWN
+        self._candidate_count = 0
+    
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self) -> None:
+        """啟動背景檢測執行緒"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="CopilotStateMonitor", daemon=True)
+        self._thread.start()
+        self.logger.info(f"背景狀態監控已啟動 ({self.rate_hz:.1f} 次/秒)")
+    
+    def stop(self, timeout: float = 2.0) -> None:
+        """停止背景檢測執行緒"""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.logger.info(f"背景狀態監控已停止 (共檢測 {self.sample_count} 次)")
+    
+    def wait_for_state(self, states: Iterable[CopilotUIState], timeout: float,
+                       abort_check=None) -> Optional[CopilotUIState]:
+        """
+        阻塞直到狀態成為指定狀態之一
+        
+        Args:
+            states: 目標狀態
+            timeout: 超時時間（秒）
+            abort_check: 可選的中止檢查函數，返回 True 時提前結束等待
+            
+        Returns:
+            Optional[CopilotUIState]: 達到的狀態，超時、中止或監控停止時返回 None
+        """
+        states = set(states)
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.state not in states:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop_event.is_set():
+                    return None
+                if abort_check and abort_check():
+                    return None
+                # 分段等待以便定期執行中止檢查
+                self._condition.wait(min(remaining, 1.0))
+            return self.state
+    
+    def _run(self) -> None:
+        """背景檢測迴圈"""
+        interval = 1.0 / self.rate_hz
+        while not self._stop_event.is_set():
+            tick_start = time.monotonic()
+            try:
+                status = self.recognizer.detect_copilot_state()
+                self.sample_count += 1
+                self._update(status)
+            except Exception as e:
+                self.logger.debug(f"背景狀態檢測錯誤: {str(e)}")
+            
+            self._stop_event.wait(max(0.0, interval - (time.monotonic() - tick_start)))
+    
+    def _update(self, status: DetectionStatus) -> None:
+        """更新狀態，同一新狀態連續出現足夠次數時發布轉換"""
+        state = status.state
+        if state == self._candidate:
+            self._candidate_count += 1
+        else:
+            self._candidate = state
+            self._candidate_count = 1
+        
+        with self._condition:
+            self.last_status = status
+            if state == self.state or self._candidate_count < self.confirm_samples:
+                return
+            
+            transition = StateTransition(self.state, state, time.time(), status)
+            self.state = state
+            self.state_status = status
+            self.state_since = transition.timestamp
+            self._publish(transition)
+            self._condition.notify_all()
+        
+        self.logger.info(f"Copilot 狀態轉換: {transition.previous.value} → {transition.current.value}")
+    
+    def _publish(self, transition: StateTransition) -> None:
+        """放入轉換佇列，佇列已滿時丟棄最舊的事件"""
+        try:
+            self.transitions.put_nowait(transition)
+        except queue.Full:
+            try:
+                self.transitions.get_nowait()
+            except queue.Empty:
+                pass
+            self.transitions.put_nowait(transition)
+
+class ChatProgressTracker:
+    """
+    回應區域輸出進度追蹤器
+    比較聊天區域上方回應區域每一列像素的雜湊，新增內容或捲動都會使列雜湊改變；
+    一段時間沒有變化即視為輸出結束，不需要透過剪貼簿複製回應來判斷
+    """
+    
+    def __init__(self, recognizer: "ImageRecognition", stable_seconds: float = None,
+                 min_changed_rows: int = None):
+        """
+        初始化進度追蹤器
+        
+        Args:
+            recognizer: 圖像辨識器（提供截圖後端與學習到的聊天區域）
+            stable_seconds: 多久沒有變化視為輸出結束（秒）
+            min_changed_rows: 至少幾列變化才視為有新內容
+        """
+        self.recognizer = recognizer
+        self.stable_seconds = config.CHAT_PROGRESS_STABLE_SECONDS if stable_seconds is None else stable_seconds
+        self.min_changed_rows = min_changed_rows or config.CHAT_PROGRESS_MIN_CHANGED_ROWS
+        # 固定的隨機權重，將每一列量化後的像素加權相加作為列雜湊（uint32 溢位即取模）
+        self._weights: Optional[np.ndarray] = None
+        self.reset()
+    
+    def reset(self) -> None:
+        """清除先前的取樣（每次送出提示詞後呼叫）"""
+        self._row_hashes: Optional[np.ndarray] = None
+        self.last_change = time.monotonic()
+        self.changed_rows = 0
+        self.change_count = 0
+        self.sample_count = 0
+    
+    @property
+    def is_streaming(self) -> bool:
+        """最近 stable_seconds 秒內回應區域是否有變化"""
+        return time.monotonic() - self.last_change < self.stable_seconds
+    
+    def sample(self, frame: np.ndarray = None, origin: Tuple[int, int] = (0, 0),
+               screen_size: Tuple[int, int] = None) -> Optional[bool]:
+        """
+        取樣一次回應區域
+        
+        Args:
+            frame: 已取得的截圖，None 表示只截取回應區域
+            origin: frame 左上角的螢幕座標
+            screen_size: 螢幕解析度 (寬, 高)
+            
+        Returns:
+            Optional[bool]: 是否仍在輸出，尚未學習到聊天區域或截圖失敗時返回 None
+        """
+        recognizer = self.recognizer
+        if screen_size is None:
+            screen_size = (frame.shape[1], frame.shape[0]) if frame is not None \
+                else recognizer.capture_backend.screen_size()
+        region = recognizer._get_progress_region(screen_size)
+        if region is None:
+            return None
+        
+        left, top, right, bottom = region
+        if frame is None:
+            # 背景截圖執行緒的最新畫面涵蓋回應區域時直接使用，不另外截圖
+            ring_frame = recognizer.latest_ring_frame()
+            if ring_frame is not None and recognizer._to_frame_rect(region, ring_frame.origin,
+                                                                    ring_frame.frame.shape) is not None:
+                frame, origin = ring_frame.frame, ring_frame.origin
+        if frame is None:
+            try:
+                frame = recognizer.capture_backend.grab((left, top, right - left, bottom - top))
+            except Exception as e:
+                recognizer.logger.debug(f"回應區域截圖失敗: {str(e)}")
+                return None
+            origin = (left, top)
+        
+        rect = recognizer._to_frame_rect(region, origin, frame.shape)
+        if rect is None:
+            return None
+        x0, y0, x1, y1 = rect
+        area = frame[y0:y1, x0:x1]
+        if area.ndim == 3:
+            area = cv2.cvtColor(area, cv2.COLOR_BGR2GRAY)
+        
+        row_hashes = self._hash_rows(area)
+        self.sample_count += 1
+        previous = self._row_hashes
+        self._row_hashes = row_hashes
+        
+        if previous is None or previous.shape != row_hashes.shape:
+            return self.is_streaming
+        
+        self.changed_rows = int(np.count_nonzero(previous != row_hashes))
+        if self.changed_rows >= self.min_changed_rows:
+            self.last_change = time.monotonic()
+            self.change_count += 1
+        return self.is_streaming
+    
+    def _hash_rows(self, area: np.ndarray) -> np.ndarray:
+        """量化後（忽略抗鋸齒與輕微亮度差異）計算每一列的雜湊"""
+        quantized = (area >> 4).astype(np.uint32)
+        if self._weights is None or self._weights.shape[0] != quantized.shape[1]:
+            rng = np.random.default_rng(0x5EED)
+            self._weights = rng.integers(1, 2 ** 31, size=quantized.shape[1], dtype=np.uint32)
+        return quantized @ self._weights
 
 class ImageRecognition:
     """圖像辨識處理器"""
     
-    def __init__(self):
-        """初始化圖像辨識器"""
-        self.logger = get_logger("ImageRecognition")
-        self.screenshot_count = 0
-        self.logger.info("圖像辨識模組初始化完成")
+    def __init__(self, learned_roi_file: Path = None):
+        """
+        初始化圖像辨識器
+        
+        Args:
+            learned_roi_file: ROI 快取檔案，None 使用配置中的路徑
+        """
+        self.logger = get_logger("ImageRecognition")
+        self.screenshot_count = 0
+        self._last_diagnostic_frame = 0.0
+        
+        # 截圖後端（啟動時依配置選擇）
+        self.capture_backend = create_capture_backend(config.CAPTURE_BACKEND, self.logger)
+        
+        # 檢測流程重複使用的影像緩衝區
+        self.frame_pool = FrameBufferPool()
+        self._signature_slot = 0  # 目前保存的簽章所在緩衝區
+        
+        # 各模板的耗時、分數與命中率統計（每個專案重設）
+        self.metrics = DetectionMetrics()
+        
+        # 背景監控與呼叫端可能同時檢測，共用的緩衝區與快取以鎖保護
+        self._detect_lock = threading.RLock()
+        self.state_monitor: Optional[CopilotStateMonitor] = None
+        
+        # 模板快取（每個圖像只解碼一次）
+        self.templates = TemplateRegistry(self.logger)
+        self.register_template(STOP_BUTTON, config.STOP_BUTTON_IMAGE)
+        self.register_template(SEND_BUTTON, config.SEND_BUTTON_IMAGE)
+        
+        # 主題 / 縮放模板變體（變體名稱 -> 按鈕名稱 -> (圖像路徑, 縮放)），每個工作階段辨識一次
+        self.template_variants: Dict[str, Dict[str, Tuple[Path, float]]] = self._discover_template_variants()
+        self.active_variant: Optional[str] = None
+        self._variant_checked_at = 0.0
+        self._default_variant = "default@100"  # 啟動時註冊的 stop / send 模板即為此變體
+        self.register_template(NOTIFICATION_CLOSE, config.NOTIFICATION_CLOSE_IMAGE)
+        
+        # 錯誤狀態模板（模板名稱 -> 錯誤類別），檔案不存在的模板不會被匹配
+        self.error_templates: Dict[str, str] = {}
+        for category, paths in config.COPILOT_ERROR_TEMPLATES.items():
+            for template_path in paths:
+                self.register_error_template(category, template_path)
+        
+        # 各解析度下學習到的模板位置（"寬x高" -> 模板名稱 -> Box）
+        self.roi_file = Path(learned_roi_file or config.LEARNED_ROI_FILE)
+        self.learned_rois: Dict[str, Dict[str, Box]] = self._load_learned_rois()
+        
+        # 本機各解析度下校正過的模板閾值（解析度 -> 模板名稱 -> 閾值）
+        self.calibrated_thresholds: Dict[str, Dict[str, float]] = {}
+        self.reload_calibrated_thresholds()
+        
+        # 聊天區域縮圖分類器（預設關閉）
+        self.ui_classifier: Optional[UIStateClassifier] = None
+        self.reload_ui_classifier()
+        
+        # 畫面變動閘門：聊天區域未變動時沿用上次結果，跳過模板匹配
+        self._gate_signature: Optional[np.ndarray] = None
+        self._gate_status: Optional[DetectionStatus] = None
+        self._gate_matched_at = 0.0
+        self.frame_gate_hits = 0
+        self.frame_gate_misses = 0
+        
+        # 通知清除統計（定位關閉單一通知 / 命令面板清除全部）
+        self.notification_stats = {
+            'targeted_dismissals': 0,
+            'legacy_clears': 0,
+            'no_overlay_found': 0,
+            'failures': 0,
+            'total_time': 0.0,
+            'last_time': 0.0
+        }
+        
+        # 檢測畫面錄製（供離線重播，預設關閉）
+        self.frame_recorder = None
+        
+        # 全畫面檢測的截圖範圍 (left, top, right, bottom)，None 表示整個螢幕
+        self.capture_bounds: Optional[Tuple[int, int, int, int]] = None
+        
+        # 共享記憶體畫面環狀緩衝與背景截圖執行緒（預設關閉）
+        self.frame_ring: Optional[FrameRing] = None
+        self.frame_capture: Optional[FrameCaptureThread] = None
+        self._ring_seq = 0  # 上次檢測的環狀緩衝畫面序號
+        
+        self.logger.info("圖像辨識模組初始化完成")
+    
+    def set_capture_backend(self, name: str) -> CaptureBackend:
+        """
+        切換截圖後端
+        
+        Args:
+            name: 後端名稱（"auto"、"pyautogui"、"mss"）
+            
+        Returns:
+            CaptureBackend: 新的截圖後端
+        """
+        previous = self.capture_backend
+        self.capture_backend = create_capture_backend(name, self.logger)
+        if previous is not self.capture_backend:
+            previous.close()
+        return self.capture_backend
+    
+    def register_template(self, name: str, template_path) -> Optional[TemplateHandle]:
+        """
+        註冊檢測用模板並預先解碼
+        
+        Args:
+            name: 模板名稱
+            template_path: 模板圖像路徑
+            
+        Returns:
+            Optional[TemplateHandle]: 模板控制代碼，檔案不存在則返回 None
+        """
+        return self.templates.register(name, template_path)
+    
+    def _discover_template_variants(self) -> Dict[str, Dict[str, Tuple[Path, float]]]:
+        """
+        收集模板變體：assets 內的預設圖像與 TEMPLATE_THEME_DIR 下各主題資料夾，
+        每個主題再依 TEMPLATE_VARIANT_SCALES 產生縮放版本
+        
+        Returns:
+            Dict[str, Dict[str, Tuple[Path, float]]]: 變體名稱（如 "dark@125"）-> 按鈕名稱 -> (圖像路徑, 縮放)
+        """
+        themes = {"default": {STOP_BUTTON: Path(config.STOP_BUTTON_IMAGE),
+                              SEND_BUTTON: Path(config.SEND_BUTTON_IMAGE)}}
+        theme_dir = Path(config.TEMPLATE_THEME_DIR)
+        if theme_dir.is_dir():
+            for folder in sorted(p for p in theme_dir.iterdir() if p.is_dir()):
+                themes[folder.name] = {name: folder / f"{name}.png" for name in (STOP_BUTTON, SEND_BUTTON)}
+        
+        variants = {}
+        for theme, paths in themes.items():
+            if not all(path.exists() for path in paths.values()):
+                continue
+            for scale in config.TEMPLATE_VARIANT_SCALES:
+                variants[f"{theme}@{round(scale * 100)}"] = {
+                    name: (path, scale) for name, path in paths.items()
+                }
+        
+        # 變體模板以 "按鈕名稱@變體" 註冊，辨識主題時才匹配
+        for variant, buttons in variants.items():
+            for name, (path, scale) in buttons.items():
+                self.templates.register(f"{name}@{variant}", path, scale)
+        return variants
+    
+    def identify_template_variant(self, frame: np.ndarray, screen_size: Tuple[int, int] = None) -> Optional[str]:
+        """
+        以單張全螢幕截圖辨識目前的主題與縮放，並將 stop / send 模板切換為該變體
+        
+        Args:
+            frame: 全螢幕截圖（BGR 或灰階）
+            screen_size: 螢幕解析度 (寬, 高)
+            
+        Returns:
+            Optional[str]: 辨識到的變體名稱，畫面上沒有任何變體的按鈕則返回 None
+        """
+        if screen_size is None:
+            screen_size = (frame.shape[1], frame.shape[0])
+        resolution = f"{screen_size[0]}x{screen_size[1]}"
+        thresholds = self.calibrated_thresholds.get(resolution, {})
+        
+        best_variant, best_margin = None, 0.0
+        for variant, buttons in self.template_variants.items():
+            for name in buttons:
+                handle = self.templates.get(f"{name}@{variant}")
+                if handle is None:
+                    continue
+                score, _ = self._match_handle(frame, handle, pooled=False)
+                margin = score - thresholds.get(name, config.IMAGE_CONFIDENCE)
+                if margin >= 0 and (best_variant is None or margin > best_margin):
+                    best_variant, best_margin = variant, margin
+        
+        if best_variant is None:
+            return None
+        self._activate_variant(best_variant)
+        return best_variant
+    
+    def _activate_variant(self, variant: str) -> None:
+        """將 stop / send 模板切換為指定變體"""
+        self.active_variant = variant
+        for name, (path, scale) in self.template_variants[variant].items():
+            self.templates.register(name, path, scale)
+        self.reset_frame_gate()
+        self.logger.info(f"辨識到模板變體: {variant}")
+    
+    def _should_identify_variant(self) -> bool:
+        """尚未辨識變體且距離上次嘗試超過重試間隔"""
+        if self.active_variant is not None or len(self.template_variants) < 2:
+            return False
+        return time.monotonic() - self._variant_checked_at >= config.TEMPLATE_VARIANT_RETRY_INTERVAL
+    
+    def register_error_template(self, category: str, template_path) -> Optional[TemplateHandle]:
+        """
+        註冊錯誤狀態模板
+        
+        Args:
+            category: 錯誤類別（rate_limit / auth / transient）
+            template_path: 模板圖像路徑（以檔名作為模板名稱）
+            
+        Returns:
+            Optional[TemplateHandle]: 模板控制代碼，檔案不存在則返回 None
+        """
+        name = f"error:{Path(template_path).stem}"
+        self.error_templates[name] = category
+        return self.register_template(name, template_path)
+    
+    def match_templates(self, frame: np.ndarray, names: Iterable[str] = None,
+                        confidence: float = None, use_learned_roi: bool = False,
+                        origin: Tuple[int, int] = (0, 0),
+                        screen_size: Tuple[int, int] = None) -> DetectionStatus:
+        """
+        在同一張截圖上一次匹配多個模板
+        
+        Args:
+            frame: BGR 格式截圖
+            names: 要匹配的模板名稱，None 表示所有已註冊模板
+            confidence: 匹配信心度閾值，None 表示使用校正過的模板閾值（沒有則為 IMAGE_CONFIDENCE）
+            use_learned_roi: 是否先在學習到的 ROI 內搜尋
+            origin: frame 左上角在螢幕上的座標（區域截圖時使用）
+            screen_size: 螢幕解析度 (width, height)，None 表示 frame 即為全螢幕
+            
+        Returns:
+            DetectionStatus: 各模板的分數與位置（螢幕座標）
+        """
+        names = self.templates.names() if names is None else list(names)
+        if screen_size is None:
+            screen_size = (frame.shape[1], frame.shape[0])
+        
+        status = DetectionStatus(frame_size=screen_size)
+        match_start = time.perf_counter()
+        use_learned_roi = use_learned_roi and config.ROI_SEARCH_ENABLED
+        resolution = f"{screen_size[0]}x{screen_size[1]}"
+        origin_x, origin_y = origin
+        
+        # 各模板使用的閾值
+        calibrated = self.calibrated_thresholds.get(resolution, {}) if confidence is None else {}
+        default_confidence = config.IMAGE_CONFIDENCE if confidence is None else confidence
+        thresholds = {name: calibrated.get(name, default_confidence) for name in names}
+        
+        # 各模板的匹配耗時與搜尋範圍（統計用）
+        match_times: Dict[str, float] = {}
+        roi_searched = set()
+        full_searched = set()
+        
+        # 第一輪：有學習到 ROI 時只在 ROI 內搜尋
+        pending = []
+        for name in names:
+            match = TemplateMatch(name=name)
+            handle = self.templates.get(name)
+            status.matches[name] = match
+            
+            if handle is None:
+                continue
+            
+            roi = None
+            if use_learned_roi:
+                roi = self._to_frame_rect(self._get_search_roi(resolution, name, screen_size),
+                                          origin, frame.shape)
+            if roi is not None:
+                left, top, right, bottom = roi
+                template_start = time.perf_counter()
+                score, box = self._match_handle(frame[top:bottom, left:right], handle)
+                match_times[name] = time.perf_counter() - template_start
+                roi_searched.add(name)
+                match.score = score
+                if box is not None and score >= thresholds[name]:
+                    match.found = True
+                    match.used_roi = True
+                    match.box = Box(box.left + left + origin_x, box.top + top + origin_y,
+                                    box.width, box.height)
+                    continue
+            pending.append((match, handle))
+        
+        # 第二輪：任何模板在 ROI 內命中表示面板沒有移動，其餘模板視為不存在；
+        # 否則回退整張截圖搜尋（由粗到細，各模板共用同一組縮小的截圖）
+        roi_hit = any(match.used_roi for match in status.matches.values())
+        frame_pyramid: Dict[int, np.ndarray] = {}
+        for match, handle in pending:
+            if roi_hit:
+                continue
+            template_start = time.perf_counter()
+            score, box = self._match_handle(frame, handle, threshold=thresholds[match.name],
+                                            frame_pyramid=frame_pyramid)
+            match_times[match.name] = match_times.get(match.name, 0.0) + time.perf_counter() - template_start
+            full_searched.add(match.name)
+            match.score = max(match.score, score)
+            if box is not None and score >= thresholds[match.name]:
+                match.found = True
+                match.box = Box(box.left + origin_x, box.top + origin_y, box.width, box.height)
+        
+        for name, match in status.matches.items():
+            if use_learned_roi and match.found:
+                self._learn_roi(resolution, name, match.box)
+            self.logger.image_recognition(f"{name}.png", match.found,
+                                          match.score if match.found else None)
+            if name in match_times:
+                self.metrics.record_match(name, match.score, match.found, name in roi_searched,
+                                          name in full_searched, match.used_roi,
+                                          match_times[name], thresholds[name])
+        
+        status.match_time = time.perf_counter() - match_start
+        return status
+    
+    @staticmethod
+    def _to_frame_rect(rect: Optional[Tuple[int, int, int, int]], origin: Tuple[int, int],
+                       frame_shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+        """將螢幕座標矩形 (left, top, right, bottom) 轉換為截圖內座標並裁切，無交集則返回 None"""
+        if rect is None:
+            return None
+        left = max(0, rect[0] - origin[0])
+        top = max(0, rect[1] - origin[1])
+        right = min(frame_shape[1], rect[2] - origin[0])
+        bottom = min(frame_shape[0], rect[3] - origin[1])
+        if right <= left or bottom <= top:
+            return None
+        return left, top, right, bottom
+    
+    def _match_handle(self, frame: np.ndarray, handle: TemplateHandle,
+                      pooled: bool = True, threshold: float = None,
+                      frame_pyramid: Dict[int, np.ndarray] = None) -> Tuple[float, Optional[Box]]:
+        """
+        在截圖中尋找模板的最佳匹配
+        
+        Args:
+            frame: 截圖（BGR 或灰階）
+            handle: 模板控制代碼
+            pooled: 是否將匹配結果寫入緩衝區池（偶爾執行的匹配不保留緩衝區）
+            threshold: 信心度閾值；提供時大截圖改用由粗到細匹配，候選位置達到閾值即提前結束
+            frame_pyramid: 同一張截圖縮小後的影像快取（層數 -> 灰階影像），多個模板共用
+        
+        Returns:
+            Tuple[float, Optional[Box]]: (最佳分數, 最佳位置)，模板大於截圖時為 (0.0, None)
+        """
+        if handle.height > frame.shape[0] or handle.width > frame.shape[1]:
+            return 0.0, None
+        
+        if threshold is not None and pooled:
+            level = self._pyramid_level(frame, handle)
+            if level:
+                return self._match_coarse_to_fine(frame, handle, level, threshold,
+                                                  {} if frame_pyramid is None else frame_pyramid)
+        
+        template = handle.gray if frame.ndim == 2 else handle.color
+        result_shape = (frame.shape[0] - handle.height + 1, frame.shape[1] - handle.width + 1)
+        result = None
+        if pooled:
+            result = self.frame_pool.get(f"match:{handle.name}:{result_shape[0]}x{result_shape[1]}",
+                                         result_shape, np.float32)
+        result = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED, result=result)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return float(max_val), Box(max_loc[0], max_loc[1], handle.width, handle.height)
+    
+    @staticmethod
+    def _pyramid_level(frame: np.ndarray, handle: TemplateHandle) -> int:
+        """
+        選擇粗搜尋使用的金字塔層數，0 表示直接以原尺寸匹配
+        按鈕模板只有約 20 像素，縮小到 1/4 以下時特徵會消失，因此依模板縮小後的尺寸決定實際層數
+        """
+        if not config.PYRAMID_MATCH_ENABLED or frame.shape[0] * frame.shape[1] < config.PYRAMID_MIN_FRAME_PIXELS:
+            return 0
+        level = min(config.PYRAMID_MATCH_LEVEL, len(handle.pyramid) - 1)
+        while level > 0 and min(handle.pyramid[level].shape[:2]) < config.PYRAMID_MIN_TEMPLATE_SIDE:
+            level -= 1
+        return level
+    
+    def _frame_level(self, frame: np.ndarray, level: int,
+                     frame_pyramid: Dict[int, np.ndarray]) -> np.ndarray:
+        """取得截圖縮小 level 層後的灰階影像（寫入緩衝區池，並快取供其他模板使用）"""
+        if level in frame_pyramid:
+            return frame_pyramid[level]
+        
+        current = frame
+        for index in range(1, level + 1):
+            size = ((current.shape[1] + 1) // 2, (current.shape[0] + 1) // 2)
+            shape = (size[1], size[0]) + current.shape[2:]
+            current = cv2.pyrDown(current, dst=self.frame_pool.get(
+                f"pyramid:{index}:{'x'.join(map(str, shape))}", shape), dstsize=size)
+        
+        if current.ndim == 3:
+            current = cv2.cvtColor(current, cv2.COLOR_BGR2GRAY, dst=self.frame_pool.get(
+                f"pyramid:{level}:gray:{current.shape[0]}x{current.shape[1]}", current.shape[:2]))
+        frame_pyramid[level] = current
+        return current
+    
+    def _match_coarse_to_fine(self, frame: np.ndarray, handle: TemplateHandle, level: int,
+                              threshold: float, frame_pyramid: Dict[int, np.ndarray]) -> Tuple[float, Optional[Box]]:
+        """
+        由粗到細匹配：先在縮小的灰階截圖上找出數個候選位置，再只在候選位置附近以原尺寸匹配
+        
+        候選位置依粗搜尋分數由高到低精確匹配，達到閾值即返回；都未達到時返回精確匹配的最高分數
+        """
+        coarse = self._frame_level(frame, level, frame_pyramid)
+        coarse_template = handle.pyramid[level]
+        result_shape = (coarse.shape[0] - coarse_template.shape[0] + 1,
+                        coarse.shape[1] - coarse_template.shape[1] + 1)
+        if result_shape[0] <= 0 or result_shape[1] <= 0:
+            return 0.0, None
+        result = self.frame_pool.get(f"match:{handle.name}:L{level}:{result_shape[0]}x{result_shape[1]}",
+                                     result_shape, np.float32)
+        result = cv2.matchTemplate(coarse, coarse_template, cv2.TM_CCOEFF_NORMED, result=result)
+        
+        template = handle.gray if frame.ndim == 2 else handle.color
+        factor = 2 ** level
+        padding = factor + config.PYRAMID_REFINE_PADDING
+        suppress_h = max(1, coarse_template.shape[0] // 2)
+        suppress_w = max(1, coarse_template.shape[1] // 2)
+        best_score, best_box = 0.0, None
+        
+        for index in range(config.PYRAMID_CANDIDATES):
+            _, coarse_score, _, (x, y) = cv2.minMaxLoc(result)
+            if index and coarse_score < threshold - config.PYRAMID_CANDIDATE_MARGIN:
+                break
+            # 抑制此候選位置附近，下一輪取得其他位置
+            result[max(0, y - suppress_h):y + suppress_h + 1, max(0, x - suppress_w):x + suppress_w + 1] = -1.0
+            
+            left = max(0, x * factor - padding)
+            top = max(0, y * factor - padding)
+            right = min(frame.shape[1], x * factor + handle.width + padding)
+            bottom = min(frame.shape[0], y * factor + handle.height + padding)
+            if right - left < handle.width or bottom - top < handle.height:
+                continue
+            
+            refined = cv2.matchTemplate(frame[top:bottom, left:right], template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (fx, fy) = cv2.minMaxLoc(refined)
+            if best_box is None or score > best_score:
+                best_score = float(score)
+                best_box = Box(left + fx, top + fy, handle.width, handle.height)
+            if best_score >= threshold:
+                break
+        
+        return best_score, best_box
+    
+    def _get_search_roi(self, resolution: str, name: Optional[str],
+                        screen_size: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        取得模板的搜尋區域 (left, top, right, bottom)，螢幕座標
+        沒有學習過該模板時，使用同解析度下其他模板位置的外接矩形（stop / send 按鈕位於同一處）
+        """
+        rois = self.learned_rois.get(resolution, {})
+        boxes = [rois[name]] if name in rois else list(rois.values())
+        if not boxes:
+            return None
+        
+        padding = config.ROI_PADDING
+        left = max(0, min(box.left for box in boxes) - padding)
+        top = max(0, min(box.top for box in boxes) - padding)
+        right = min(screen_size[0], max(box.left + box.width for box in boxes) + padding)
+        bottom = min(screen_size[1], max(box.top + box.height for box in boxes) + padding)
+        return left, top, right, bottom
+    
+    def _get_chat_roi(self, screen_size: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+        """取得目前解析度下所有學習到 ROI 的外接矩形（聊天面板底部按鈕區域，螢幕座標）"""
+        resolution = f"{screen_size[0]}x{screen_size[1]}"
+        return self._get_search_roi(resolution, None, screen_size)
+    
+    def _learn_roi(self, resolution: str, name: str, box: Box) -> None:
+        """記錄模板位置，位置變動時寫入快取檔案"""
+        rois = self.learned_rois.setdefault(resolution, {})
+        if rois.get(name) == box:
+            return
+        
+        rois[name] = box
+        self.logger.debug(f"學習到模板 {name} 的位置: {tuple(box)} ({resolution})")
+        self._save_learned_rois()
+    
+    def _load_learned_rois(self) -> Dict[str, Dict[str, Box]]:
+        """從快取檔案載入各解析度下的 ROI"""
+        try:
+            if not self.roi_file.exists():
+                return {}
+            with open(self.roi_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            rois = {
+                resolution: {name: Box(*values) for name, values in boxes.items()}
+                for resolution, boxes in data.items()
+            }
+            self.logger.info(f"已載入學習到的 ROI: {', '.join(rois.keys()) or '無'}")
+            return rois
+        except Exception as e:
+            self.logger.warning(f"載入 ROI 快取失敗，將重新學習: {str(e)}")
+            return {}
+    
+    def _save_learned_rois(self) -> None:
+        """將學習到的 ROI 寫入快取檔案"""
+        try:
+            self.roi_file.parent.mkdir(parents=True, exist_ok=True)
+            data = {
+                resolution: {name: list(box) for name, box in boxes.items()}
+                for resolution, boxes in self.learned_rois.items()
+            }
+            with open(self.roi_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.warning(f"儲存 ROI 快取失敗: {str(e)}")
+    
+    def detect_copilot_state(self, frame: np.ndarray = None, origin: Tuple[int, int] = (0, 0),
+                             screen_size: Tuple[int, int] = None) -> DetectionStatus:
+        """
+        截取一次螢幕並同時檢測 stop / send 按鈕
+        已學習到聊天區域時只截取該區域，區域內找不到任何按鈕才改截全螢幕
+        
+        Args:
+            frame: 已取得的截圖（BGR 或灰階），None 表示重新截圖
+            origin: frame 左上角的螢幕座標（區域截圖時使用）
+            screen_size: 螢幕解析度 (寬, 高)，None 表示 frame 即為全螢幕
+            
+        Returns:
+            DetectionStatus: 檢測結果，截圖失敗時所有模板皆為未找到
+        """
+        with self._detect_lock:
+            if frame is not None:
+                status = self._detect_in_frame(frame, origin, screen_size)
+            else:
+                status = self._detect_from_screen()
+        self.metrics.record_detection(status.state.value, status.capture_time, status.match_time,
+                                      status.from_cache)
+        return status
+    
+    def _detect_from_screen(self) -> DetectionStatus:
+        """截圖並檢測，優先只截取學習到的聊天區域"""
+        self.frame_pool.begin_poll()
+        try:
+            screen_size = self.capture_backend.screen_size()
+            chat_roi = self._get_chat_roi(screen_size) if config.CAPTURE_CHAT_ROI_ONLY else None
+            
+            # 背景截圖執行緒已截取畫面時直接在共享的畫面上檢測
+            status = self._detect_from_ring(screen_size)
+            if status is not None:
+                return status
+            
+            # 聊天區域自上次檢測以來沒有被重繪時直接沿用上次結果
+            cached = self._undamaged_status(chat_roi)
+            if cached is not None:
+                return cached
+            
+            if chat_roi is not None:
+                left, top, right, bottom = chat_roi
+                capture_start = time.perf_counter()
+                frame = self._grab_detection_frame((left, top, right - left, bottom - top))
+                capture_time = time.perf_counter() - capture_start
+                
+                if frame is not None:
+                    status = self._detect_in_frame(frame, (left, top), screen_size, capture_time)
+                    if status.has_stop_button or status.has_send_button:
+                        return self._check_error_banner(status, screen_size)
+                    self.logger.debug("聊天區域內未找到按鈕，改用全螢幕截圖")
+            
+            # 聊天區域外或尚未學習：截取 VS Code 視窗範圍（未設定時為全螢幕）
+            bounds = self.capture_bounds
+            capture_start = time.perf_counter()
+            if bounds is not None:
+                frame = self._grab_detection_frame((bounds[0], bounds[1], bounds[2] - bounds[0],
+                                                    bounds[3] - bounds[1]))
+            else:
+                frame = self._grab_detection_frame()
+            capture_time = time.perf_counter() - capture_start
+            
+            if frame is None:
+                return DetectionStatus(matches={
+                    name: TemplateMatch(name=name) for name in (STOP_BUTTON, SEND_BUTTON)
+                })
+            if bounds is not None:
+                return self._detect_in_frame(frame, bounds[:2], screen_size, capture_time)
+            return self._detect_in_frame(frame, capture_time=capture_time)
+        finally:
+            self.frame_pool.end_poll()
+    
+    def _detect_from_ring(self, screen_size: Tuple[int, int]) -> Optional[DetectionStatus]:
+        """
+        在環狀緩衝的最新畫面上檢測（不複製畫面）
+        
+        畫面序號與上次相同時沿用上次結果；檢測期間該槽被覆寫時捨棄結果，改用下一張畫面
+        
+        Returns:
+            Optional[DetectionStatus]: 檢測結果，沒有可用的畫面時返回 None
+        """
+        for _ in range(2):
+            ring_frame = self.latest_ring_frame()
+            if ring_frame is None:
+                return None
+            if ring_frame.seq == self._ring_seq and self._gate_status is not None:
+                self.frame_gate_hits += 1
+                return replace(self._gate_status, capture_time=0.0, match_time=0.0,
+                               timestamp=time.time(), from_cache=True)
+            
+            status = self._detect_in_frame(ring_frame.frame, ring_frame.origin, screen_size)
+            if self.frame_ring.is_valid(ring_frame):
+                self._ring_seq = ring_frame.seq
+                return status
+            self.logger.debug(f"畫面 {ring_frame.seq} 在檢測期間被覆寫，改用最新畫面")
+            self.reset_frame_gate()
+        return None
+    
+    def latest_ring_frame(self) -> Optional[RingFrame]:
+        """
+        取得背景截圖執行緒的最新畫面（共享記憶體視圖，不可修改）
+        
+        Returns:
+            Optional[RingFrame]: 未啟動、尚未截圖或畫面超過 FRAME_RING_MAX_AGE 未更新時返回 None
+        """
+        if self.frame_capture is None or not self.frame_capture.is_running:
+            return None
+        ring_frame = self.frame_ring.latest()
+        if ring_frame is None or time.time() - ring_frame.timestamp > config.FRAME_RING_MAX_AGE:
+            return None
+        return ring_frame
+    
+    def start_frame_ring(self, rate_hz: float = None) -> FrameRing:
+        """
+        啟動背景截圖執行緒，以固定頻率截取全畫面檢測範圍（VS Code 視窗或整個螢幕）寫入環狀緩衝
+        已啟動則直接返回
+        
+        Args:
+            rate_hz: 每秒截圖次數，None 表示使用配置值
+            
+        Returns:
+            FrameRing: 環狀緩衝（其他進程可以 FrameRing(name=ring.name, create=False) 連接）
+        """
+        with self._detect_lock:
+            if self.frame_capture is not None and self.frame_capture.is_running:
+                return self.frame_ring
+            self.stop_frame_ring()
+            
+            if self.capture_bounds is not None:
+                left, top, right, bottom = self.capture_bounds
+            else:
+                left, top = 0, 0
+                right, bottom = self.capture_backend.screen_size()
+            shape = (bottom - top, right - left) if config.DETECTION_GRAYSCALE \
+                else (bottom - top, right - left, 3)
+            region = (left, top, right - left, bottom - top) if self.capture_bounds is not None else None
+            
+            self.frame_ring = FrameRing(shape)
+            self.frame_capture = FrameCaptureThread(self.capture_backend, self.frame_ring, rate_hz, region)
+            self.frame_capture.start()
+            self._ring_seq = 0
+            return self.frame_ring
+    
+    def stop_frame_ring(self) -> None:
+        """停止背景截圖執行緒並釋放環狀緩衝"""
+        with self._detect_lock:
+            if self.frame_capture is not None:
+                self.frame_capture.stop()
+                self.logger.info(f"背景截圖統計: {self.frame_capture.stats()}")
+                self.frame_capture = None
+            if self.frame_ring is not None:
+                self.frame_ring.close()
+                self.frame_ring = None
+    
+    def _undamaged_status(self, chat_roi: Optional[Tuple[int, int, int, int]]) -> Optional[DetectionStatus]:
+        """
+        截圖後端追蹤 XDamage 時，聊天區域沒有被重繪則返回上次的檢測結果
+        
+        每次檢測都取走累積的損壞區域（實際截圖前取走，截圖期間的重繪留到下一次）；
+        上次沒有找到按鈕或結果超過 FRAME_GATE_MAX_AGE 時仍需截圖
+        
+        Returns:
+            Optional[DetectionStatus]: 沿用的結果，需要截圖時返回 None
+        """
+        damage = getattr(self.capture_backend, "damage", None)
+        if damage is None or chat_roi is None:
+            return None
+        
+        damaged = damage.consume(chat_roi)
+        cached = self._gate_status
+        if (damaged or cached is None or not (cached.has_stop_button or cached.has_send_button)
+                or time.monotonic() - self._gate_matched_at > config.FRAME_GATE_MAX_AGE):
+            return None
+        
+        self.frame_gate_hits += 1
+        return replace(cached, capture_time=0.0, match_time=0.0, timestamp=time.time(), from_cache=True)
+    
+    def _check_error_banner(self, status: DetectionStatus,
+                            screen_size: Tuple[int, int]) -> DetectionStatus:
+        """區域截圖的結果不包含回應內容，另外截取聊天區域上方檢查錯誤訊息"""
+        if status.has_stop_button or not self._active_error_templates():
+            return status
+        
+        left, top, right, bottom = self._get_error_search_region(screen_size)
+        frame = self._grab_detection_frame((left, top, right - left, bottom - top))
+        if frame is not None:
+            status.error = self._find_error_banner(frame, (left, top), screen_size)
+        return status
+    
+    def _active_error_templates(self) -> List[str]:
+        """取得模板檔案存在的錯誤狀態模板名稱"""
+        return [name for name in self.error_templates if self.templates.get(name) is not None]
+    
+    def _get_error_search_region(self, screen_size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """
+        錯誤訊息出現在輸入框上方的回應區域：由聊天區域右下角往左、往上各延伸設定的寬高
+        尚未學習到聊天區域時搜尋螢幕右半部
+        
+        Returns:
+            Tuple[int, int, int, int]: (left, top, right, bottom) 螢幕座標
+        """
+        chat_roi = self._get_chat_roi(screen_size)
+        if chat_roi is None:
+            return screen_size[0] // 2, 0, screen_size[0], screen_size[1]
+        
+        right, bottom = chat_roi[2], chat_roi[3]
+        return (max(0, right - config.COPILOT_ERROR_SEARCH_WIDTH),
+                max(0, bottom - config.COPILOT_ERROR_SEARCH_HEIGHT), right, bottom)
+    
+    def _get_progress_region(self, screen_size: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        取得回應區域：聊天區域（輸入框與按鈕）正上方，寬高由設定決定
+        
+        Returns:
+            Optional[Tuple[int, int, int, int]]: (left, top, right, bottom) 螢幕座標，尚未學習到聊天區域則返回 None
+        """
+        chat_roi = self._get_chat_roi(screen_size)
+        if chat_roi is None:
+            return None
+        right, bottom = chat_roi[2], chat_roi[1]
+        top = max(0, bottom - config.CHAT_PROGRESS_HEIGHT)
+        if bottom - top < 8:
+            return None
+        return max(0, right - config.CHAT_PROGRESS_WIDTH), top, right, bottom
+    
+    def _find_error_banner(self, frame: np.ndarray, origin: Tuple[int, int],
+                           screen_size: Tuple[int, int]) -> Optional[str]:
+        """
+        在畫面的錯誤搜尋區域內匹配錯誤狀態模板
+        
+        Returns:
+            Optional[str]: 分數最高的錯誤類別，沒有則返回 None
+        """
+        names = self._active_error_templates()
+        if not names:
+            return None
+        
+        rect = self._to_frame_rect(self._get_error_search_region(screen_size), origin, frame.shape)
+        if rect is None:
+            return None
+        left, top, right, bottom = rect
+        result = self.match_templates(frame[top:bottom, left:right], names,
+                                      origin=(origin[0] + left, origin[1] + top), screen_size=screen_size)
+        
+        found = [match for match in result.matches.values() if match.found]
+        if not found:
+            return None
+        best = max(found, key=lambda match: match.score)
+        category = self.error_templates[best.name]
+        self.logger.warning(f"⚠️ 檢測到 Copilot 錯誤訊息: {category} ({best.name}, 信心度: {best.score:.2f})")
+        return category
+    
+    def _grab_detection_frame(self, region: Tuple[int, int, int, int] = None) -> Optional[np.ndarray]:
+        """
+        截取檢測用畫面：灰階模式下直接寫入預先配置的緩衝區並返回其視圖
+        
+        Args:
+            region: 截圖區域 (left, top, width, height)，None 表示全螢幕
+            
+        Returns:
+            Optional[np.ndarray]: 灰階或 BGR 截圖，失敗則返回 None
+        """
+        if not config.DETECTION_GRAYSCALE:
+            return self.take_screenshot(region=region)
+        
+        try:
+            self.screenshot_count += 1
+            return self.capture_backend.grab_gray(region, self.frame_pool)
+        except Exception as e:
+            self.logger.error(f"截圖失敗: {str(e)}")
+            return None
+    
+    def _detect_in_frame(self, frame: np.ndarray, origin: Tuple[int, int] = (0, 0),
+                         screen_size: Tuple[int, int] = None,
+                         capture_time: float = 0.0) -> DetectionStatus:
+        """在已取得的截圖（全螢幕或區域）上檢測 stop / send 按鈕，畫面未變動時沿用上次結果"""
+        if screen_size is None:
+            screen_size = (frame.shape[1], frame.shape[0])
+        
+        signature = self._frame_signature(frame, origin, screen_size)
+        if self._frame_unchanged(signature):
+            self.frame_gate_hits += 1
+            self.logger.debug("聊天區域未變動，沿用上次檢測結果")
+            return replace(self._gate_status, capture_time=capture_time, match_time=0.0,
+                           timestamp=time.time(), from_cache=True)
+        
+        self.frame_gate_misses += 1
+        full_frame = self._is_full_frame(frame, origin, screen_size)
+        
+        # 聊天區域截圖：分類器確定狀態時不需要逐一匹配 stop / send 模板
+        status = None
+        if self.ui_classifier is not None and not full_frame:
+            match_start = time.perf_counter()
+            status = self._classify_chat_roi(frame, origin, screen_size)
+            if status is not None:
+                status.match_time = time.perf_counter() - match_start
+        if status is None:
+            status = self.match_templates(frame, (STOP_BUTTON, SEND_BUTTON), use_learned_roi=True,
+                                          origin=origin, screen_size=screen_size)
+        
+        # 全螢幕（或 VS Code 視窗）畫面仍找不到按鈕且尚未辨識主題時，以此畫面辨識一次模板變體
+        if (full_frame and not status.has_stop_button and not status.has_send_button
+                and self._should_identify_variant()):
+            self._variant_checked_at = time.monotonic()
+            if self.identify_template_variant(frame, screen_size):
+                status = self.match_templates(frame, (STOP_BUTTON, SEND_BUTTON), use_learned_roi=True,
+                                              origin=origin, screen_size=screen_size)
+        status.capture_time = capture_time
+        
+        # 啟動時的模板已能找到按鈕，不需要再辨識主題
+        if self.active_variant is None and (status.has_stop_button or status.has_send_button):
+            self.active_variant = self._default_variant
+        
+        # 全螢幕畫面：沒有 stop 按鈕時檢查錯誤訊息，兩個按鈕都找不到時檢查是否有通知遮擋聊天區域
+        if full_frame:
+            if not status.has_stop_button:
+                status.error = self._find_error_banner(frame, origin, screen_size)
+            if not status.has_stop_button and not status.has_send_button:
+                status.notification = self._find_occluding_notification(frame, origin, screen_size)
+        
+        self._gate_signature = signature
+        self._signature_slot = 1 - self._signature_slot
+        self._gate_status = status
+        self._gate_matched_at = time.monotonic()
+        
+        if self.frame_recorder is not None:
+            self._record_frame(frame, origin, screen_size, status)
+        return status
+    
+    def _is_full_frame(self, frame: np.ndarray, origin: Tuple[int, int],
+                       screen_size: Tuple[int, int]) -> bool:
+        """畫面是否涵蓋整個螢幕，或設定的 VS Code 視窗範圍"""
+        if frame.shape[1] == screen_size[0] and frame.shape[0] == screen_size[1]:
+            return True
+        rect = (origin[0], origin[1], origin[0] + frame.shape[1], origin[1] + frame.shape[0])
+        return self.capture_bounds is not None and rect == self.capture_bounds
+    
+    def set_capture_bounds(self, rect: Optional[Tuple[int, int, int, int]]) -> None:
+        """
+        限制全畫面檢測的截圖範圍（例如 VS Code 視窗），聊天區域截圖不受影響
+        
+        Args:
+            rect: (left, top, right, bottom) 螢幕座標，None 表示恢復截取整個螢幕
+        """
+        if rect is not None:
+            width, height = self.capture_backend.screen_size()
+            rect = (max(0, rect[0]), max(0, rect[1]), min(width, rect[2]), min(height, rect[3]))
+            if rect[2] - rect[0] <= 0 or rect[3] - rect[1] <= 0:
+                self.logger.warning(f"截圖範圍不在螢幕內，改為截取整個螢幕: {rect}")
+                rect = None
+        
+        with self._detect_lock:
+            if rect == self.capture_bounds:
+                return
+            self.capture_bounds = rect
+            self.reset_frame_gate()
+            # 環狀緩衝的畫面大小隨截圖範圍改變，重新建立
+            if self.frame_capture is not None:
+                rate_hz = self.frame_capture.rate_hz
+                self.stop_frame_ring()
+                self.start_frame_ring(rate_hz)
+        self.logger.info(f"全畫面檢測範圍: {rect if rect else '整個螢幕'}")
+    
+    def _record_frame(self, frame: np.ndarray, origin: Tuple[int, int],
+                      screen_size: Tuple[int, int], status: DetectionStatus) -> None:
+        """錄製檢測畫面，設定只錄聊天區域且已學習到位置時裁切後再保存"""
+        if config.DETECTION_RECORD_ROI_ONLY:
+            roi = self._get_chat_roi(screen_size)
+            rect = self._to_frame_rect(roi, origin, frame.shape) if roi else None
+            if rect is not None:
+                left, top, right, bottom = rect
+                frame = frame[top:bottom, left:right]
+                origin = (origin[0] + left, origin[1] + top)
+        self.frame_recorder.record(frame, status, origin, screen_size)
+    
+    def start_recording(self, session_name: str = None) -> None:
+        """開始錄製檢測畫面（每次實際匹配的畫面都會保存）"""
+        from src.detection_replay import FrameRecorder
+        with self._detect_lock:
+            if self.frame_recorder is not None:
+                self.frame_recorder.close()
+            self.frame_recorder = FrameRecorder(session_name)
+    
+    def stop_recording(self) -> None:
+        """停止錄製檢測畫面"""
+        with self._detect_lock:
+            if self.frame_recorder is not None:
+                self.frame_recorder.close()
+                self.frame_recorder = None
+    
+    def _find_occluding_notification(self, frame: np.ndarray, origin: Tuple[int, int],
+                                     screen_size: Tuple[int, int]) -> Optional[Box]:
+        """
+        在螢幕右半部尋找通知的關閉按鈕，並判斷該通知是否遮擋聊天區域
+        VS Code 通知固定在右下角，由關閉按鈕往左 NOTIFICATION_TOAST_WIDTH、往下至螢幕底部估計通知範圍
+        
+        Returns:
+            Optional[Box]: 遮擋聊天區域的通知關閉按鈕位置（螢幕座標），沒有則返回 None
+        """
+        if self.templates.get(NOTIFICATION_CLOSE) is None:
+            return None
+        
+        half = frame.shape[1] // 2
+        toast = self.match_templates(frame[:, half:], (NOTIFICATION_CLOSE,),
+                                     origin=(origin[0] + half, origin[1]), screen_size=screen_size)
+        close_box = toast.box(NOTIFICATION_CLOSE)
+        if close_box is None:
+            return None
+        
+        chat_roi = self._get_chat_roi(screen_size)
+        if chat_roi is None:
+            # 尚未學習到聊天區域，無法判斷是否遮擋，視為遮擋
+            return close_box
+        
+        right = close_box.left + close_box.width + 10
+        toast_rect = (right - config.NOTIFICATION_TOAST_WIDTH, close_box.top - 10, right, screen_size[1])
+        overlaps = (toast_rect[0] < chat_roi[2] and chat_roi[0] < toast_rect[2]
+                    and toast_rect[1] < chat_roi[3] and chat_roi[1] < toast_rect[3])
+        if not overlaps:
+            self.logger.debug(f"通知位於 {tuple(close_box)}，未遮擋聊天區域")
+            return None
+        return close_box
+    
+    def _frame_signature(self, frame: np.ndarray, origin: Tuple[int, int],
+                         screen_size: Tuple[int, int]) -> Optional[np.ndarray]:
+        """
+        計算聊天區域（學習到的 ROI 外接矩形）的縮小灰階簽章
+        尚未學習到 ROI 時使用整張截圖
+        """
+        if not config.FRAME_GATE_ENABLED:
+            return None
+        
+        roi = self._to_frame_rect(self._get_chat_roi(screen_size), origin, frame.shape)
+        if roi is not None:
+            left, top, right, bottom = roi
+            frame = frame[top:bottom, left:right]
+        
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        
+        # 上一次匹配時的簽章必須保留以供比較，寫入另一個緩衝區
+        size = (max(1, frame.shape[1] // config.FRAME_GATE_DOWNSAMPLE),
+                max(1, frame.shape[0] // config.FRAME_GATE_DOWNSAMPLE))
+        small = self.frame_pool.get(f"signature:{1 - self._signature_slot}", (size[1], size[0]))
+        return cv2.resize(frame, size, dst=small, interpolation=cv2.INTER_AREA)
+    
+    def _frame_unchanged(self, signature: Optional[np.ndarray]) -> bool:
+        """簽章與上次匹配時相同（最大差異不超過閾值）且快取未過期"""
+        previous = self._gate_signature
+        cached = self._gate_status
+        if signature is None or previous is None or cached is None:
+            return False
+        if previous.shape != signature.shape:
+            return False
+        if (not (cached.has_stop_button or cached.has_send_button)
+                and self._get_chat_roi(cached.frame_size) is not None):
+            # 簽章只涵蓋聊天區域，上次未找到按鈕時無法確認按鈕沒有出現在其他位置
+            return False
+        if time.monotonic() - self._gate_matched_at > config.FRAME_GATE_MAX_AGE:
+            return False
+        diff = cv2.absdiff(signature, previous,
+                           dst=self.frame_pool.get("signature:diff", signature.shape))
+        return int(diff.max()) <= config.FRAME_GATE_THRESHOLD
+    
+    def start_state_monitor(self, rate_hz: float = None) -> CopilotStateMonitor:
+        """
+        啟動背景狀態監控（已啟動則直接返回）
+        
+        Args:
+            rate_hz: 每秒檢測次數，None 表示使用配置值
+            
+        Returns:
+            CopilotStateMonitor: 背景狀態監控器
+        """
+        if self.state_monitor is None or not self.state_monitor.is_running:
+            self.state_monitor = CopilotStateMonitor(self, rate_hz)
+            self.state_monitor.start()
+        return self.state_monitor
+    
+    def stop_state_monitor(self) -> None:
+        """停止背景狀態監控"""
+        if self.state_monitor is not None:
+            self.state_monitor.stop()
+            self.state_monitor = None
+    
+    def get_frame_pipeline_stats(self) -> Dict:
+        """
+        取得檢測流程的記憶體配置統計
+        
+        Returns:
+            Dict: 緩衝區數量、總配置量與每次輪詢的配置次數 / 位元組
+        """
+        return self.frame_pool.stats()
+    
+    def reload_calibrated_thresholds(self) -> None:
+        """重新讀取本機的校正閾值（calibrate_thresholds.py 寫入後呼叫）"""
+        if not config.USE_CALIBRATED_THRESHOLDS:
+            self.calibrated_thresholds = {}
+            return
+        try:
+            self.calibrated_thresholds = load_thresholds()
+            for resolution, templates in self.calibrated_thresholds.items():
+                self.logger.info(f"使用校正閾值 ({resolution}): {templates}")
+        except Exception as e:
+            self.logger.warning(f"無法讀取校正閾值，使用預設信心度: {str(e)}")
+            self.calibrated_thresholds = {}
+    
+    def reload_ui_classifier(self) -> None:
+        """重新讀取縮圖分類器範例（train_ui_classifier.py 寫入後呼叫）"""
+        self.ui_classifier = None
+        if not config.UI_CLASSIFIER_ENABLED:
+            return
+        try:
+            self.ui_classifier = UIStateClassifier.load()
+            if self.ui_classifier is None:
+                self.logger.warning(f"找不到 UI 狀態分類器: {config.UI_CLASSIFIER_MODEL}，使用模板匹配")
+            else:
+                self.logger.info(f"使用 UI 狀態分類器 ({len(self.ui_classifier)} 個範例)")
+        except Exception as e:
+            self.logger.warning(f"無法讀取 UI 狀態分類器，使用模板匹配: {str(e)}")
+    
+    def _classify_chat_roi(self, frame: np.ndarray, origin: Tuple[int, int],
+                           screen_size: Tuple[int, int]) -> Optional[DetectionStatus]:
+        """
+        以縮圖分類器判斷聊天區域截圖的狀態
+        
+        idle / responding：按鈕位置沿用學習到的 ROI
+        error_banner：以錯誤模板取得類別，截圖未涵蓋錯誤搜尋區域或沒有模板時視為 transient
+        notification_overlay：以關閉按鈕模板取得位置，找不到時無法關閉通知
+        分類不確定或取不到位置時返回 None，改用模板匹配
+        """
+        prediction = self.ui_classifier.predict(frame)
+        if not prediction.confident:
+            self.logger.debug(f"分類器不確定 ({prediction.label}, 相似度 {prediction.similarity:.3f}, "
+                              f"差距 {prediction.margin:.3f})，改用模板匹配")
+            return None
+        
+        status = DetectionStatus(matches={
+            STOP_BUTTON: TemplateMatch(name=STOP_BUTTON),
+            SEND_BUTTON: TemplateMatch(name=SEND_BUTTON)
+        }, frame_size=screen_size, classified=prediction.label)
+        if prediction.label == CLASSIFIED_ERROR:
+            status.error = self._find_error_banner(frame, origin, screen_size) or "transient"
+            self.logger.warning(f"⚠️ 分類器判斷聊天區域顯示錯誤訊息: {status.error}")
+            return status
+        if prediction.label == CLASSIFIED_NOTIFICATION:
+            status.notification = self._find_occluding_notification(frame, origin, screen_size)
+            return status if status.notification is not None else None
+        if prediction.label not in (CLASSIFIED_IDLE, CLASSIFIED_RESPONDING):
+            return None
+        
+        name = STOP_BUTTON if prediction.label == CLASSIFIED_RESPONDING else SEND_BUTTON
+        box = self.learned_rois.get(f"{screen_size[0]}x{screen_size[1]}", {}).get(name)
+        if box is None:
+            return None
+        
+        status.matches[name] = TemplateMatch(name=name, found=True, score=prediction.similarity,
+                                             box=box, used_roi=True)
+        return status
+    
+    def get_detection_metrics(self) -> Dict:
+        """取得各模板的檢測耗時、分數與命中率統計"""
+        return self.metrics.snapshot()
+    
+    def reset_detection_metrics(self) -> None:
+        """重設檢測統計（每個專案開始時呼叫）"""
+        self.metrics.reset()
+    
+    def save_diagnostic_frame(self, reason: str, frame: np.ndarray = None) -> Optional[Path]:
+        """
+        保存異常當下的畫面供事後分析，編碼與寫入由背景執行緒完成
+        同一異常由多處回報（例如 CopilotHandler 與 ErrorHandler）時，間隔內只保存一次
+        
+        Args:
+            reason: 異常原因（用於檔名）
+            frame: 要保存的畫面，None 表示截取全螢幕
+            
+        Returns:
+            Optional[Path]: 將寫入的檔案路徑，未保存時返回 None
+        """
+        if not config.FRAME_DUMP_ENABLED:
+            return None
+        now = time.time()
+        if now - self._last_diagnostic_frame < config.FRAME_DUMP_MIN_INTERVAL:
+            return None
+        self._last_diagnostic_frame = now
+        
+        if frame is None:
+            # 背景截圖執行緒有最新畫面時複製一份，不另外截圖
+            ring_frame = self.latest_ring_frame()
+            frame = ring_frame.frame.copy() if ring_frame is not None else self.take_screenshot()
+        path = frame_dump_writer.submit(frame, reason=reason)
+        if path is not None:
+            self.logger.info(f"📸 保存診斷畫面 ({reason}): {path.name}")
+        return path
+    
+    def reset_frame_gate(self) -> None:
+        """清除閘門快取，下一次檢測必定執行模板匹配"""
+        self._gate_signature = None
+        self._gate_status = None
+    
+    def get_frame_gate_stats(self) -> Dict:
+        """
+        取得畫面變動閘門的命中統計
+        
+        Returns:
+            Dict: hits（跳過匹配次數）、misses（執行匹配次數）與命中率
+        """
+        total = self.frame_gate_hits + self.frame_gate_misses
+        return {
+            'hits': self.frame_gate_hits,
+            'misses': self.frame_gate_misses,
+            'hit_rate': self.frame_gate_hits / total if total else 0.0
+        }
     
     def take_screenshot(self, region: Tuple[int, int, int, int] = None, 
                        save_path: str = None) -> Optional[np.ndarray]:
@@ -33,7 +1947,7 @@ class ImageRecognition:
         
         Args:
             region: 截圖區域 (left, top, width, height)，None 表示全螢幕
-            save_path: 儲存截圖的路徑（可選）
+            save_path: 儲存截圖的路徑（可選，由背景執行緒寫入）
             
         Returns:
             Optional[np.ndarray]: 截圖的 numpy 陣列，失敗則返回 None
@@ -41,18 +1955,12 @@ class ImageRecognition:
         try:
             self.screenshot_count += 1
             
-            if region:
-                screenshot = pyautogui.screenshot(region=region)
-            else:
-                screenshot = pyautogui.screenshot()
-            
-            # 轉換為 OpenCV 格式
-            screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+            # 透過截圖後端取得 BGR 格式截圖
+            screenshot_cv = self.capture_backend.grab(region)
             
-            # 如果指定了儲存路徑，儲存截圖
+            # 如果指定了儲存路徑，交由背景執行緒壓縮寫入
             if save_path:
-                cv2.imwrite(save_path, screenshot_cv)
-                self.logger.debug(f"截圖已儲存: {save_path}")
+                frame_dump_writer.submit(screenshot_cv, Path(save_path))
             
             self.logger.debug(f"截圖完成 #{self.screenshot_count}")
             return screenshot_cv
@@ -61,59 +1969,56 @@ class ImageRecognition:
             self.logger.error(f"截圖失敗: {str(e)}")
             return None
     
-    def find_image_on_screen(self, template_path: str, confidence: float = None,
-                           region: Tuple[int, int, int, int] = None) -> Optional[Tuple[int, int, int, int]]:
+    def find_image_on_screen(self, template: TemplateRef, confidence: float = None,
+                           region: Tuple[int, int, int, int] = None) -> Optional[Box]:
         """
         在螢幕上尋找指定圖像
         
         Args:
-            template_path: 模板圖像路徑
+            template: 模板控制代碼（亦接受已註冊名稱或圖像路徑）
             confidence: 匹配信心度閾值
             region: 搜尋區域
             
         Returns:
-            Optional[Tuple[int, int, int, int]]: 找到的位置 (left, top, width, height)，失敗則返回 None
+            Optional[Box]: 找到的位置 (left, top, width, height)，失敗則返回 None
         """
         try:
-            template_path = Path(template_path)
-            if not template_path.exists():
-                self.logger.error(f"模板圖像不存在: {template_path}")
+            handle = self.templates.resolve(template)
+            if handle is None:
+                self.logger.error(f"模板圖像不存在: {template}")
                 return None
             
             if confidence is None:
-                confidence = config.IMAGE_CONFIDENCE
+                width, height = self.capture_backend.screen_size()
+                confidence = self.calibrated_thresholds.get(f"{width}x{height}", {}).get(
+                    handle.name, config.IMAGE_CONFIDENCE)
             
-            # 使用 pyautogui 的圖像識別功能
-            try:
-                location = pyautogui.locateOnScreen(
-                    str(template_path),
-                    confidence=confidence,
-                    region=region
-                )
-                
-                if location:
-                    self.logger.image_recognition(template_path.name, True, confidence)
-                    return location
-                else:
-                    self.logger.image_recognition(template_path.name, False)
-                    return None
-                    
-            except pyautogui.ImageNotFoundException:
-                self.logger.image_recognition(template_path.name, False)
+            frame = self.take_screenshot(region=region)
+            if frame is None:
+                return None
+            
+            score, box = self._match_handle(frame, handle, threshold=confidence)
+            if box is None or score < confidence:
+                self.logger.image_recognition(handle.path.name, False)
                 return None
+            
+            self.logger.image_recognition(handle.path.name, True, score)
+            if region:
+                box = Box(box.left + region[0], box.top + region[1], box.width, box.height)
+            return box
                 
         except Exception as e:
             self.logger.error(f"圖像識別過程中發生錯誤: {str(e)}")
             return None
     
-    def wait_for_image(self, template_path: str, timeout: int = 30,
+    def wait_for_image(self, template: TemplateRef, timeout: int = 30,
                       check_interval: float = 1.0, confidence: float = None,
                       region: Tuple[int, int, int, int] = None) -> bool:
         """
         等待指定圖像出現
         
         Args:
-            template_path: 模板圖像路徑
+            template: 模板控制代碼（亦接受已註冊名稱或圖像路徑）
             timeout: 超時時間（秒）
             check_interval: 檢查間隔（秒）
             confidence: 匹配信心度
@@ -123,13 +2028,18 @@ class ImageRecognition:
             bool: 是否找到圖像
         """
         try:
-            template_name = Path(template_path).name
+            handle = self.templates.resolve(template)
+            if handle is None:
+                self.logger.error(f"模板圖像不存在: {template}")
+                return False
+            
+            template_name = handle.path.name
             self.logger.info(f"等待圖像出現: {template_name} (超時: {timeout}秒)")
             
             start_time = time.time()
             
             while time.time() - start_time < timeout:
-                location = self.find_image_on_screen(template_path, confidence, region)
+                location = self.find_image_on_screen(handle, confidence, region)
                 
                 if location:
                     elapsed = time.time() - start_time
@@ -150,13 +2060,13 @@ class ImageRecognition:
             self.logger.error(f"等待圖像時發生錯誤: {str(e)}")
             return False
     
-    def click_on_image(self, template_path: str, confidence: float = None,
+    def click_on_image(self, template: TemplateRef, confidence: float = None,
                       region: Tuple[int, int, int, int] = None, offset: Tuple[int, int] = None) -> bool:
         """
         在找到的圖像上點擊
         
         Args:
-            template_path: 模板圖像路徑
+            template: 模板控制代碼（亦接受已註冊名稱或圖像路徑）
             confidence: 匹配信心度
             region: 搜尋區域
             offset: 點擊位置偏移 (x, y)
@@ -165,7 +2075,13 @@ class ImageRecognition:
             bool: 點擊是否成功
         """
         try:
-            location = self.find_image_on_screen(template_path, confidence, region)
+            handle = self.templates.resolve(template)
+            if handle is None:
+                self.logger.error(f"模板圖像不存在: {template}")
+                return False
+            
+            template_name = handle.path.name
+            location = self.find_image_on_screen(handle, confidence, region)
             
             if location:
                 # 計算點擊位置（圖像中心）
@@ -180,11 +2096,9 @@ class ImageRecognition:
                 # 執行點擊
                 pyautogui.click(click_x, click_y)
                 
-                template_name = Path(template_path).name
                 self.logger.info(f"✅ 點擊圖像 {template_name} 於位置 ({click_x}, {click_y})")
                 return True
             else:
-                template_name = Path(template_path).name
                 self.logger.warning(f"⚠️ 無法找到圖像 {template_name}，點擊失敗")
                 return False
                 
@@ -200,23 +2114,16 @@ class ImageRecognition:
             bool: 回應是否準備就緒
         """
         try:
-            # 第一步：檢查是否有 stop 按鈕（如果有，表示還在回應中）
-            stop_button = self.find_image_on_screen(
-                str(config.STOP_BUTTON_IMAGE),
-                confidence=config.IMAGE_CONFIDENCE
-            )
+            # 單次截圖同時檢測 stop / send 按鈕
+            detection = self.detect_copilot_state()
             
-            if stop_button:
+            # stop 按鈕存在表示還在回應中
+            if detection.has_stop_button:
                 self.logger.debug("檢測到 stop 按鈕，Copilot 仍在回應中...")
                 return False
             
-            # 第二步：檢查是否有 send 按鈕（stop 按鈕消失後應該出現 send 按鈕）
-            send_button = self.find_image_on_screen(
-                str(config.SEND_BUTTON_IMAGE),
-                confidence=config.IMAGE_CONFIDENCE
-            )
-            
-            if send_button:
+            # stop 按鈕消失後應該出現 send 按鈕
+            if detection.has_send_button:
                 self.logger.debug("檢測到 send 按鈕且無 stop 按鈕，Copilot 回應已完成")
                 return True
             
@@ -236,51 +2143,22 @@ class ImageRecognition:
             dict: 包含詳細狀態信息的字典
         """
         try:
-            status = {
-                'has_stop_button': False,
-                'has_send_button': False,
-                'is_responding': False,
-                'is_ready': False,
-                'status_message': '',
-                'notifications_cleared': False
-            }
-            
-            # 檢查 stop 按鈕
-            stop_button = self.find_image_on_screen(
-                str(config.STOP_BUTTON_IMAGE),
-                confidence=config.IMAGE_CONFIDENCE
-            )
-            status['has_stop_button'] = bool(stop_button)
-            
-            # 檢查 send 按鈕
-            send_button = self.find_image_on_screen(
-                str(config.SEND_BUTTON_IMAGE),
-                confidence=config.IMAGE_CONFIDENCE
-            )
-            status['has_send_button'] = bool(send_button)
+            # 單次截圖同時檢測 stop / send 按鈕
+            detection = self.detect_copilot_state()
+            status = detection.to_dict()
             
-            # 如果同時檢測不到兩個按鈕，立即清除通知
+            # 如果同時檢測不到兩個按鈕，清除遮擋聊天區域的通知
             if not status['has_stop_button'] and not status['has_send_button']:
-                self.logger.warning("⚠️ 同時檢測不到 stop 或 send 按鈕，執行通知清除")
+                self.logger.warning("⚠️ 同時檢測不到 stop 或 send 按鈕，檢查是否有通知遮擋")
                 
-                # 每次都嘗試清除通知
-                if self.clear_vscode_notifications():
+                if self.clear_occluding_notifications(detection):
                     status['notifications_cleared'] = True
                     
-                    # 清除通知後再次檢測
-                    time.sleep(1.5)  # 增加等待時間
-                    
-                    stop_button = self.find_image_on_screen(
-                        str(config.STOP_BUTTON_IMAGE),
-                        confidence=config.IMAGE_CONFIDENCE
-                    )
-                    send_button = self.find_image_on_screen(
-                        str(config.SEND_BUTTON_IMAGE),
-                        confidence=config.IMAGE_CONFIDENCE
-                    )
-                    
-                    status['has_stop_button'] = bool(stop_button)
-                    status['has_send_button'] = bool(send_button)
+                    # 清除通知後等待按鈕重新出現
+                    detection = self._wait_for_buttons(config.NOTIFICATION_CLEAR_SETTLE).to_dict()
+                    for key in ('has_stop_button', 'has_send_button', 'notification_overlay',
+                                'error_state', 'scores', 'boxes'):
+                        status[key] = detection[key]
             
             # 判斷狀態
             if status['has_stop_button']:
@@ -327,28 +2205,9 @@ class ImageRecognition:
             dict: 包含詳細狀態信息的字典
         """
         try:
-            status = {
-                'has_stop_button': False,
-                'has_send_button': False,
-                'is_responding': False,
-                'is_ready': False,
-                'status_message': '',
-                'notifications_cleared': False
-            }
-            
-            # 檢查 stop 按鈕
-            stop_button = self.find_image_on_screen(
-                str(config.STOP_BUTTON_IMAGE),
-                confidence=config.IMAGE_CONFIDENCE
-            )
-            status['has_stop_button'] = bool(stop_button)
-            
-            # 檢查 send 按鈕
-            send_button = self.find_image_on_screen(
-                str(config.SEND_BUTTON_IMAGE),
-                confidence=config.IMAGE_CONFIDENCE
-            )
-            status['has_send_button'] = bool(send_button)
+            # 單次截圖同時檢測 stop / send 按鈕
+            detection = self.detect_copilot_state()
+            status = detection.to_dict()
             
             # 判斷狀態
             if status['has_stop_button']:
@@ -363,24 +2222,15 @@ class ImageRecognition:
                 # 同時檢測不到兩個按鈕，可能是通知遮擋
                 self.logger.warning("⚠️ 同時檢測不到 stop 或 send 按鈕，可能有通知遮擋 UI")
                 
-                # 嘗試清除通知
-                if self.clear_vscode_notifications():
+                # 清除遮擋聊天區域的通知
+                if self.clear_occluding_notifications(detection):
                     status['notifications_cleared'] = True
                     
-                    # 清除通知後再次檢測
-                    time.sleep(1)  # 給一點時間讓 UI 更新
-                    
-                    stop_button = self.find_image_on_screen(
-                        str(config.STOP_BUTTON_IMAGE),
-                        confidence=config.IMAGE_CONFIDENCE
-                    )
-                    send_button = self.find_image_on_screen(
-                        str(config.SEND_BUTTON_IMAGE),
-                        confidence=config.IMAGE_CONFIDENCE
-                    )
-                    
-                    status['has_stop_button'] = bool(stop_button)
-                    status['has_send_button'] = bool(send_button)
+                    # 清除通知後等待按鈕重新出現
+                    detection = self._wait_for_buttons(config.NOTIFICATION_CLEAR_SETTLE).to_dict()
+                    for key in ('has_stop_button', 'has_send_button', 'notification_overlay',
+                                'error_state', 'scores', 'boxes'):
+                        status[key] = detection[key]
                     
                     if status['has_stop_button']:
                         status['is_responding'] = True
@@ -397,7 +2247,7 @@ class ImageRecognition:
                 else:
                     status['is_responding'] = False
                     status['is_ready'] = False
-                    status['status_message'] = "狀態不明確（未檢測到 stop 或 send 按鈕，通知清除失敗）"
+                    status['status_message'] = "狀態不明確（未檢測到 stop 或 send 按鈕，未清除通知）"
             
             return status
             
@@ -412,6 +2262,76 @@ class ImageRecognition:
                 'notifications_cleared': False
             }
     
+    def clear_occluding_notifications(self, status: DetectionStatus = None) -> bool:
+        """
+        清除遮擋聊天區域的通知
+        有通知關閉按鈕模板時只點擊遮擋聊天區域的那個通知；沒有模板時改用命令面板清除全部通知
+        
+        Args:
+            status: 最近一次的檢測結果，None 表示重新檢測
+            
+        Returns:
+            bool: 是否執行了清除動作
+        """
+        start = time.perf_counter()
+        
+        if self.templates.get(NOTIFICATION_CLOSE) is None:
+            cleared = self.clear_vscode_notifications()
+            kind = 'legacy_clears'
+        else:
+            if status is None:
+                status = self.detect_copilot_state()
+            if status.notification is None:
+                self.notification_stats['no_overlay_found'] += 1
+                self.logger.info("未發現遮擋聊天區域的通知，略過清除")
+                return False
+            cleared = self.dismiss_notification(status.notification)
+            kind = 'targeted_dismissals'
+        
+        elapsed = time.perf_counter() - start
+        self.notification_stats[kind if cleared else 'failures'] += 1
+        self.notification_stats['total_time'] += elapsed
+        self.notification_stats['last_time'] = elapsed
+        return cleared
+    
+    def dismiss_notification(self, close_box: Box) -> bool:
+        """
+        點擊通知的關閉按鈕，只關閉該則通知
+        
+        Args:
+            close_box: 關閉按鈕位置（螢幕座標）
+            
+        Returns:
+            bool: 點擊是否成功
+        """
+        try:
+            x = close_box.left + close_box.width // 2
+            y = close_box.top + close_box.height // 2
+            pyautogui.click(x, y)
+            self.logger.info(f"✅ 已關閉遮擋聊天區域的通知 ({x}, {y})")
+            # 通知位置的畫面已改變，清除快取避免沿用遮擋時的結果
+            self.reset_frame_gate()
+            return True
+        except Exception as e:
+            self.logger.error(f"關閉通知時發生錯誤: {str(e)}")
+            return False
+    
+    def _wait_for_buttons(self, timeout: float) -> DetectionStatus:
+        """清除通知後短暫輪詢，任一按鈕出現即返回，不足時返回最後一次結果"""
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.detect_copilot_state()
+            if status.has_stop_button or status.has_send_button or time.monotonic() >= deadline:
+                return status
+            time.sleep(0.1)
+    
+    def get_notification_stats(self) -> Dict:
+        """取得通知清除統計（次數與耗時）"""
+        stats = dict(self.notification_stats)
+        clears = stats['targeted_dismissals'] + stats['legacy_clears']
+        stats['average_time'] = stats['total_time'] / clears if clears else 0.0
+        return stats
+    
     def clear_vscode_notifications(self) -> bool:
         """
         清除 VS Code 通知
@@ -490,6 +2410,29 @@ class ImageRecognition:
             self.logger.error(f"點擊 Copilot 複製按鈕時發生錯誤: {str(e)}")
             return False
     
+    def check_optional_templates(self) -> List[str]:
+        """
+        檢查選用模板是否可用，缺少時記錄警告（執行前檢查時呼叫一次）
+        
+        Returns:
+            List[str]: 因缺少模板而無法使用的功能
+        """
+        unavailable = []
+        if self.templates.get(NOTIFICATION_CLOSE) is None:
+            self.logger.warning(f"⚠️ 缺少通知關閉按鈕模板 {config.NOTIFICATION_CLOSE_IMAGE}，"
+                                f"清除通知將改用命令面板清除全部通知（擷取方式見 README）")
+            unavailable.append(NOTIFICATION_CLOSE)
+        
+        # 每個錯誤類別至少要有一個可用模板才能檢測該錯誤
+        available = {category for name, category in self.error_templates.items()
+                     if self.templates.get(name) is not None}
+        missing = sorted(set(self.error_templates.values()) - available)
+        if missing:
+            self.logger.warning(f"⚠️ 缺少 Copilot 錯誤訊息模板，以下錯誤類別不會被檢測: {', '.join(missing)}"
+                                f"（COPILOT_ERROR_TEMPLATES，擷取方式見 README）")
+            unavailable.extend(f"error:{category}" for category in missing)
+        return unavailable
+    
     def validate_required_images(self) -> bool:
         """
         驗證所需的圖像資源是否可用（更新後的版本：只檢查 stop_button 和 send_button）
@@ -504,25 +2447,18 @@ class ImageRecognition:
                 return True
             
             # 更新後只需要這兩個圖像
-            required_images = [
-                config.STOP_BUTTON_IMAGE,
-                config.SEND_BUTTON_IMAGE
-            ]
+            required_templates = [STOP_BUTTON, SEND_BUTTON]
             
             missing_images = []
             invalid_images = []
             
-            for image_path in required_images:
+            for name in required_templates:
+                image_path = self.templates.path(name)
                 if not image_path.exists():
                     missing_images.append(str(image_path))
-                else:
-                    # 嘗試讀取圖像驗證其有效性
-                    try:
-                        img = cv2.imread(str(image_path))
-                        if img is None:
-                            invalid_images.append(str(image_path))
-                    except Exception:
-                        invalid_images.append(str(image_path))
+                elif self.templates.get(name) is None:
+                    # 模板快取無法解碼此圖像
+                    invalid_images.append(str(image_path))
             
             if missing_images:
                 self.logger.warning("缺少圖像資源（已設為可選）:")
@@ -589,17 +2525,17 @@ class ImageRecognition:
 image_recognition = ImageRecognition()
 
 # 便捷函數
-def find_image(template_path: str, confidence: float = None) -> Optional[Tuple[int, int, int, int]]:
+def find_image(template: TemplateRef, confidence: float = None) -> Optional[Box]:
     """尋找圖像的便捷函數"""
-    return image_recognition.find_image_on_screen(template_path, confidence)
+    return image_recognition.find_image_on_screen(template, confidence)
 
-def wait_for_image(template_path: str, timeout: int = 30) -> bool:
+def wait_for_image(template: TemplateRef, timeout: int = 30) -> bool:
     """等待圖像出現的便捷函數"""
-    return image_recognition.wait_for_image(template_path, timeout)
+    return image_recognition.wait_for_image(template, timeout)
 
-def click_image(template_path: str, confidence: float = None) -> bool:
+def click_image(template: TemplateRef, confidence: float = None) -> bool:
     """點擊圖像的便捷函數"""
-    return image_recognition.click_on_image(template_path, confidence)
+    return image_recognition.click_on_image(template, confidence)
 
 def check_copilot_ready() -> bool:
     """檢查 Copilot 準備狀態的便捷函數"""
@@ -615,4 +2551,28 @@ def clear_notifications() -> bool:
 
 def check_copilot_status_with_auto_clear() -> dict:
     """檢查 Copilot 狀態並自動清除通知的便捷函數"""
-    return image_recognition.check_copilot_response_status_with_auto_clear()
\ No newline at end of file
+    return image_recognition.check_copilot_response_status_with_auto_clear()
+
+def detect_copilot_state() -> DetectionStatus:
+    """單次截圖檢測 Copilot 狀態的便捷函數"""
+    return image_recognition.detect_copilot_state()
+
+def get_notification_stats() -> Dict:
+    """取得通知清除統計的便捷函數"""
+    return image_recognition.get_notification_stats()
+
+def get_detection_metrics() -> Dict:
+    """取得檢測統計的便捷函數"""
+    return image_recognition.get_detection_metrics()
+
+def save_diagnostic_frame(reason: str) -> Optional[Path]:
+    """保存異常當下畫面的便捷函數"""
+    return image_recognition.save_diagnostic_frame(reason)
+
+def get_frame_gate_stats() -> Dict:
+    """取得畫面變動閘門統計的便捷函數"""
+    return image_recognition.get_frame_gate_stats()
+
+def get_frame_pipeline_stats() -> Dict:
+    """取得檢測流程記憶體配置統計的便捷函數"""
+    return image_recognition.get_frame_pipeline_stats()
@@ -30,6 +30,8 @@ class ProjectInfo:
     error_message: Optional[str] = None
     processing_time: Optional[float] = None
     retry_count: int = 0
+    detection_metrics: Optional[Dict] = None  # 最近一次處理的圖像檢測統計
+    stage_timings: Optional[Dict] = None  # 最近一次處理的各階段耗時
     
     def __post_init__(self):
         if self.supported_files is None:
@@ -298,6 +300,41 @@ class ProjectManager:
         """
         return self.update_project_status(project_name, "failed", error_message, processing_time)
     
+    def record_detection_metrics(self, project_name: str, metrics: Dict) -> bool:
+        """
+        記錄專案處理期間的圖像檢測統計
+        
+        Args:
+            project_name: 專案名稱
+            metrics: 檢測統計（DetectionMetrics.snapshot()）
+            
+        Returns:
+            bool: 記錄是否成功
+        """
+        project = self.get_project_by_name(project_name)
+        if not project:
+            return False
+        project.detection_metrics = metrics
+        return True
+    
+    def record_stage_timings(self, project_name: str, timings: Dict) -> bool:
+        """
+        記錄專案處理期間各階段的耗時
+        
+        Args:
+            project_name: 專案名稱
+            timings: 階段耗時（CopilotHandler.get_stage_timings()）
+            
+        Returns:
+            bool: 記錄是否成功
+        """
+        project = self.get_project_by_name(project_name)
+        if not project:
+            return False
+        project.stage_timings = timings
+        self._save_status()
+        return True
+    
     def get_project_by_name(self, project_name: str) -> Optional[ProjectInfo]:
         """
         根據名稱取得專案資訊
@@ -384,6 +421,18 @@ class ProjectManager:
             "生成時間": datetime.now().isoformat()
         }
         
+        # 各專案的圖像檢測統計
+        detection_metrics = {p.name: p.detection_metrics for p in self.projects if p.detection_metrics}
+        if detection_metrics:
+            report["檢測統計"] = detection_metrics
+        
+        # 各專案的階段耗時；剪貼簿探測耗時即改用畫面等待（SMART_WAIT_MODE = "visual"）可節省的時間
+        stage_timings = {p.name: p.stage_timings for p in self.projects if p.stage_timings}
+        if stage_timings:
+            report["階段耗時"] = stage_timings
+            probe_time = sum(t.get('clipboard_probe_time', 0.0) for t in stage_timings.values())
+            report["剪貼簿探測總耗時"] = f"{probe_time:.2f}秒"
+        
         return report
     
     def save_summary_report(self) -> str:
@@ -416,9 +465,11 @@ class ProjectManager:
     def _save_status(self):
         """儲存專案狀態到檔案"""
         try:
+            # 檢測統計只輸出於摘要報告，不寫入每次狀態更新都會重寫的狀態檔
             status_data = {
                 "last_updated": datetime.now().isoformat(),
-                "projects": [project.to_dict() for project in self.projects]
+                "projects": [{key: value for key, value in project.to_dict().items() if key != "detection_metrics"}
+                             for project in self.projects]
             }
             
             with open(self.status_file, 'w', encoding='utf-8') as f:
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - 信心度閾值校正模組
+從錄製的檢測畫面收集各模板在正例（按鈕應存在）與反例畫面上的匹配分數，
+為每個模板選擇能區分兩者的閾值，依機器與螢幕解析度保存供圖像辨識使用
+"""
+
+import json
+import platform
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple, List, Dict, Iterable
+import sys
+
+import cv2
+
+# 導入配置和日誌
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from src.logger import get_logger
+from src.detection_replay import load_corpus
+
+# 標註狀態 -> 應出現的模板；標註為其他狀態時兩個按鈕都視為反例
+POSITIVE_TEMPLATES = {
+    "responding": "stop_button",
+    "idle": "send_button",
+}
+CALIBRATED_TEMPLATES = ("stop_button", "send_button")
+
+def machine_id() -> str:
+    """本機識別名稱（閾值依機器保存）"""
+    return platform.node() or "default"
+
+@dataclass
+class ScoreSamples:
+    """單一模板在同一解析度下的分數樣本"""
+    positives: List[float] = field(default_factory=list)
+    negatives: List[float] = field(default_factory=list)
+
+@dataclass
+class ThresholdResult:
+    """單一模板的校正結果"""
+    template: str
+    resolution: str
+    threshold: Optional[float]
+    positives: int
+    negatives: int
+    errors: int = 0              # 使用此閾值時誤判的樣本數
+    margin: float = 0.0          # 正例最低分與反例最高分的差距（負數表示兩者重疊）
+    message: str = ""
+
+def choose_threshold(positives: List[float], negatives: List[float],
+                     bounds: Tuple[float, float] = None) -> Tuple[float, int]:
+    """
+    選擇區分正例與反例的閾值
+
+    可完全區分時取正例最低分與反例最高分的中點；重疊時選擇誤判最少的分界，
+    同樣誤判數下偏向較高的閾值（寧可多等一輪，也不要誤判回應完成）
+
+    Args:
+        positives: 正例分數
+        negatives: 反例分數
+        bounds: 閾值允許範圍 (最小, 最大)
+
+    Returns:
+        Tuple[float, int]: (閾值, 誤判數)
+    """
+    low, high = bounds or config.CALIBRATION_THRESHOLD_RANGE
+    lowest_positive = min(positives)
+    highest_negative = max(negatives)
+
+    if lowest_positive > highest_negative:
+        threshold = (lowest_positive + highest_negative) / 2
+        return round(min(high, max(low, threshold)), 4), 0
+
+    best_threshold, best_errors = high, None
+    for candidate in sorted(set(positives) | {high}, reverse=True):
+        candidate = min(high, max(low, candidate))
+        errors = (sum(1 for score in positives if score < candidate)
+                  + sum(1 for score in negatives if score >= candidate))
+        if best_errors is None or errors < best_errors:
+            best_threshold, best_errors = candidate, errors
+    return round(best_threshold, 4), best_errors
+
+class ThresholdCalibrator:
+    """收集分數樣本並計算每個模板的閾值"""
+
+    def __init__(self, recognizer=None):
+        """
+        初始化校正器
+
+        Args:
+            recognizer: 圖像辨識器，None 時使用全域實例
+        """
+        if recognizer is None:
+            from src.image_recognition import image_recognition as recognizer
+        self.recognizer = recognizer
+        self.logger = get_logger("ThresholdCalibrator")
+        # 解析度 -> 模板名稱 -> 分數樣本
+        self.samples: Dict[str, Dict[str, ScoreSamples]] = {}
+
+    def add_frame(self, frame, label: str, screen_size: Tuple[int, int]) -> Dict[str, float]:
+        """
+        匹配一張已標註的畫面並記錄各模板的最佳分數
+
+        Args:
+            frame: 畫面（BGR 或灰階）
+            label: 標註的 UI 狀態（CopilotUIState 值）
+            screen_size: 錄製時的螢幕解析度 (寬, 高)
+
+        Returns:
+            Dict[str, float]: 各模板的最佳分數
+        """
+        resolution = f"{screen_size[0]}x{screen_size[1]}"
+        status = self.recognizer.match_templates(frame, CALIBRATED_TEMPLATES, confidence=1.0,
+                                                 screen_size=screen_size)
+        scores = {}
+        for name in CALIBRATED_TEMPLATES:
+            score = status.score(name)
+            samples = self.samples.setdefault(resolution, {}).setdefault(name, ScoreSamples())
+            if POSITIVE_TEMPLATES.get(label) == name:
+                samples.positives.append(score)
+            else:
+                samples.negatives.append(score)
+            scores[name] = score
+        return scores
+
+    def add_corpus(self, session_dir: Path, use_recorded_decisions: bool = False) -> int:
+        """
+        從錄製資料夾收集分數樣本
+
+        Args:
+            session_dir: 錄製資料夾
+            use_recorded_decisions: 沒有人工標註時以錄製當下的判斷作為標註
+
+        Returns:
+            int: 使用的畫面數
+        """
+        session_dir = Path(session_dir)
+        used = 0
+        for record in load_corpus(session_dir):
+            label = record.label or (record.decision if use_recorded_decisions else None)
+            if label is None:
+                continue
+            frame = cv2.imread(str(session_dir / record.file), cv2.IMREAD_UNCHANGED)
+            if frame is None:
+                continue
+            if frame.ndim == 3 and frame.shape[2] == 4:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+            self.add_frame(frame, label, record.screen_size)
+            used += 1
+        self.logger.info(f"從 {session_dir} 收集 {used} 張已標註畫面")
+        return used
+
+    def calibrate(self, min_samples: int = None) -> List[ThresholdResult]:
+        """
+        依收集到的樣本計算各模板閾值
+
+        Args:
+            min_samples: 正例與反例各自至少需要的樣本數
+
+        Returns:
+            List[ThresholdResult]: 各解析度、各模板的校正結果
+        """
+        min_samples = min_samples or config.CALIBRATION_MIN_SAMPLES
+        results = []
+        for resolution, templates in self.samples.items():
+            for name, samples in templates.items():
+                result = ThresholdResult(name, resolution, None,
+                                         len(samples.positives), len(samples.negatives))
+                if result.positives < min_samples or result.negatives < min_samples:
+                    result.message = f"樣本不足（正例 {result.positives}、反例 {result.negatives}，各需 {min_samples}）"
+                else:
+                    result.threshold, result.errors = choose_threshold(samples.positives, samples.negatives)
+                    result.margin = round(min(samples.positives) - max(samples.negatives), 4)
+                    result.message = "可完全區分" if result.margin > 0 else f"分數重疊，誤判 {result.errors} 張"
+                results.append(result)
+        return results
+
+def load_thresholds(path: Path = None, machine: str = None) -> Dict[str, Dict[str, float]]:
+    """
+    讀取本機的校正閾值
+
+    Returns:
+        Dict[str, Dict[str, float]]: 解析度 -> 模板名稱 -> 閾值
+    """
+    path = Path(path or config.CALIBRATED_THRESHOLD_FILE)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    machine_data = data.get(machine or machine_id(), {})
+    return {
+        resolution: {name: entry['threshold'] for name, entry in templates.items()}
+        for resolution, templates in machine_data.items()
+    }
+
+def save_thresholds(results: Iterable[ThresholdResult], path: Path = None, machine: str = None) -> int:
+    """
+    將校正結果寫入快取檔案（保留其他機器與其他解析度的資料）
+
+    Returns:
+        int: 寫入的閾值數
+    """
+    path = Path(path or config.CALIBRATED_THRESHOLD_FILE)
+    data = {}
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+    machine_data = data.setdefault(machine or machine_id(), {})
+    saved = 0
+    for result in results:
+        if result.threshold is None:
+            continue
+        machine_data.setdefault(result.resolution, {})[result.template] = {
+            'threshold': result.threshold,
+            'positives': result.positives,
+            'negatives': result.negatives,
+            'margin': result.margin,
+            'errors': result.errors,
+            'calibrated_at': datetime.now().isoformat()
+        }
+        saved += 1
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return saved
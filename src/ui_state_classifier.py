@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - 聊天區域 UI 狀態分類模組
+將聊天區域截圖縮小為灰階縮圖，與已標註的範例做最近鄰比對，
+一次矩陣運算即可得到整個 UI 狀態，取代逐一匹配多個模板；範例由錄製的檢測畫面訓練
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple, List, Dict, Iterable
+import sys
+
+import cv2
+import numpy as np
+
+# 導入配置和日誌
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from src.logger import get_logger
+from src.detection_replay import load_corpus
+
+# 分類標籤（與 CopilotUIState 的值相同）
+IDLE = "idle"
+RESPONDING = "responding"
+ERROR_BANNER = "error_banner"
+NOTIFICATION_OVERLAY = "notification_overlay"
+UNKNOWN = "unknown"
+
+LABELS = (IDLE, RESPONDING, ERROR_BANNER, NOTIFICATION_OVERLAY)
+
+@dataclass
+class Prediction:
+    """單張畫面的分類結果"""
+    label: str
+    similarity: float          # 與最近範例的相似度（正規化縮圖的內積，1.0 表示相同）
+    margin: float              # 與最近的其他標籤範例的相似度差距
+    neighbour: int             # 最近範例的索引
+
+    @property
+    def confident(self) -> bool:
+        """相似度與差距都達到設定值"""
+        return (self.similarity >= config.UI_CLASSIFIER_MIN_SIMILARITY
+                and self.margin >= config.UI_CLASSIFIER_MIN_MARGIN)
+
+class UIStateClassifier:
+    """以縮圖最近鄰比對分類聊天區域的 UI 狀態"""
+
+    def __init__(self, size: Tuple[int, int] = None):
+        """
+        初始化分類器
+
+        Args:
+            size: 縮圖大小 (寬, 高)
+        """
+        self.logger = get_logger("UIStateClassifier")
+        self.size = tuple(size or config.UI_CLASSIFIER_THUMBNAIL_SIZE)
+        self.exemplars = np.empty((0, self.size[0] * self.size[1]), dtype=np.float32)
+        self.labels: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        """
+        將畫面縮小為灰階縮圖並正規化（減去平均、除以長度），不受整體亮度與對比影響
+
+        Returns:
+            np.ndarray: 長度為 寬 x 高 的 float32 向量
+        """
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        small -= small.mean()
+        norm = float(np.linalg.norm(small))
+        if norm > 1e-6:
+            small /= norm
+        return small
+
+    def add(self, frame: np.ndarray, label: str) -> None:
+        """加入一張已標註的範例畫面"""
+        self.exemplars = np.vstack([self.exemplars, self.thumbnail(frame)[np.newaxis]])
+        self.labels.append(label)
+
+    def predict(self, frame: np.ndarray) -> Prediction:
+        """
+        分類一張畫面
+
+        Returns:
+            Prediction: 最近範例的標籤；沒有範例時為 unknown
+        """
+        if not self.labels:
+            return Prediction(UNKNOWN, 0.0, 0.0, -1)
+        return self._nearest(self.exemplars @ self.thumbnail(frame))
+
+    def _nearest(self, similarities: np.ndarray) -> Prediction:
+        """由與各範例的相似度找出最近範例，以及與最近的其他標籤範例的差距"""
+        index = int(np.argmax(similarities))
+        label = self.labels[index]
+        best = float(similarities[index])
+        others = similarities[np.asarray(self.labels) != label]
+        margin = best - float(others.max()) if others.size else best
+        return Prediction(label, best, margin, index)
+
+    def evaluate(self) -> Dict:
+        """
+        以留一法評估範例：每個範例以其餘範例分類
+
+        Returns:
+            Dict: 準確度、各標籤數量與誤判
+        """
+        if len(self.labels) < 2:
+            return {'exemplars': len(self.labels), 'accuracy': None, 'errors': {}}
+        similarities = self.exemplars @ self.exemplars.T
+        np.fill_diagonal(similarities, -np.inf)
+        predictions = [self.labels[int(index)] for index in np.argmax(similarities, axis=1)]
+        errors = Counter(f"{label}->{predicted}" for label, predicted in zip(self.labels, predictions)
+                         if label != predicted)
+        correct = sum(1 for label, predicted in zip(self.labels, predictions) if label == predicted)
+        return {
+            'exemplars': len(self.labels),
+            'labels': dict(Counter(self.labels)),
+            'accuracy': round(correct / len(self.labels), 4),
+            'errors': dict(errors)
+        }
+
+    def add_corpus(self, session_dir: Path, use_recorded_decisions: bool = False) -> int:
+        """
+        從錄製資料夾加入已標註的畫面
+
+        只使用聊天區域的畫面（DETECTION_RECORD_ROI_ONLY 錄製的裁切畫面），
+        整張螢幕的畫面與執行時的聊天區域截圖範圍不同，略過
+
+        Args:
+            session_dir: 錄製資料夾
+            use_recorded_decisions: 沒有人工標註時以錄製當下的判斷作為標註
+
+        Returns:
+            int: 加入的範例數
+        """
+        session_dir = Path(session_dir)
+        added = 0
+        for record in load_corpus(session_dir):
+            label = record.label or (record.decision if use_recorded_decisions else None)
+            if label is None or label == UNKNOWN:
+                continue
+            frame = cv2.imread(str(session_dir / record.file), cv2.IMREAD_GRAYSCALE)
+            if frame is None or (frame.shape[1], frame.shape[0]) == tuple(record.screen_size):
+                continue
+            self.add(frame, label)
+            added += 1
+        self.logger.info(f"從 {session_dir} 加入 {added} 個範例")
+        return added
+
+    def save(self, path: Path = None) -> Path:
+        """將範例寫入模型檔案"""
+        path = Path(path or config.UI_CLASSIFIER_MODEL)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, exemplars=self.exemplars, labels=np.asarray(self.labels),
+                                size=np.asarray(self.size))
+        return path
+
+    @classmethod
+    def load(cls, path: Path = None) -> Optional["UIStateClassifier"]:
+        """
+        讀取模型檔案
+
+        Returns:
+            Optional[UIStateClassifier]: 模型檔案不存在時返回 None
+        """
+        path = Path(path or config.UI_CLASSIFIER_MODEL)
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            classifier = cls(tuple(int(value) for value in data['size']))
+            classifier.exemplars = data['exemplars'].astype(np.float32)
+            classifier.labels = [str(label) for label in data['labels']]
+        return classifier
+
+def train_from_corpus(session_dirs: Iterable[Path], use_recorded_decisions: bool = False,
+                      size: Tuple[int, int] = None) -> UIStateClassifier:
+    """以多個錄製資料夾訓練分類器"""
+    classifier = UIStateClassifier(size)
+    for session_dir in session_dirs:
+        classifier.add_corpus(session_dir, use_recorded_decisions)
+    return classifier
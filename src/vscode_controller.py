@@ -10,7 +10,7 @@ import os
 import psutil
 import pyautogui
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Set
 import sys
 
 # 導入配置和日誌
@@ -18,6 +18,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 from config.config import config
 from src.logger import get_logger
 from src.vscode_ui_initializer import initialize_vscode_ui
+from src.x11_windows import WindowInfo, find_window_for_pids, process_tree_pids
 
 class VSCodeController:
     """VS Code 操作控制器"""
@@ -27,6 +28,7 @@ class VSCodeController:
         self.logger = get_logger("VSCodeController")
         self.current_project_path = None
         self.vscode_process = None
+        self.window: Optional[WindowInfo] = None  # 自動開啟的 VS Code 視窗（Linux / X11）
         # 啟動時記錄所有現有 VS Code 進程 PID
         self.pre_existing_vscode_pids = set()
         for proc in psutil.process_iter(['pid', 'name']):
@@ -176,6 +178,13 @@ class VSCodeController:
             ]
             
             cmd.extend(stability_args)
+            
+            # 指定 user-data-dir 時，聊天工作階段也保存在該目錄（RESPONSE_CAPTURE_BACKEND = "session"）
+            if config.VSCODE_USER_DATA_DIR:
+                cmd.append(f"--user-data-dir={config.VSCODE_USER_DATA_DIR}")
+            # 讀取無障礙樹時需要 Electron 公開 DOM（RESPONSE_CAPTURE_BACKEND = "atspi"）
+            if config.RESPONSE_CAPTURE_BACKEND == "atspi":
+                cmd.append("--force-renderer-accessibility")
             self.logger.debug(f"執行命令: {' '.join(cmd)}")
             
             try:
@@ -204,6 +213,7 @@ class VSCodeController:
                             # 立即最大化視窗，不動到既有畫面
                             self.logger.info("正在最大化視窗...")
                             self._maximize_window_direct()
+                            self.locate_window()
                             
                             return True
                         else:
@@ -213,6 +223,7 @@ class VSCodeController:
                     self.logger.warning("⚠️ VS Code 啟動但無法確認運行狀態")
                     # 即使無法確認狀態也嘗試最大化
                     self._maximize_window_direct()
+                    self.locate_window()
                     return True  # 假設成功，繼續執行
                 else:
                     return True
@@ -410,6 +421,53 @@ class VSCodeController:
             self.logger.error(f"最大化視窗失敗: {str(e)}")
             return False
 
+    def auto_opened_pids(self) -> Set[int]:
+        """
+        取得自動開啟的 VS Code 相關進程 PID
+        code 啟動腳本會另外啟動 Electron 主進程後結束，因此除了 Popen 的進程樹，
+        也納入啟動後新出現的 code 進程
+        """
+        pids = process_tree_pids(self.vscode_process.pid) if self.vscode_process else set()
+        for proc in psutil.process_iter(['pid', 'name']):
+            name = (proc.info['name'] or '').lower()
+            if 'code' in name and proc.info['pid'] not in self.pre_existing_vscode_pids:
+                pids.add(proc.info['pid'])
+        return pids
+    
+    def locate_window(self, timeout: float = None) -> Optional[WindowInfo]:
+        """
+        透過 EWMH 找出自動開啟的 VS Code 視窗與其螢幕位置（僅 Linux / X11）
+        
+        Args:
+            timeout: 等待視窗出現的最長時間（秒），None 表示使用配置值
+            
+        Returns:
+            Optional[WindowInfo]: 找到的視窗，無法查詢或找不到時返回 None
+        """
+        self.window = None
+        if not config.WINDOW_BOUNDED_CAPTURE or not sys.platform.startswith('linux'):
+            return None
+        
+        timeout = config.WINDOW_LOOKUP_TIMEOUT if timeout is None else timeout
+        deadline = time.time() + timeout
+        try:
+            while True:
+                window = find_window_for_pids(self.auto_opened_pids())
+                if window is not None:
+                    self.window = window
+                    self.logger.info(f"找到 VS Code 視窗 {hex(window.window_id)} (PID {window.pid}): "
+                                     f"{window.width}x{window.height}+{window.left}+{window.top}")
+                    return window
+                if time.time() >= deadline:
+                    break
+                time.sleep(0.5)
+            self.logger.warning("找不到 VS Code 視窗，截圖將涵蓋整個螢幕")
+        except ImportError:
+            self.logger.debug("未安裝 python-xlib，無法查詢 VS Code 視窗位置")
+        except Exception as e:
+            self.logger.warning(f"查詢 VS Code 視窗位置失敗: {str(e)}")
+        return None
+    
     def restart_vscode(self, project_path: str = None) -> bool:
         """
         重啟 VS Code
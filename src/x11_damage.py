@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - X11 畫面損壞（XDamage）追蹤模組
+透過 X DAMAGE 擴充訂閱視窗內容被重繪的矩形，檢測時只有聊天區域被重繪過才需要重新截圖與匹配
+（僅 Linux / Xvfb，需要 python-xlib）
+"""
+
+import select
+import threading
+from pathlib import Path
+from typing import Optional, Tuple, List, Dict
+import sys
+
+# 導入配置和日誌
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from src.logger import get_logger
+
+# (left, top, right, bottom) 螢幕座標
+Rect = Tuple[int, int, int, int]
+
+def _intersects(a: Rect, b: Rect) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+class DamageTracker:
+    """
+    XDamage 事件追蹤器
+    背景執行緒以獨立的 X 連線接收 DamageNotify，累積被重繪的矩形直到 consume() 取走
+    """
+
+    def __init__(self, display_name: str = None, window_id: int = None, max_rects: int = None):
+        """
+        初始化追蹤器
+
+        Args:
+            display_name: X display（例如 ":99"），None 表示使用 $DISPLAY
+            window_id: 要追蹤的視窗，None 表示根視窗（涵蓋所有視窗，座標即為螢幕座標）
+            max_rects: 累積的矩形數超過此值時合併為外接矩形
+
+        Raises:
+            ImportError: 未安裝 python-xlib
+            RuntimeError: X 伺服器不支援 DAMAGE 擴充
+        """
+        from Xlib import display as xdisplay  # 選用相依套件，未安裝時由 create_capture_backend 回退
+        from Xlib.ext import damage
+
+        self.logger = get_logger("DamageTracker")
+        self.max_rects = max_rects or config.XDAMAGE_MAX_RECTS
+        self._display = xdisplay.Display(display_name or config.X11_DISPLAY)
+        extension = self._display.query_extension("DAMAGE")
+        if extension is None:
+            self._display.close()
+            raise RuntimeError("X 伺服器不支援 DAMAGE 擴充")
+        self._display.damage_query_version()
+        self._event_type = extension.first_event + damage.DamageNotifyCode
+
+        if window_id is None:
+            self._window = self._display.screen().root
+        else:
+            self._window = self._display.create_resource_object("window", window_id)
+        # 外接矩形層級：只在損壞範圍擴大時通知，每批事件後清除，事件量不隨重繪次數成長
+        self._damage = self._window.damage_create(damage.DamageReportBoundingBox)
+        self._display.flush()
+
+        self._lock = threading.Lock()
+        self._rects: List[Rect] = []
+        self._stop = threading.Event()
+        self._failed = False
+        self.event_count = 0
+        self.consume_count = 0
+        self.skipped_count = 0
+        self._thread = threading.Thread(target=self._run, name="DamageTracker", daemon=True)
+        self._thread.start()
+        self.logger.info(f"開始追蹤 XDamage 事件 (視窗: {hex(self._window.id)})")
+
+    def consume(self, rect: Rect = None) -> bool:
+        """
+        取走累積的損壞矩形，返回是否有矩形與指定區域相交
+
+        Args:
+            rect: 關心的區域 (left, top, right, bottom)，None 表示任何區域
+
+        Returns:
+            bool: 上次取走後該區域是否被重繪過
+        """
+        with self._lock:
+            rects, self._rects = self._rects, []
+            self.consume_count += 1
+            if self._failed:
+                # 無法再取得事件時視為持續被重繪，回到一般輪詢
+                return True
+        damaged = any(rect is None or _intersects(rect, damaged) for damaged in rects)
+        if not damaged:
+            self.skipped_count += 1
+        return damaged
+
+    def stats(self) -> Dict:
+        """事件統計"""
+        with self._lock:
+            return {
+                'events': self.event_count,
+                'pending_rects': len(self._rects),
+                'checks': self.consume_count,
+                'undamaged_checks': self.skipped_count
+            }
+
+    def close(self) -> None:
+        """停止背景執行緒並釋放 X 資源"""
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        try:
+            self._display.damage_destroy(self._damage)
+            self._display.close()
+        except Exception:
+            pass
+
+    def _run(self) -> None:
+        """背景執行緒：等待 X 事件並累積損壞矩形"""
+        try:
+            while not self._stop.is_set():
+                select.select([self._display], [], [], 0.5)
+                rects = []
+                for _ in range(self._display.pending_events()):
+                    event = self._display.next_event()
+                    if (event.type & 0x7F) == self._event_type:
+                        rects.append(self._event_rect(event))
+                if not rects:
+                    continue
+                # 清除伺服器端的損壞區域，之後的重繪才會產生新事件
+                self._display.damage_subtract(self._damage, 0, 0)
+                self._display.flush()
+                with self._lock:
+                    self.event_count += len(rects)
+                    self._rects.extend(rects)
+                    if len(self._rects) > self.max_rects:
+                        self._rects = [(min(r[0] for r in self._rects), min(r[1] for r in self._rects),
+                                        max(r[2] for r in self._rects), max(r[3] for r in self._rects))]
+        except Exception as e:
+            if not self._stop.is_set():
+                self.logger.error(f"XDamage 事件迴圈停止，改為每次都重新截圖: {str(e)}")
+                with self._lock:
+                    self._failed = True
+
+    @staticmethod
+    def _event_rect(event) -> Rect:
+        """DamageNotify 的 area 相對於被追蹤的視窗，加上視窗位置轉換為螢幕座標"""
+        area = event.area
+        geometry = getattr(event, "drawable_geometry", None)
+        x = area.x + (geometry.x if geometry is not None else 0)
+        y = area.y + (geometry.y if geometry is not None else 0)
+        return x, y, x + area.width, y + area.height
+
+    @property
+    def is_alive(self) -> bool:
+        """事件迴圈是否仍在執行"""
+        return self._thread.is_alive() and not self._failed
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Hybrid UI Automation Script - X11 視窗查詢模組
+依進程 PID 透過 EWMH（_NET_CLIENT_LIST / _NET_WM_PID）找出 VS Code 視窗的 ID 與螢幕位置，
+讓截圖只涵蓋該視窗（僅 Linux / Xvfb，需要 python-xlib）
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple, List, Iterable, Set
+import sys
+
+import psutil
+
+# 導入配置
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+
+@dataclass
+class WindowInfo:
+    """頂層視窗的 ID、所屬進程與螢幕位置"""
+    window_id: int
+    pid: int
+    title: str
+    left: int
+    top: int
+    width: int
+    height: int
+
+    @property
+    def rect(self) -> Tuple[int, int, int, int]:
+        """(left, top, right, bottom) 螢幕座標"""
+        return self.left, self.top, self.left + self.width, self.top + self.height
+
+def process_tree_pids(pid: int) -> Set[int]:
+    """取得進程與其所有子進程的 PID（進程已結束時返回空集合）"""
+    try:
+        process = psutil.Process(pid)
+        return {pid} | {child.pid for child in process.children(recursive=True)}
+    except psutil.Error:
+        return set()
+
+def list_client_windows(display_name: str = None) -> List[WindowInfo]:
+    """
+    列出帶有 _NET_WM_PID 的可見頂層視窗
+
+    有視窗管理員時使用 _NET_CLIENT_LIST；沒有（例如單純的 Xvfb）時改為走訪根視窗的子視窗
+
+    Raises:
+        ImportError: 未安裝 python-xlib
+    """
+    from Xlib import X, display as xdisplay  # 選用相依套件
+
+    disp = xdisplay.Display(display_name or config.X11_DISPLAY)
+    try:
+        root = disp.screen().root
+        pid_atom = disp.intern_atom("_NET_WM_PID")
+        name_atom = disp.intern_atom("_NET_WM_NAME")
+
+        client_list = root.get_full_property(disp.intern_atom("_NET_CLIENT_LIST"), X.AnyPropertyType)
+        if client_list is not None:
+            window_ids = list(client_list.value)
+        else:
+            window_ids = [child.id for child in root.query_tree().children]
+
+        windows = []
+        for window_id in window_ids:
+            window = disp.create_resource_object("window", window_id)
+            try:
+                if window.get_attributes().map_state != X.IsViewable:
+                    continue
+                pid_property = window.get_full_property(pid_atom, X.AnyPropertyType)
+                if pid_property is None or not len(pid_property.value):
+                    continue
+                name_property = window.get_full_property(name_atom, X.AnyPropertyType)
+                title = name_property.value if name_property is not None else window.get_wm_name()
+                if isinstance(title, bytes):
+                    title = title.decode("utf-8", errors="replace")
+                geometry = window.get_geometry()
+                # 視窗管理員會把視窗重新掛到裝飾框內，位置需轉換為根視窗座標
+                position = root.translate_coords(window, 0, 0)
+            except Exception:
+                # 列舉期間視窗被關閉
+                continue
+            windows.append(WindowInfo(window_id, int(pid_property.value[0]), title or "",
+                                      position.x, position.y, geometry.width, geometry.height))
+        return windows
+    finally:
+        disp.close()
+
+def find_window_for_pids(pids: Iterable[int], display_name: str = None) -> Optional[WindowInfo]:
+    """
+    找出屬於指定進程的最大可見視窗
+
+    Args:
+        pids: 候選進程 PID
+        display_name: X display，None 表示使用 $DISPLAY
+
+    Returns:
+        Optional[WindowInfo]: 面積最大的視窗，找不到時返回 None
+    """
+    pids = set(pids)
+    if not pids:
+        return None
+    candidates = [window for window in list_client_windows(display_name) if window.pid in pids]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda window: window.width * window.height)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+測試讀取 VS Code 無障礙樹判斷 Copilot 回應
+以模擬的無障礙樹驗證聊天清單與按鈕的尋找、只讀取記住的節點，以及讀不到無障礙樹時改用原本的等待方式
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.atspi_reader import AtspiChatReader, AtspiChatState, scan_chat
+from src.copilot_handler import CopilotHandler
+
+class FakeNode:
+    """模擬的無障礙節點（與 AtspiNode 相同的介面）"""
+
+    def __init__(self, role, name="", text="", showing=True, children=None):
+        self.role = role
+        self.name = name
+        self.text = text
+        self.showing = showing
+        self._children = list(children or [])
+
+    def children(self):
+        return self._children
+
+def _make_tree(responding: bool, response: str = "Here is the summary."):
+    """建立 VS Code 視窗的無障礙樹：編輯器區域、聊天清單與輸入區工具列"""
+    editor = FakeNode("section", children=[FakeNode("paragraph", text=f"line {i}") for i in range(50)])
+    answer = FakeNode("list item", children=[FakeNode("section", children=[FakeNode("paragraph", text=response)])])
+    chat_list = FakeNode("list", "Chat", children=[FakeNode("list item", "Summarize this project"), answer])
+    toolbar = FakeNode("tool bar", children=[
+        FakeNode("push button", "Stop Request (Escape)", showing=responding),
+        FakeNode("push button", "Send (Enter)", showing=not responding),
+    ])
+    panel = FakeNode("panel", "Chat", children=[chat_list, toolbar])
+    root = FakeNode("application", "Code", children=[FakeNode("frame", children=[editor, panel])])
+    return root, toolbar
+
+def test_scan_chat():
+    """找到聊天清單最後一個項目的文字與顯示中的按鈕，並遵守節點上限"""
+    root, toolbar = _make_tree(responding=True)
+    state, chat_list, found_toolbar = scan_chat(root)
+    assert state.has_stop_button and not state.has_send_button
+    assert state.response_text == "Here is the summary."
+    assert chat_list.name == "Chat" and found_toolbar is toolbar
+
+    root, _ = _make_tree(responding=False)
+    state, _, _ = scan_chat(root)
+    assert state.has_send_button and not state.has_stop_button
+
+    # 清單項目有無障礙名稱時直接使用
+    chat_list.children()[-1].name = "Named response"
+    state, _, _ = scan_chat(FakeNode("application", children=[chat_list]))
+    assert state.response_text == "Named response"
+
+    state, chat_list, _ = scan_chat(root, max_nodes=10)
+    assert state.nodes_visited == 10 and chat_list is None and state.response_text == ""
+
+def test_reader_reads_cached_nodes():
+    """第一次走訪整棵樹，之後只讀取記住的聊天清單與工具列；節點失效時重新走訪"""
+    root, toolbar = _make_tree(responding=True)
+    reader = AtspiChatReader(lambda: set())
+    # 沒有 VS Code 進程（或未安裝 AT-SPI）時讀不到
+    assert reader.read() is None
+
+    reader.application = root
+    first = reader.read()
+    assert first.has_stop_button and reader.scan_count == 1
+    second = reader.read()
+    assert second.has_stop_button and second.response_text == first.response_text
+    assert reader.scan_count == 1 and second.nodes_visited < first.nodes_visited
+
+    # 面板重新繪製後舊的工具列沒有按鈕，重新走訪
+    toolbar._children = []
+    assert reader.read() is not None and reader.scan_count == 2
+
+class ScriptedReader:
+    """依序返回預先準備的狀態"""
+
+    def __init__(self, states):
+        self.states = list(states)
+
+    def read(self):
+        return self.states.pop(0) if len(self.states) > 1 else self.states[0]
+
+def _state(stop, send, text):
+    return AtspiChatState(stop, send, text, 10, 0.001)
+
+def test_handler_waits_and_falls_back():
+    """看到 stop 按鈕後等回應文字穩定才完成，回應直接由無障礙樹取得；讀不到無障礙樹時改用原本的等待方式"""
+    saved = (config.ATSPI_POLL_INTERVAL, config.CHAT_PROGRESS_STABLE_SECONDS, config.STATE_MONITOR_START_TIMEOUT)
+    try:
+        config.ATSPI_POLL_INTERVAL = 0.01
+        config.CHAT_PROGRESS_STABLE_SECONDS = 0.1
+        config.STATE_MONITOR_START_TIMEOUT = 0.2
+        # 沒有提供開啟專案的 VS Code 進程時不讀取無障礙樹
+        assert not CopilotHandler().start_atspi_capture()
+        handler = CopilotHandler(vscode_pids=lambda: {4242})
+        handler.start_atspi_capture()
+        assert handler.atspi_reader is not None and handler.atspi_reader.pid_provider() == {4242}
+        fallbacks = []
+        handler._smart_wait_for_response = lambda timeout: fallbacks.append(timeout) or True
+        handler._visual_wait_for_response = handler._smart_wait_for_response
+
+        handler.atspi_reader = ScriptedReader([
+            _state(False, True, ""),
+            _state(True, False, "Partial"),
+            _state(True, False, "Partial answer"),
+            _state(False, True, "Partial answer, done."),
+        ])
+        start = time.time()
+        assert handler.wait_for_response(timeout=5, use_smart_wait=True)
+        assert time.time() - start >= 0.1
+        assert fallbacks == []
+        assert handler.get_stage_timings()['wait_mode'] == "atspi"
+        assert handler.copy_response() == "Partial answer, done."
+
+        handler._atspi_response = None
+        handler.atspi_reader = ScriptedReader([None])
+        assert handler.wait_for_response(timeout=5, use_smart_wait=True)
+        assert len(fallbacks) == 1 and fallbacks[0] <= 5
+        assert handler.atspi_reader is None
+    finally:
+        config.ATSPI_POLL_INTERVAL, config.CHAT_PROGRESS_STABLE_SECONDS, config.STATE_MONITOR_START_TIMEOUT = saved
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試無障礙樹讀取...")
+    try:
+        test_scan_chat()
+        print("✅ 找到聊天清單與按鈕狀態")
+        test_reader_reads_cached_nodes()
+        print("✅ 只讀取記住的節點，失效時重新走訪")
+        test_handler_waits_and_falls_back()
+        print("✅ 以無障礙樹判斷完成，讀不到時改用原本的等待方式")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+測試以匯出聊天命令擷取回應
+以模擬的鍵盤操作驗證命令面板與存檔對話框的輸入、讀取匯出的 JSON，以及匯出失敗時的處理
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src import copilot_handler as copilot_handler_module
+from src.copilot_handler import CopilotHandler
+
+class FakeVSCode:
+    """記錄鍵盤操作；在存檔對話框按下 Enter 時把工作階段寫到貼上的路徑"""
+
+    def __init__(self, clipboard, session=None):
+        self.clipboard = clipboard
+        self.session = session
+        self.keys = []
+        self.pasted = []
+
+    def hotkey(self, *keys):
+        self.keys.append("+".join(keys))
+        if keys == ('ctrl', 'v'):
+            self.pasted.append(self.clipboard.paste())
+
+    def press(self, key):
+        self.keys.append(key)
+        if key == 'enter' and len(self.pasted) == 2 and self.session is not None:
+            with open(self.pasted[1], 'w', encoding='utf-8') as f:
+                json.dump(self.session, f)
+
+def _export(session, timeout=2):
+    """以模擬的 VS Code 執行匯出，返回 (回應, 模擬器, 匯出路徑)"""
+    original = copilot_handler_module.pyautogui
+    saved = (config.CHAT_EXPORT_DIALOG_DELAY, config.CHAT_EXPORT_TIMEOUT)
+    with tempfile.TemporaryDirectory() as tmp:
+        fake = FakeVSCode(copilot_handler_module.pyperclip, session)
+        target = Path(tmp) / "export.json"
+        try:
+            copilot_handler_module.pyautogui = fake
+            config.CHAT_EXPORT_DIALOG_DELAY = 0
+            config.CHAT_EXPORT_TIMEOUT = timeout
+            response = CopilotHandler().export_response(target)
+        finally:
+            copilot_handler_module.pyautogui = original
+            config.CHAT_EXPORT_DIALOG_DELAY, config.CHAT_EXPORT_TIMEOUT = saved
+        return response, fake, target
+
+def test_export_reads_latest_response():
+    """執行匯出命令、貼上產生的路徑，並讀取最後一次請求的回應"""
+    session = {"requesterUsername": "user", "requests": [
+        {"requestId": "r1", "response": [{"value": "舊的回應"}], "result": {}},
+        {"requestId": "r2", "response": [{"value": "## 分析結果\n"}, {"value": "沒有發現問題"}], "result": {}},
+    ]}
+    response, fake, target = _export(session)
+    assert response == "## 分析結果\n沒有發現問題"
+    assert fake.pasted == [config.CHAT_EXPORT_COMMAND, str(target.resolve())]
+    assert fake.keys.count('enter') == 2
+
+def test_export_timeout_and_empty():
+    """匯出檔案沒有出現或沒有回應內容時返回 None"""
+    response, fake, _ = _export(None, timeout=0.3)
+    assert response is None
+    assert fake.keys[-1] == 'escape'
+
+    response, _, _ = _export({"requests": []})
+    assert response is None
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試匯出聊天擷取回應...")
+    try:
+        test_export_reads_latest_response()
+        print("✅ 匯出並讀取最新回應")
+        test_export_timeout_and_empty()
+        print("✅ 匯出失敗時返回 None")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+測試回應區域輸出進度追蹤
+使用合成畫面驗證新增文字會判斷為輸出中，畫面靜止一段時間後判斷為輸出結束
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition, ChatProgressTracker
+
+SIZE = (1080, 1920)
+
+def _make_frame(lines: int) -> np.ndarray:
+    """建立合成畫面：右下角 send 按鈕，上方回應區域有指定行數的文字"""
+    frame = np.full((SIZE[0], SIZE[1], 3), 30, dtype=np.uint8)
+    template = cv2.imread(str(config.SEND_BUTTON_IMAGE), cv2.IMREAD_COLOR)
+    height, width = template.shape[:2]
+    frame[SIZE[0] - 120:SIZE[0] - 120 + height, SIZE[1] - 400:SIZE[1] - 400 + width] = template
+    for line in range(lines):
+        cv2.putText(frame, f"response line {line}", (SIZE[1] - 600, 500 + line * 24),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (220, 220, 220), 1)
+    return frame
+
+def test_progress_tracks_new_content():
+    """回應區域新增內容時為輸出中，靜止超過設定時間後為結束"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = ImageRecognition(learned_roi_file=Path(tmp) / "rois.json")
+        tracker = ChatProgressTracker(recognizer, stable_seconds=0.3)
+
+        # 尚未學習到聊天區域時無法判斷
+        assert tracker.sample(_make_frame(1)) is None
+
+        recognizer.detect_copilot_state(_make_frame(0))
+        tracker.sample(_make_frame(1))
+        assert tracker.sample(_make_frame(3)) is True
+        assert tracker.changed_rows >= config.CHAT_PROGRESS_MIN_CHANGED_ROWS
+        assert tracker.change_count == 1
+
+        time.sleep(0.4)
+        assert tracker.sample(_make_frame(3)) is False
+        assert tracker.changed_rows == 0
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試回應區域輸出進度追蹤...")
+    try:
+        test_progress_tracks_new_content()
+        print("✅ 輸出進度判斷正確")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
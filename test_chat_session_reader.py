@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+測試從 VS Code 聊天工作階段檔案讀取回應
+以合成的 workspaceStorage 與 chatSessions JSON 驗證工作階段目錄查找、增量讀取、完成判斷與錯誤轉換
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.chat_session_reader import ChatSessionReader, find_workspace_storage, parse_session
+from src.copilot_handler import CopilotHandler
+from src.error_handler import AutomationError, ErrorType
+
+def _request(request_id: str, parts, result=None) -> dict:
+    """合成一次聊天請求"""
+    request = {"requestId": request_id, "message": {"text": "analyze"}, "response": parts}
+    if result is not None:
+        request["result"] = result
+    return request
+
+def _write_session(path: Path, requests, session_id: str = "session-1") -> None:
+    """寫入工作階段檔案並確保修改時間遞增"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    previous = path.stat().st_mtime_ns if path.exists() else time.time_ns()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"version": 3, "sessionId": session_id, "requests": requests}, f)
+    mtime = max(time.time_ns(), previous + 1_000_000)
+    os.utime(path, ns=(mtime, mtime))
+
+def _make_storage(root: Path, project: Path) -> Path:
+    """建立專案與另一個無關專案的 workspaceStorage 目錄"""
+    for name, folder in (("aaa", root / "other"), ("bbb", project)):
+        storage = root / "User" / "workspaceStorage" / name
+        storage.mkdir(parents=True)
+        with open(storage / "workspace.json", 'w', encoding='utf-8') as f:
+            json.dump({"folder": folder.resolve().as_uri()}, f)
+    return root / "User" / "workspaceStorage" / "bbb"
+
+def test_parse_session():
+    """組合 Markdown 與檔案參照片段，依 result / modelState 判斷完成"""
+    parts = [{"value": "## 結果\n"}, {"kind": "inlineReference", "inlineReference": {"path": "/x/main.py"}},
+             {"kind": "markdownContent", "content": {"value": " 沒有問題"}}, {"kind": "progressMessage"}]
+    response = parse_session({"sessionId": "s", "requests": [_request("r1", parts)]})
+    assert response.text == "## 結果\n`main.py` 沒有問題"
+    assert not response.complete
+
+    response = parse_session({"sessionId": "s", "requests": [_request("r1", parts, result={"timings": {}})]})
+    assert response.complete and response.error is None
+
+    pending = dict(_request("r1", parts, result={}), modelState={"value": 0})
+    assert not parse_session({"requests": [pending]}).complete
+
+    failed = _request("r1", [], result={"errorDetails": {"message": "You have been rate limited"}})
+    assert parse_session({"requests": [failed]}).error == "You have been rate limited"
+    assert parse_session({"requests": []}) is None
+
+def test_reader_tracks_new_request():
+    """只返回送出提示詞後的新請求，檔案沒有變動時不重新解析"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        project = root / "project"
+        project.mkdir()
+        storage = _make_storage(root, project)
+        assert find_workspace_storage(project, root) == storage
+
+        session_file = storage / "chatSessions" / "session-1.json"
+        old = _request("r1", [{"value": "舊的回應"}], result={})
+        _write_session(session_file, [old])
+
+        reader = ChatSessionReader(project, user_data_dir=root)
+        reader.mark_baseline()
+        assert reader.storage_dir == storage
+        assert reader.poll() is None
+        parses = reader.parse_count
+        assert reader.poll() is None and reader.parse_count == parses
+
+        _write_session(session_file, [old, _request("r2", [{"value": "第一段"}])])
+        response = reader.poll()
+        assert response.request_id == "r2" and response.text == "第一段" and not response.complete
+        assert reader.parse_count == parses + 1
+
+        def finish():
+            time.sleep(0.2)
+            _write_session(session_file, [old, _request("r2", [{"value": "第一段"}, {"value": "第二段"}],
+                                                        result={"timings": {"totalElapsed": 1}})])
+
+        writer = threading.Thread(target=finish)
+        writer.start()
+        response = reader.wait_for_completion(5, interval=0.05)
+        writer.join()
+        assert response.complete and response.text == "第一段第二段"
+
+def test_handler_reads_session_instead_of_clipboard():
+    """等待回應與複製回應都使用工作階段檔案，Copilot 錯誤轉換為 AutomationError"""
+    saved = (config.VSCODE_USER_DATA_DIR, config.FRAME_DUMP_ENABLED)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        project = root / "project"
+        project.mkdir()
+        storage = _make_storage(root, project)
+        session_file = storage / "chatSessions" / "session-1.json"
+        try:
+            config.VSCODE_USER_DATA_DIR = root
+            config.FRAME_DUMP_ENABLED = False
+            handler = CopilotHandler()
+
+            assert handler.start_session_capture(str(project))
+            _write_session(session_file, [_request("r1", [{"value": "完整的回應內容"}], result={})])
+            assert handler.wait_for_response(timeout=5)
+            assert handler.get_stage_timings()['wait_mode'] == "session"
+            assert handler.copy_response() == "完整的回應內容"
+            assert handler.get_stage_timings()['clipboard_probes'] == 0
+
+            handler.start_session_capture(str(project))
+            _write_session(session_file, [_request("r2", [], result={"errorDetails": {"message": "Rate limit exceeded"}})])
+            try:
+                handler.wait_for_response(timeout=5)
+                raise AssertionError("回應失敗時應拋出 AutomationError")
+            except AutomationError as e:
+                assert e.error_type == ErrorType.COPILOT_RATE_LIMIT
+        finally:
+            config.VSCODE_USER_DATA_DIR, config.FRAME_DUMP_ENABLED = saved
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試聊天工作階段讀取...")
+    try:
+        test_parse_session()
+        print("✅ 工作階段 JSON 解析正確")
+        test_reader_tracks_new_request()
+        print("✅ 只讀取新請求且檔案變動時才重新解析")
+        test_handler_reads_session_instead_of_clipboard()
+        print("✅ 等待與複製回應不需要剪貼簿")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+測試 Copilot 錯誤訊息檢測
+使用合成畫面驗證錯誤模板能被辨識為 ERROR_BANNER，並轉換為對應的 AutomationError
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition, CopilotUIState, CopilotStateMonitor, DetectionStatus
+from src.copilot_handler import CopilotHandler
+from src.logger import get_logger
+from src.error_handler import AutomationError, ErrorHandler, ErrorType, RecoveryAction, RecoveryManager
+
+SIZE = (1080, 1920)
+
+def _banner(text: str) -> np.ndarray:
+    """合成錯誤訊息圖示（紅底白字）"""
+    banner = np.full((28, 220, 3), (40, 40, 160), dtype=np.uint8)
+    cv2.putText(banner, text, (6, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+    return banner
+
+def _make_frame(banner: np.ndarray = None) -> np.ndarray:
+    """建立合成畫面：右下角 send 按鈕，可選擇在按鈕上方顯示錯誤訊息"""
+    frame = np.full((SIZE[0], SIZE[1], 3), 30, dtype=np.uint8)
+    template = cv2.imread(str(config.SEND_BUTTON_IMAGE), cv2.IMREAD_COLOR)
+    height, width = template.shape[:2]
+    frame[SIZE[0] - 120:SIZE[0] - 120 + height, SIZE[1] - 400:SIZE[1] - 400 + width] = template
+    if banner is not None:
+        frame[SIZE[0] - 300:SIZE[0] - 300 + banner.shape[0], SIZE[1] - 600:SIZE[1] - 600 + banner.shape[1]] = banner
+    return frame
+
+def test_error_banner_detected():
+    """聊天區域上方出現錯誤訊息時應判斷為 ERROR_BANNER 並回報類別"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        rate_limit = _banner("Rate limited")
+        cv2.imwrite(str(tmp / "rate_limit.png"), rate_limit)
+        cv2.imwrite(str(tmp / "sign_in.png"), _banner("Sign in"))
+
+        recognizer = ImageRecognition(learned_roi_file=tmp / "rois.json")
+        recognizer.register_error_template("rate_limit", tmp / "rate_limit.png")
+        recognizer.register_error_template("auth", tmp / "sign_in.png")
+
+        status = recognizer.detect_copilot_state(_make_frame())
+        assert status.state == CopilotUIState.IDLE
+        assert status.error is None
+        # 預設的 transient 模板不存在，執行前檢查回報此類別無法檢測
+        unavailable = recognizer.check_optional_templates()
+        assert "error:transient" in unavailable and "error:rate_limit" not in unavailable
+
+        status = recognizer.detect_copilot_state(_make_frame(rate_limit))
+        assert status.state == CopilotUIState.ERROR_BANNER
+        assert status.error == "rate_limit"
+        assert status.to_dict()['error_state'] == "rate_limit"
+
+def test_error_categories_map_to_automation_errors():
+    """錯誤類別應轉換為對應的錯誤類型與恢復動作"""
+    handler = CopilotHandler()
+    expected = {
+        "rate_limit": (ErrorType.COPILOT_RATE_LIMIT, RecoveryAction.BACKOFF),
+        "auth": (ErrorType.COPILOT_AUTH_ERROR, RecoveryAction.ABORT),
+        "transient": (ErrorType.COPILOT_TRANSIENT_ERROR, RecoveryAction.RETRY),
+    }
+    for category, (error_type, action) in expected.items():
+        try:
+            handler._raise_copilot_error(category)
+        except AutomationError as e:
+            assert (e.error_type, e.suggested_action) == (error_type, action)
+        else:
+            assert False, f"{category} 未拋出 AutomationError"
+
+def test_auth_error_stops_run():
+    """需要登入時應中止並要求停止後續專案"""
+    error_handler = ErrorHandler()
+    action = error_handler.handle_error(
+        AutomationError("Copilot 需要登入", ErrorType.COPILOT_AUTH_ERROR, recoverable=False,
+                        suggested_action=RecoveryAction.ABORT)
+    )
+    assert action == RecoveryAction.ABORT
+    assert error_handler.emergency_stop_requested
+
+class MonitorRecognizer:
+    """提供預先餵入取樣的狀態監控器（不啟動背景執行緒）"""
+
+    def __init__(self):
+        self.logger = get_logger("MonitorRecognizer")
+        self.monitor = CopilotStateMonitor(self, confirm_samples=2)
+
+    def start_state_monitor(self):
+        return self.monitor
+
+    def stop_state_monitor(self):
+        pass
+
+    def save_diagnostic_frame(self, reason):
+        return None
+
+def test_monitor_raises_confirmed_error():
+    """確認錯誤狀態後的未確認取樣不應改變錯誤類別：需要登入時中止而不是重試"""
+    recognizer = MonitorRecognizer()
+    monitor = recognizer.monitor
+    monitor._update(DetectionStatus(error="auth"))
+    monitor._update(DetectionStatus(error="auth"))
+    monitor._update(DetectionStatus())
+    assert monitor.state == CopilotUIState.ERROR_BANNER
+    assert monitor.last_status.error is None and monitor.state_status.error == "auth"
+
+    handler = CopilotHandler()
+    handler.image_recognition = recognizer
+    try:
+        handler._monitor_wait_for_response(5)
+    except AutomationError as e:
+        assert e.error_type == ErrorType.COPILOT_AUTH_ERROR
+    else:
+        assert False, "未拋出 AutomationError"
+
+def test_backoff_interrupted_by_emergency_stop():
+    """rate limit 退避等待期間收到中斷請求應提前結束"""
+    error_handler = ErrorHandler()
+    recovery = RecoveryManager(error_handler)
+    saved = config.COPILOT_RATE_LIMIT_BACKOFF
+    try:
+        config.COPILOT_RATE_LIMIT_BACKOFF = 30
+        threading.Timer(0.3, lambda: setattr(error_handler, 'emergency_stop_requested', True)).start()
+        start = time.time()
+        assert not recovery.execute_recovery_action(RecoveryAction.BACKOFF, "rate limit")
+        assert time.time() - start < 3
+    finally:
+        config.COPILOT_RATE_LIMIT_BACKOFF = saved
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試 Copilot 錯誤訊息檢測...")
+    try:
+        test_error_banner_detected()
+        print("✅ 錯誤訊息檢測正確")
+        test_error_categories_map_to_automation_errors()
+        print("✅ 錯誤類別轉換正確")
+        test_auth_error_stops_run()
+        print("✅ 未登入時停止後續專案")
+        test_monitor_raises_confirmed_error()
+        print("✅ 背景監控使用確認狀態時的錯誤類別")
+        test_backoff_interrupted_by_emergency_stop()
+        print("✅ 退避等待可被中斷")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
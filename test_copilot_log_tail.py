@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+測試追蹤 Copilot Chat 擴充套件日誌判斷回應完成
+以合成的 logs 目錄驗證增量讀取、請求結束後的確認時間、inotify 喚醒，以及沒有事件時改用畫面檢測
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.copilot_log_tail import CopilotLogWatcher, LogTail, find_copilot_logs, parse_log_line
+from src.copilot_handler import CopilotHandler
+
+FINISH = "2025-01-10 12:34:56.789 [info] ccreq:{0}.copilotmd | success | gpt-4o | 1234ms | [panel/editAgent]\n"
+START = "2025-01-10 12:34:50.100 [info] Sending request {0}\n"
+
+def _make_logs(root: Path) -> Path:
+    """建立舊的與最新的 VS Code 執行日誌，返回最新一次的擴充套件日誌檔案"""
+    for session in ("20250109T080000", "20250110T120000"):
+        log_dir = root / "logs" / session / "window1" / "exthost" / config.COPILOT_LOG_EXTENSION_DIR
+        log_dir.mkdir(parents=True)
+        (log_dir / "GitHub Copilot Chat.log").write_text(FINISH.format("old"), encoding="utf-8")
+    return log_dir / "GitHub Copilot Chat.log"
+
+def _append(path: Path, text: str) -> None:
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+def test_parse_and_tail():
+    """解析開始 / 結束行與時間戳，未寫完的行留到下次讀取"""
+    event = parse_log_line(FINISH.format("abc").strip())
+    assert event.kind == "finish" and event.status == "success"
+    assert time.localtime(event.timestamp).tm_hour == 12
+    assert parse_log_line(START.format("abc")).kind == "start"
+    assert parse_log_line("2025-01-10 12:00:00.000 [info] Fetched model metadata") is None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "test.log"
+        path.write_text("既有內容\n", encoding="utf-8")
+        tail = LogTail(path)
+        assert tail.read_lines() == []
+        _append(path, "第一行\n第二")
+        assert tail.read_lines() == ["第一行"]
+        _append(path, "行\n")
+        assert tail.read_lines() == ["第二行"]
+
+def test_watcher_waits_for_last_request():
+    """代理模式的多個請求：最後一個請求結束並經過確認時間後才完成，inotify 寫入時立即喚醒"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        log_file = _make_logs(root)
+        assert find_copilot_logs(root) == [log_file]
+
+        watcher = CopilotLogWatcher(root)
+        assert watcher.mark()
+        if sys.platform.startswith("linux"):
+            assert watcher.watcher is not None
+
+        def write():
+            time.sleep(0.1)
+            _append(log_file, START.format("r1"))
+            time.sleep(0.1)
+            _append(log_file, FINISH.format("r1"))
+            time.sleep(0.1)
+            _append(log_file, START.format("r2"))
+            time.sleep(0.2)
+            _append(log_file, FINISH.format("r2"))
+
+        writer = threading.Thread(target=write)
+        start = time.monotonic()
+        writer.start()
+        assert watcher.wait_for_activity(2)
+        event = watcher.wait_for_finish(5, settle=0.3)
+        elapsed = time.monotonic() - start
+        writer.join()
+        watcher.close()
+
+        assert event is not None and "ccreq:r2" in event.line
+        assert 0.5 + 0.3 <= elapsed < 1.5, elapsed
+        assert [e.kind for e in watcher.events] == ["start", "finish", "start", "finish"]
+
+def test_watcher_finds_logs_created_later():
+    """擴充套件在 mark 之後才建立日誌目錄與檔案時，仍從頭讀取新的日誌"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        window = root / "logs" / "20250110T120000" / "window1"
+        window.mkdir(parents=True)
+
+        watcher = CopilotLogWatcher(root)
+        assert not watcher.mark()
+
+        def create():
+            time.sleep(0.2)
+            log_dir = window / "exthost" / config.COPILOT_LOG_EXTENSION_DIR
+            log_dir.mkdir(parents=True)
+            _append(log_dir / "GitHub Copilot Chat.log", START.format("r1") + FINISH.format("r1"))
+
+        creator = threading.Thread(target=create)
+        start = time.monotonic()
+        creator.start()
+        assert watcher.wait_for_activity(3)
+        event = watcher.wait_for_finish(3, settle=0.1)
+        elapsed = time.monotonic() - start
+        creator.join()
+        watcher.close()
+
+        assert event is not None and "ccreq:r1" in event.line
+        assert [e.kind for e in watcher.events] == ["start", "finish"]
+        assert elapsed < 2.0, elapsed
+
+def test_handler_uses_log_then_falls_back():
+    """有日誌事件時不需要畫面檢測；日誌沒有事件時改用畫面等待"""
+    saved = (config.VSCODE_USER_DATA_DIR, config.STATE_MONITOR_START_TIMEOUT, config.COPILOT_LOG_SETTLE_SECONDS)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        log_file = _make_logs(root)
+        try:
+            config.VSCODE_USER_DATA_DIR = root
+            config.STATE_MONITOR_START_TIMEOUT = 0.5
+            config.COPILOT_LOG_SETTLE_SECONDS = 0.1
+            handler = CopilotHandler()
+            fallbacks = []
+            handler._smart_wait_for_response = lambda timeout: fallbacks.append(timeout) or True
+            handler._visual_wait_for_response = handler._smart_wait_for_response
+
+            assert handler.start_log_capture()
+            _append(log_file, START.format("r1") + FINISH.format("r1"))
+            assert handler.wait_for_response(timeout=5, use_smart_wait=True)
+            assert fallbacks == []
+            assert handler.get_stage_timings()['wait_mode'] == "copilot_log"
+            assert handler.log_watcher is None
+
+            assert handler.start_log_capture()
+            assert handler.wait_for_response(timeout=5, use_smart_wait=True)
+            assert len(fallbacks) == 1 and fallbacks[0] <= 5
+        finally:
+            config.VSCODE_USER_DATA_DIR, config.STATE_MONITOR_START_TIMEOUT, config.COPILOT_LOG_SETTLE_SECONDS = saved
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試 Copilot Chat 日誌追蹤...")
+    try:
+        test_parse_and_tail()
+        print("✅ 日誌解析與增量讀取正確")
+        test_watcher_waits_for_last_request()
+        print("✅ 等待最後一個請求結束")
+        test_watcher_finds_logs_created_later()
+        print("✅ 發現 mark 之後才建立的日誌")
+        test_handler_uses_log_then_falls_back()
+        print("✅ 以日誌判斷完成，沒有事件時改用畫面等待")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
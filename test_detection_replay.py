@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+測試檢測畫面錄製與重播
+使用合成畫面錄製一段資料，驗證環狀緩衝上限與重播準確度統計
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition
+from src.detection_replay import FrameRecorder, DetectionReplay, load_corpus
+
+def _make_frame(template_path=None, size=(1080, 1920)):
+    """建立合成畫面，可選擇在右下角貼上按鈕模板"""
+    frame = np.full((size[0], size[1], 3), 30, dtype=np.uint8)
+    if template_path is not None:
+        template = cv2.imread(str(template_path), cv2.IMREAD_COLOR)
+        height, width = template.shape[:2]
+        frame[size[0] - 120:size[0] - 120 + height, size[1] - 400:size[1] - 400 + width] = template
+    return frame
+
+def _record_session(root: Path, max_frames: int) -> Path:
+    """錄製 stop -> send 的畫面序列並寫入標註"""
+    recognizer = ImageRecognition(learned_roi_file=root / "rois.json")
+    recorder = FrameRecorder("test", root=root, max_frames=max_frames)
+    recognizer.frame_recorder = recorder
+
+    sequence = [config.STOP_BUTTON_IMAGE] * 3 + [config.SEND_BUTTON_IMAGE] * 3
+    for template_path in sequence:
+        recognizer.reset_frame_gate()
+        recognizer.detect_copilot_state(_make_frame(template_path))
+
+    labels = {record.file: record.decision for record in load_corpus(recorder.session_dir)}
+    with open(recorder.session_dir / "labels.json", 'w', encoding='utf-8') as f:
+        json.dump(labels, f)
+    return recorder.session_dir
+
+def test_recorder_keeps_bounded_ring():
+    """超過上限時只保留最新的畫面"""
+    with tempfile.TemporaryDirectory() as tmp:
+        session_dir = _record_session(Path(tmp), max_frames=4)
+        records = load_corpus(session_dir)
+
+        assert len(list(session_dir.glob("frame_*.png"))) == 4
+        assert [record.seq for record in records] == [3, 4, 5, 6]
+        assert records[-1].decision == "idle"
+
+def test_replay_reports_accuracy():
+    """重播錄製的畫面應得到與標註一致的判斷"""
+    with tempfile.TemporaryDirectory() as tmp:
+        session_dir = _record_session(Path(tmp), max_frames=10)
+        replay = DetectionReplay(ImageRecognition(learned_roi_file=Path(tmp) / "replay_rois.json"),
+                                 use_frame_gate=False)
+        summary = replay.run(session_dir)['summary']
+
+        assert summary['frames'] == 6
+        assert summary['labelled'] == 6
+        assert summary['accuracy'] == 1.0
+        assert summary['decisions'] == {'responding': 3, 'idle': 3}
+        assert summary['latency_max_ms'] >= summary['latency_median_ms'] > 0
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試檢測畫面錄製與重播...")
+    try:
+        test_recorder_keeps_bounded_ring()
+        print("✅ 環狀緩衝上限正確")
+        test_replay_reports_accuracy()
+        print("✅ 重播準確度統計正確")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+測試診斷畫面背景寫入
+驗證畫面在背景執行緒寫入、佇列有記憶體上限、磁碟配額會刪除最舊的畫面
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from src.frame_dump import FrameDumpWriter
+
+def _noise(seed: int, size=(200, 300)) -> np.ndarray:
+    """產生不易壓縮的雜訊畫面"""
+    return np.random.default_rng(seed).integers(0, 255, (size[0], size[1], 3), dtype=np.uint8)
+
+def test_writes_in_background():
+    """submit 立即返回，畫面由背景執行緒以指定格式寫入"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for image_format in ("webp", "png"):
+            writer = FrameDumpWriter(root=Path(tmp) / image_format, image_format=image_format)
+            frame = _noise(1)
+            path = writer.submit(frame, reason="timeout")
+            assert path is not None and path.suffix == f".{image_format}" and "timeout" in path.name
+            assert writer.close()
+            saved = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            assert saved is not None and saved.shape == frame.shape
+            if image_format == "png":
+                assert np.array_equal(saved, frame)
+
+        # 指定路徑（take_screenshot 的 save_path）
+        writer = FrameDumpWriter(root=Path(tmp) / "root")
+        target = Path(tmp) / "other" / "shot.png"
+        assert writer.submit(_noise(2), target) == target
+        assert writer.close() and target.exists()
+
+def test_bounded_queue_drops_frames():
+    """寫入受阻時，超過佇列上限的畫面被捨棄而不是阻塞呼叫端"""
+    with tempfile.TemporaryDirectory() as tmp:
+        frame = _noise(3)
+        writer = FrameDumpWriter(root=Path(tmp), queue_size=2, max_queued_bytes=frame.nbytes * 10)
+        blocker = threading.Event()
+        original_write = writer._write
+        writer._write = lambda *args: (blocker.wait(5), original_write(*args))
+
+        start = time.perf_counter()
+        results = [writer.submit(frame.copy(), reason=str(i)) for i in range(6)]
+        assert time.perf_counter() - start < 0.5
+        assert writer.dropped_count >= 3
+        assert results[0] is not None
+
+        blocker.set()
+        assert writer.close()
+        assert writer.stats()['queued_bytes'] == 0
+
+        # 記憶體上限
+        writer = FrameDumpWriter(root=Path(tmp), queue_size=10, max_queued_bytes=frame.nbytes - 1)
+        assert writer.submit(frame) is None and writer.dropped_count == 1
+
+def test_disk_quota_evicts_oldest():
+    """根目錄內的畫面超過磁碟配額時刪除最舊的畫面"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        writer = FrameDumpWriter(root=root, image_format="png", quota_bytes=1)
+        paths = []
+        for i in range(4):
+            paths.append(writer.submit(_noise(i), root / f"{i}.png"))
+            assert writer.flush()
+        writer.close()
+        assert [path.exists() for path in paths] == [False, False, False, True]
+        assert writer.evicted_count == 3
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試診斷畫面背景寫入...")
+    try:
+        test_writes_in_background()
+        print("✅ 背景寫入 webp / png 正確")
+        test_bounded_queue_drops_frames()
+        print("✅ 佇列有上限且不阻塞")
+        test_disk_quota_evicts_oldest()
+        print("✅ 磁碟配額刪除最舊畫面")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
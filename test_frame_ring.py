@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+測試共享記憶體畫面環狀緩衝
+驗證畫面序號、覆寫檢查、以名稱連接，以及多個使用者共用背景截圖執行緒的畫面而不另外截圖
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src import image_recognition as image_recognition_module
+from src.frame_ring import FrameRing
+from src.image_recognition import ImageRecognition, ChatProgressTracker, CaptureBackend, CopilotUIState
+from test_detection_replay import _make_frame
+
+class CountingBackend(CaptureBackend):
+    """由固定畫面截圖並計算截圖次數的後端"""
+
+    name = "counting"
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.grab_count = 0
+
+    def grab(self, region=None):
+        self.grab_count += 1
+        if region is None:
+            return self.frame.copy()
+        left, top, width, height = region
+        return self.frame[top:top + height, left:left + width].copy()
+
+    def screen_size(self):
+        return self.frame.shape[1], self.frame.shape[0]
+
+class FakeDumpWriter:
+    """記錄提交的診斷畫面，不寫入磁碟"""
+
+    def __init__(self):
+        self.frames = []
+
+    def submit(self, frame, path=None, reason=None):
+        self.frames.append(frame)
+        return Path(f"{reason}.webp")
+
+def test_sequence_and_overwrite():
+    """序號遞增、讀取的是視圖，槽被覆寫後 is_valid 返回 False"""
+    ring = FrameRing((4, 6), slots=2)
+    try:
+        assert ring.latest() is None
+        for value in (1, 2):
+            ring.write(np.full((4, 6), value, dtype=np.uint8), origin=(10, 20))
+        latest = ring.latest()
+        assert latest.seq == 2 and latest.origin == (10, 20)
+        assert int(latest.frame[0, 0]) == 2
+        assert not latest.frame.flags.writeable
+        assert np.shares_memory(latest.frame, ring._data)
+        assert ring.is_valid(latest)
+
+        ring.write(np.full((4, 6), 3, dtype=np.uint8))
+        assert ring.is_valid(latest)
+        ring.write(np.full((4, 6), 4, dtype=np.uint8))
+        assert not ring.is_valid(latest)
+
+        try:
+            ring.write(np.zeros((5, 6), dtype=np.uint8))
+            raise AssertionError("形狀不符的畫面應被拒絕")
+        except ValueError:
+            pass
+    finally:
+        ring.close()
+
+def test_attach_by_name():
+    """以名稱連接的讀取端看到相同的畫面與序號"""
+    ring = FrameRing((8, 8, 3), slots=3)
+    reader = FrameRing(name=ring.name, create=False)
+    try:
+        assert reader.shape == (8, 8, 3) and reader.slots == 3
+        frame = np.random.default_rng(0).integers(0, 255, (8, 8, 3), dtype=np.uint8)
+        ring.write(frame, origin=(5, 6))
+        latest = reader.latest()
+        assert latest.seq == 1 and latest.origin == (5, 6)
+        assert np.array_equal(latest.frame, frame)
+        assert reader.wait_for_newer(1, timeout=0.05) is None
+        ring.write(frame)
+        assert reader.wait_for_newer(1, timeout=0.5).seq == 2
+    finally:
+        reader.close()
+        ring.close()
+
+def test_consumers_share_capture():
+    """檢測、進度追蹤與診斷畫面都使用背景執行緒的畫面，截圖次數只取決於截圖頻率"""
+    original_writer = image_recognition_module.frame_dump_writer
+    original_enabled = config.FRAME_DUMP_ENABLED
+    fake_writer = FakeDumpWriter()
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = ImageRecognition(learned_roi_file=Path(tmp) / "rois.json")
+        backend = CountingBackend(_make_frame(config.SEND_BUTTON_IMAGE))
+        recognizer.capture_backend = backend
+        tracker = ChatProgressTracker(recognizer)
+        try:
+            image_recognition_module.frame_dump_writer = fake_writer
+            config.FRAME_DUMP_ENABLED = True
+            recognizer.start_frame_ring(rate_hz=20)
+            assert recognizer.frame_ring.wait_for_newer(0, timeout=2.0) is not None
+
+            for _ in range(5):
+                status = recognizer.detect_copilot_state()
+                assert status.state == CopilotUIState.IDLE
+                assert tracker.sample() is not None
+            time.sleep(0.2)
+            status = recognizer.detect_copilot_state()
+            assert status.state == CopilotUIState.IDLE
+            recognizer._last_diagnostic_frame = 0.0
+            assert recognizer.save_diagnostic_frame("test") is not None
+            assert fake_writer.frames[-1].shape == (1080, 1920)
+
+            recognizer.frame_capture.stop()
+            assert backend.grab_count == recognizer.frame_capture.capture_count
+            assert tracker.sample_count == 5
+        finally:
+            image_recognition_module.frame_dump_writer = original_writer
+            config.FRAME_DUMP_ENABLED = original_enabled
+            recognizer.stop_frame_ring()
+        assert recognizer.frame_ring is None
+
+        # 停止後恢復自行截圖
+        recognizer.reset_frame_gate()
+        before = backend.grab_count
+        assert recognizer.detect_copilot_state().state == CopilotUIState.IDLE
+        assert backend.grab_count > before
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試共享記憶體畫面環狀緩衝...")
+    try:
+        test_sequence_and_overwrite()
+        print("✅ 畫面序號與覆寫檢查正確")
+        test_attach_by_name()
+        print("✅ 以名稱連接的讀取端看到相同畫面")
+        test_consumers_share_capture()
+        print("✅ 多個使用者共用背景截圖的畫面")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
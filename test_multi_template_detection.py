@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+測試單次截圖多模板檢測
+使用合成畫面驗證 stop / send 按鈕能在同一張截圖中一次匹配
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition, STOP_BUTTON, SEND_BUTTON
+from src.project_manager import ProjectManager, ProjectInfo
+
+# 使用暫存的 ROI 快取，合成畫面中學習到的位置不寫入實際的 LEARNED_ROI_FILE
+_roi_dir = tempfile.TemporaryDirectory()
+image_recognition = ImageRecognition(learned_roi_file=Path(_roi_dir.name) / "rois.json")
+
+def _make_frame(*template_paths, size=(1080, 1920)):
+    """建立合成畫面，將模板貼在畫面右下角的不同位置"""
+    frame = np.full((size[0], size[1], 3), 30, dtype=np.uint8)
+    positions = []
+    for index, template_path in enumerate(template_paths):
+        template = cv2.imread(str(template_path), cv2.IMREAD_COLOR)
+        height, width = template.shape[:2]
+        left = size[1] - 400 + index * 120
+        top = size[0] - 120
+        frame[top:top + height, left:left + width] = template
+        positions.append((left, top))
+    return frame, positions
+
+def test_single_frame_detects_stop_button():
+    """只有 stop 按鈕的畫面應判斷為回應中"""
+    frame, positions = _make_frame(config.STOP_BUTTON_IMAGE)
+    status = image_recognition.detect_copilot_state(frame)
+    
+    assert status.has_stop_button
+    assert not status.has_send_button
+    assert status.is_responding and not status.is_ready
+    assert (status.box(STOP_BUTTON).left, status.box(STOP_BUTTON).top) == positions[0]
+    assert status.score(STOP_BUTTON) >= config.IMAGE_CONFIDENCE
+
+def test_single_frame_detects_send_button():
+    """只有 send 按鈕的畫面應判斷為回應完成"""
+    frame, _ = _make_frame(config.SEND_BUTTON_IMAGE)
+    status = image_recognition.detect_copilot_state(frame)
+    
+    assert status.has_send_button
+    assert not status.has_stop_button
+    assert status.is_ready
+    
+    legacy = status.to_dict()
+    assert legacy['is_ready'] and not legacy['is_responding']
+    assert set(legacy['scores']) == {STOP_BUTTON, SEND_BUTTON}
+
+def test_empty_frame_reports_scores():
+    """沒有按鈕的畫面兩個模板都應為未找到，但仍回報分數"""
+    frame = np.full((1080, 1920, 3), 30, dtype=np.uint8)
+    status = image_recognition.detect_copilot_state(frame)
+    
+    assert not status.has_stop_button and not status.has_send_button
+    assert status.box(STOP_BUTTON) is None
+    assert STOP_BUTTON in status.matches and SEND_BUTTON in status.matches
+
+def test_detection_metrics_recorded():
+    """檢測統計應記錄每個模板的嘗試次數、命中率與耗時"""
+    image_recognition.reset_detection_metrics()
+    image_recognition.reset_frame_gate()
+    frame, _ = _make_frame(config.STOP_BUTTON_IMAGE)
+    image_recognition.detect_copilot_state(frame)
+    
+    metrics = image_recognition.get_detection_metrics()
+    assert metrics['detections'] == 1
+    assert metrics['states'] == {'responding': 1}
+    stop = metrics['templates'][STOP_BUTTON]
+    assert stop['attempts'] == 1 and stop['hits'] == 1 and stop['hit_rate'] == 1.0
+    assert stop['match_time_ms']['count'] == 1
+    assert metrics['templates'][SEND_BUTTON]['hits'] == 0
+
+def test_detection_metrics_only_in_report():
+    """檢測統計輸出於摘要報告，不寫入專案狀態檔"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ProjectManager(Path(tmp))
+        manager.projects = [ProjectInfo(name="demo", path=str(Path(tmp) / "demo"))]
+        assert manager.record_detection_metrics("demo", {'detections': 3})
+        assert manager.update_project_status("demo", "completed")
+        
+        with open(manager.status_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)["projects"][0]
+        assert saved["name"] == "demo" and "detection_metrics" not in saved
+        assert manager.generate_summary_report()["檢測統計"]["demo"] == {'detections': 3}
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試單次截圖多模板檢測...")
+    try:
+        test_single_frame_detects_stop_button()
+        print("✅ stop 按鈕檢測正確")
+        test_single_frame_detects_send_button()
+        print("✅ send 按鈕檢測正確")
+        test_empty_frame_reports_scores()
+        print("✅ 無按鈕畫面檢測正確")
+        test_detection_metrics_recorded()
+        print("✅ 檢測統計記錄正確")
+        test_detection_metrics_only_in_report()
+        print("✅ 檢測統計只輸出於摘要報告")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+    
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -88,7 +88,8 @@ def test_manual_scenario():
     logger.info("")
     logger.info("預期行為:")
     logger.info("- 當同時檢測不到 send_button 和 stop_button 時")
-    logger.info("- 腳本應該自動按 Ctrl+Shift+P")
+    logger.info("- 若有 assets/notification_close.png，只點擊遮擋聊天區域的通知關閉按鈕")
+    logger.info("- 否則腳本應該自動按 Ctrl+Shift+P")
     logger.info("- 輸入 'Notifications: Clear All Notifications'")
     logger.info("- 按 Enter 執行命令")
     logger.info("- 繼續正常的智能等待流程")
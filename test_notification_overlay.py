@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+測試通知遮擋檢測
+使用合成畫面驗證只有遮擋聊天區域的通知才會被判斷為 NOTIFICATION_OVERLAY
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src import image_recognition as image_recognition_module
+from src.image_recognition import (ImageRecognition, CopilotUIState, CopilotStateMonitor, DetectionStatus,
+                                   TemplateMatch, Box, NOTIFICATION_CLOSE, SEND_BUTTON)
+from src.copilot_handler import CopilotHandler
+from src.logger import get_logger
+
+SIZE = (1080, 1920)
+
+def _close_icon() -> np.ndarray:
+    """合成通知關閉按鈕（深色底上的 X）"""
+    icon = np.full((22, 22, 3), 60, dtype=np.uint8)
+    cv2.line(icon, (5, 5), (16, 16), (220, 220, 220), 2)
+    cv2.line(icon, (16, 5), (5, 16), (220, 220, 220), 2)
+    return icon
+
+def _make_frame(send_button_left: int = None, toast_at=None) -> np.ndarray:
+    """建立合成畫面：可選擇在指定水平位置顯示 send 按鈕，以及在指定位置（關閉按鈕左上角）顯示通知"""
+    frame = np.full((SIZE[0], SIZE[1], 3), 30, dtype=np.uint8)
+    if send_button_left is not None:
+        template = cv2.imread(str(config.SEND_BUTTON_IMAGE), cv2.IMREAD_COLOR)
+        height, width = template.shape[:2]
+        left = send_button_left
+        frame[SIZE[0] - 120:SIZE[0] - 120 + height, left:left + width] = template
+    if toast_at is not None:
+        left, top = toast_at
+        # 通知本體往左延伸，關閉按鈕在右上角
+        frame[top - 8:top + 90, left - 420:left + 30] = 60
+        frame[top:top + 22, left:left + 22] = _close_icon()
+    return frame
+
+def _make_recognizer(tmp: Path, chat_left: int) -> ImageRecognition:
+    """建立使用暫存 ROI 快取與合成關閉按鈕模板的辨識器，並先學習聊天區域位置"""
+    icon_path = tmp / "notification_close.png"
+    cv2.imwrite(str(icon_path), _close_icon())
+
+    recognizer = ImageRecognition(learned_roi_file=tmp / "rois.json")
+    recognizer.register_template(NOTIFICATION_CLOSE, icon_path)
+    assert recognizer.detect_copilot_state(_make_frame(send_button_left=chat_left)).state == CopilotUIState.IDLE
+    return recognizer
+
+def test_overlapping_toast_is_detected():
+    """遮擋聊天區域的通知應判斷為 NOTIFICATION_OVERLAY 並回報關閉按鈕位置"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = _make_recognizer(Path(tmp), chat_left=SIZE[1] - 400)
+        status = recognizer.detect_copilot_state(_make_frame(toast_at=(SIZE[1] - 60, SIZE[0] - 160)))
+
+        assert status.state == CopilotUIState.NOTIFICATION_OVERLAY
+        assert (status.notification.left, status.notification.top) == (SIZE[1] - 60, SIZE[0] - 160)
+        assert status.to_dict()['notification_overlay']
+
+        # 不實際點擊執行測試的桌面，只確認點擊關閉按鈕中心
+        with mock.patch.object(image_recognition_module, "pyautogui") as fake_pyautogui:
+            assert recognizer.clear_occluding_notifications(status)
+        fake_pyautogui.click.assert_called_once_with(SIZE[1] - 60 + 11, SIZE[0] - 160 + 11)
+        assert recognizer.get_notification_stats()['targeted_dismissals'] == 1
+
+def test_response_status_dismisses_occluding_toast():
+    """check_copilot_response_status 也只關閉遮擋的通知，並等待按鈕重新出現"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = _make_recognizer(Path(tmp), chat_left=SIZE[1] - 400)
+        toast = recognizer.detect_copilot_state(_make_frame(toast_at=(SIZE[1] - 60, SIZE[0] - 160)))
+        idle = recognizer.detect_copilot_state(_make_frame(send_button_left=SIZE[1] - 400))
+        with mock.patch.object(recognizer, "detect_copilot_state", side_effect=[toast, idle]), \
+                mock.patch.object(recognizer, "clear_vscode_notifications") as clear_all, \
+                mock.patch.object(image_recognition_module, "pyautogui") as fake_pyautogui:
+            status = recognizer.check_copilot_response_status()
+
+        assert status['notifications_cleared'] and status['is_ready']
+        fake_pyautogui.click.assert_called_once()
+        clear_all.assert_not_called()
+        assert recognizer.get_notification_stats()['targeted_dismissals'] == 1
+
+def test_distant_toast_is_ignored():
+    """聊天面板在左側時，右下角的通知不應觸發清除"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = _make_recognizer(Path(tmp), chat_left=300)
+        status = recognizer.detect_copilot_state(_make_frame(toast_at=(SIZE[1] - 60, SIZE[0] - 160)))
+
+        assert status.state == CopilotUIState.UNKNOWN
+        assert status.notification is None
+        assert not recognizer.clear_occluding_notifications(status)
+        assert recognizer.get_notification_stats()['no_overlay_found'] == 1
+
+def test_missing_close_template_reported():
+    """缺少通知關閉按鈕模板時執行前檢查回報該功能無法使用"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = _make_recognizer(Path(tmp), chat_left=SIZE[1] - 400)
+        assert NOTIFICATION_CLOSE not in recognizer.check_optional_templates()
+        recognizer.register_template(NOTIFICATION_CLOSE, Path(tmp) / "missing.png")
+        assert NOTIFICATION_CLOSE in recognizer.check_optional_templates()
+
+class MonitorRecognizer:
+    """提供預先餵入取樣的狀態監控器（不啟動背景執行緒），記錄清除通知時收到的檢測結果"""
+
+    def __init__(self):
+        self.logger = get_logger("MonitorRecognizer")
+        self.monitor = CopilotStateMonitor(self, confirm_samples=2)
+        self.cleared = []
+
+    def start_state_monitor(self):
+        return self.monitor
+
+    def stop_state_monitor(self):
+        pass
+
+    def save_diagnostic_frame(self, reason):
+        return None
+
+    def clear_occluding_notifications(self, status):
+        self.cleared.append(status)
+        # 關閉通知後回到閒置狀態
+        idle = DetectionStatus(matches={SEND_BUTTON: TemplateMatch(SEND_BUTTON, True, 0.99, Box(0, 0, 10, 10))})
+        self.monitor._update(idle)
+        self.monitor._update(idle)
+        return True
+
+def test_monitor_clears_confirmed_notification():
+    """背景監控關閉的是確認遮擋狀態時的通知，而不是之後未確認的取樣"""
+    saved = config.STATE_MONITOR_START_TIMEOUT
+    try:
+        config.STATE_MONITOR_START_TIMEOUT = 0.1
+        recognizer = MonitorRecognizer()
+        monitor = recognizer.monitor
+        toast = DetectionStatus(notification=Box(1860, 920, 22, 22))
+        monitor._update(toast)
+        monitor._update(toast)
+        monitor._update(DetectionStatus())
+        assert monitor.state == CopilotUIState.NOTIFICATION_OVERLAY
+        assert monitor.last_status.notification is None
+
+        handler = CopilotHandler()
+        handler.image_recognition = recognizer
+        assert handler._monitor_wait_for_response(5)
+        assert recognizer.cleared == [toast]
+    finally:
+        config.STATE_MONITOR_START_TIMEOUT = saved
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試通知遮擋檢測...")
+    try:
+        test_overlapping_toast_is_detected()
+        print("✅ 遮擋聊天區域的通知檢測正確")
+        test_response_status_dismisses_occluding_toast()
+        print("✅ 詳細狀態檢查只關閉遮擋的通知")
+        test_distant_toast_is_ignored()
+        print("✅ 未遮擋的通知正確略過")
+        test_missing_close_template_reported()
+        print("✅ 缺少關閉按鈕模板時記錄警告")
+        test_monitor_clears_confirmed_notification()
+        print("✅ 背景監控關閉確認狀態時的通知")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+測試由粗到細的金字塔匹配
+驗證整張截圖搜尋時結果與原尺寸匹配一致，且小區域（ROI）仍以原尺寸匹配
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition, STOP_BUTTON, SEND_BUTTON
+
+SIZE = (1080, 1920)
+
+def _make_frame(template_path: Path, left: int, top: int) -> np.ndarray:
+    """建立帶雜訊的深色畫面，在指定位置貼上按鈕"""
+    rng = np.random.default_rng(left * 7 + top)
+    frame = np.full((SIZE[0], SIZE[1], 3), 30, dtype=np.uint8)
+    frame += rng.integers(0, 20, frame.shape, dtype=np.uint8)
+    template = cv2.imread(str(template_path), cv2.IMREAD_COLOR)
+    frame[top:top + template.shape[0], left:left + template.shape[1]] = template
+    return frame
+
+def _full_resolution(recognizer, frame, handle):
+    """以原尺寸匹配作為對照"""
+    original = config.PYRAMID_MATCH_ENABLED
+    try:
+        config.PYRAMID_MATCH_ENABLED = False
+        return recognizer._match_handle(frame, handle, threshold=config.IMAGE_CONFIDENCE)
+    finally:
+        config.PYRAMID_MATCH_ENABLED = original
+
+def test_matches_full_resolution():
+    """奇數與偶數座標的按鈕，由粗到細的位置與分數應與原尺寸匹配相同"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = ImageRecognition(learned_roi_file=Path(tmp) / "rois.json")
+        handle = recognizer.templates.get(STOP_BUTTON)
+        for left, top in ((1507, 943), (1, 0), (1901, 1059), (733, 411)):
+            frame = _make_frame(config.STOP_BUTTON_IMAGE, left, top)
+            for image in (frame, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)):
+                assert recognizer._pyramid_level(image, handle) > 0
+                score, box = recognizer._match_handle(image, handle, threshold=config.IMAGE_CONFIDENCE)
+                expected_score, expected_box = _full_resolution(recognizer, image, handle)
+                assert (box.left, box.top) == (left, top) == (expected_box.left, expected_box.top)
+                assert abs(score - expected_score) < 1e-4
+
+def test_absent_template_not_found():
+    """畫面中沒有的按鈕不應因粗搜尋而誤判為找到"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = ImageRecognition(learned_roi_file=Path(tmp) / "rois.json")
+        frame = cv2.cvtColor(_make_frame(config.STOP_BUTTON_IMAGE, 1507, 943), cv2.COLOR_BGR2GRAY)
+        status = recognizer.match_templates(frame, [STOP_BUTTON, SEND_BUTTON])
+        assert status.has_stop_button and not status.has_send_button
+        assert status.score(SEND_BUTTON) < config.IMAGE_CONFIDENCE
+
+def test_small_frames_use_full_resolution():
+    """小於門檻的截圖（ROI 區域）與太小的模板層不使用粗搜尋"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = ImageRecognition(learned_roi_file=Path(tmp) / "rois.json")
+        handle = recognizer.templates.get(STOP_BUTTON)
+        roi = np.zeros((200, 300), dtype=np.uint8)
+        assert recognizer._pyramid_level(roi, handle) == 0
+
+        # 約 20 像素的按鈕縮小到 1/4 只剩 5 像素，應退回較淺的層
+        frame = np.zeros(SIZE, dtype=np.uint8)
+        level = recognizer._pyramid_level(frame, handle)
+        assert 0 < level <= config.PYRAMID_MATCH_LEVEL
+        assert min(handle.pyramid[level].shape[:2]) >= config.PYRAMID_MIN_TEMPLATE_SIDE
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試由粗到細的金字塔匹配...")
+    try:
+        test_matches_full_resolution()
+        print("✅ 由粗到細的結果與原尺寸匹配一致")
+        test_absent_template_not_found()
+        print("✅ 不存在的按鈕不會誤判")
+        test_small_frames_use_full_resolution()
+        print("✅ 小區域與小模板使用原尺寸匹配")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+測試主題 / 縮放模板變體
+使用合成的淺色主題模板，驗證以單張畫面辨識出主題與縮放後改用該變體檢測
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition, STOP_BUTTON, SEND_BUTTON
+
+SIZE = (1080, 1920)
+
+def _make_theme(theme_dir: Path) -> dict:
+    """以反色的預設模板建立 light 主題，返回各按鈕的反色影像"""
+    folder = theme_dir / "light"
+    folder.mkdir(parents=True)
+    images = {}
+    for name, path in ((STOP_BUTTON, config.STOP_BUTTON_IMAGE), (SEND_BUTTON, config.SEND_BUTTON_IMAGE)):
+        image = 255 - cv2.imread(str(path), cv2.IMREAD_COLOR)
+        cv2.imwrite(str(folder / f"{name}.png"), image)
+        images[name] = image
+    return images
+
+def _make_frame(button: np.ndarray, scale: float) -> np.ndarray:
+    """建立淺色背景畫面，右下角貼上縮放後的按鈕"""
+    frame = np.full((SIZE[0], SIZE[1], 3), 235, dtype=np.uint8)
+    button = cv2.resize(button, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    height, width = button.shape[:2]
+    frame[SIZE[0] - 120:SIZE[0] - 120 + height, SIZE[1] - 400:SIZE[1] - 400 + width] = button
+    return frame
+
+def test_identifies_theme_and_scale():
+    """預設模板找不到按鈕時，應以同一張畫面辨識出 light@125 並找到按鈕"""
+    original_theme_dir = config.TEMPLATE_THEME_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        try:
+            config.TEMPLATE_THEME_DIR = tmp / "themes"
+            images = _make_theme(config.TEMPLATE_THEME_DIR)
+            recognizer = ImageRecognition(learned_roi_file=tmp / "rois.json")
+        finally:
+            config.TEMPLATE_THEME_DIR = original_theme_dir
+
+        assert "light@125" in recognizer.template_variants
+        assert "default@100" in recognizer.template_variants
+
+        status = recognizer.detect_copilot_state(_make_frame(images[SEND_BUTTON], 1.25))
+        assert recognizer.active_variant == "light@125"
+        assert status.has_send_button and not status.has_stop_button
+
+        # 辨識後只使用該變體，不再重新辨識
+        handle = recognizer.templates.get(SEND_BUTTON)
+        assert handle.scale == 1.25
+        recognizer.reset_frame_gate()
+        assert recognizer.detect_copilot_state(_make_frame(images[STOP_BUTTON], 1.25)).has_stop_button
+
+def test_default_variant_needs_no_identification():
+    """預設模板已能找到按鈕時直接視為預設變體"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = ImageRecognition(learned_roi_file=Path(tmp) / "rois.json")
+        template = cv2.imread(str(config.STOP_BUTTON_IMAGE), cv2.IMREAD_COLOR)
+        assert recognizer.detect_copilot_state(_make_frame(template, 1.0)).has_stop_button
+        assert recognizer.active_variant == "default@100"
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試主題 / 縮放模板變體...")
+    try:
+        test_identifies_theme_and_scale()
+        print("✅ 主題與縮放辨識正確")
+        test_default_variant_needs_no_identification()
+        print("✅ 預設變體不需重新辨識")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
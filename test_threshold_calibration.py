@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+測試信心度閾值校正
+驗證閾值選擇規則，以及由錄製畫面校正後的閾值會被圖像辨識使用
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition, STOP_BUTTON, SEND_BUTTON
+from src.detection_replay import FrameRecorder, load_corpus
+from src.threshold_calibration import (ThresholdCalibrator, choose_threshold,
+                                       save_thresholds, load_thresholds)
+from test_detection_replay import _make_frame
+
+def test_choose_threshold_separable():
+    """可完全區分時取中點"""
+    threshold, errors = choose_threshold([0.95, 0.97, 0.99], [0.3, 0.45, 0.55])
+    assert threshold == 0.75 and errors == 0
+
+def test_choose_threshold_overlapping():
+    """重疊時取誤判最少的分界，並限制在允許範圍內"""
+    threshold, errors = choose_threshold([0.7, 0.9, 0.92], [0.2, 0.75], bounds=(0.6, 0.98))
+    assert threshold == 0.9 and errors == 1
+
+    threshold, _ = choose_threshold([0.999], [0.1], bounds=(0.6, 0.98))
+    assert threshold == 0.6
+
+def test_calibrate_from_corpus():
+    """由標註的錄製畫面校正閾值，寫入後新的辨識器應使用該閾值"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        recognizer = ImageRecognition(learned_roi_file=tmp / "rois.json")
+        recorder = FrameRecorder("calibration", root=tmp)
+        recognizer.frame_recorder = recorder
+        for template_path in [config.STOP_BUTTON_IMAGE] * 5 + [config.SEND_BUTTON_IMAGE] * 5:
+            recognizer.reset_frame_gate()
+            recognizer.detect_copilot_state(_make_frame(template_path))
+        labels = {record.file: record.decision for record in load_corpus(recorder.session_dir)}
+        with open(recorder.session_dir / "labels.json", 'w', encoding='utf-8') as f:
+            json.dump(labels, f)
+
+        calibrator = ThresholdCalibrator(recognizer)
+        assert calibrator.add_corpus(recorder.session_dir) == 10
+        results = calibrator.calibrate(min_samples=5)
+        assert {result.template for result in results} == {STOP_BUTTON, SEND_BUTTON}
+        assert all(result.threshold is not None and result.margin > 0 for result in results)
+
+        threshold_file = tmp / "thresholds.json"
+        assert save_thresholds(results, threshold_file, machine="test-machine") == 2
+        thresholds = load_thresholds(threshold_file, machine="test-machine")
+        assert set(thresholds["1920x1080"]) == {STOP_BUTTON, SEND_BUTTON}
+        assert load_thresholds(threshold_file, machine="other-machine") == {}
+
+        # 閾值高於實際分數時應判斷為未找到
+        recognizer.calibrated_thresholds = {"1920x1080": {SEND_BUTTON: 1.01}}
+        recognizer.reset_frame_gate()
+        status = recognizer.detect_copilot_state(_make_frame(config.SEND_BUTTON_IMAGE))
+        assert not status.has_send_button
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試信心度閾值校正...")
+    try:
+        test_choose_threshold_separable()
+        print("✅ 可區分時閾值選擇正確")
+        test_choose_threshold_overlapping()
+        print("✅ 分數重疊時閾值選擇正確")
+        test_calibrate_from_corpus()
+        print("✅ 由錄製畫面校正閾值正確")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+測試聊天區域 UI 狀態分類器
+使用合成的聊天區域畫面訓練，驗證分類、模型存取，以及檢測時以分類結果取代模板匹配
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition, CopilotUIState
+from src.detection_replay import FrameRecorder, load_corpus
+from src.ui_state_classifier import UIStateClassifier, train_from_corpus, ERROR_BANNER
+from test_detection_replay import _make_frame
+
+def _banner_frame() -> np.ndarray:
+    """聊天區域被錯誤訊息覆蓋的畫面"""
+    frame = _make_frame(config.SEND_BUTTON_IMAGE)
+    cv2.rectangle(frame, (1300, 850), (1900, 1070), (200, 200, 200), -1)
+    cv2.rectangle(frame, (1320, 940), (1880, 990), (40, 40, 180), -1)
+    return frame
+
+def _record_roi_session(root: Path) -> Path:
+    """錄製 stop / send 的聊天區域畫面，並標註一張錯誤訊息畫面"""
+    recognizer = ImageRecognition(learned_roi_file=root / "rois.json")
+    recognizer.detect_copilot_state(_make_frame(config.STOP_BUTTON_IMAGE))  # 學習聊天區域位置
+    recorder = FrameRecorder("classifier", root=root)
+    recognizer.frame_recorder = recorder
+    for template_path in [config.STOP_BUTTON_IMAGE, config.SEND_BUTTON_IMAGE] * 3:
+        recognizer.reset_frame_gate()
+        recognizer.detect_copilot_state(_make_frame(template_path))
+    recognizer.reset_frame_gate()
+    recognizer.detect_copilot_state(_banner_frame())
+
+    records = load_corpus(recorder.session_dir)
+    labels = {record.file: record.decision for record in records}
+    labels[records[-1].file] = ERROR_BANNER
+    with open(recorder.session_dir / "labels.json", 'w', encoding='utf-8') as f:
+        json.dump(labels, f)
+    return recorder.session_dir
+
+def test_nearest_neighbour():
+    """最近範例的標籤與相似度"""
+    classifier = UIStateClassifier((16, 16))
+    dark = np.zeros((60, 80), dtype=np.uint8)
+    dark[20:40, 30:50] = 200
+    light = np.full((60, 80), 200, dtype=np.uint8)
+    light[:, :40] = 20
+    classifier.add(dark, "idle")
+    classifier.add(light, "responding")
+
+    prediction = classifier.predict(dark // 2)  # 亮度不同仍為同一狀態
+    assert prediction.label == "idle" and prediction.similarity > 0.99 and prediction.confident
+    assert classifier.predict(light).label == "responding"
+    assert UIStateClassifier().predict(dark).label == "unknown"
+
+def test_train_save_and_detect():
+    """由錄製畫面訓練後，檢測聊天區域時以分類結果取代模板匹配"""
+    original_enabled, original_model = config.UI_CLASSIFIER_ENABLED, config.UI_CLASSIFIER_MODEL
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        session_dir = _record_roi_session(tmp)
+        classifier = train_from_corpus([session_dir])
+        assert len(classifier) == 7
+        result = classifier.evaluate()
+        assert result['labels'] == {'responding': 3, 'idle': 3, ERROR_BANNER: 1}
+
+        try:
+            config.UI_CLASSIFIER_ENABLED = True
+            config.UI_CLASSIFIER_MODEL = tmp / "classifier.npz"
+            classifier.save()
+            assert len(UIStateClassifier.load()) == 7
+
+            recognizer = ImageRecognition(learned_roi_file=tmp / "rois.json")
+            assert recognizer.ui_classifier is not None
+            roi = recognizer._get_chat_roi((1920, 1080))
+            for template_path, state in ((config.STOP_BUTTON_IMAGE, CopilotUIState.RESPONDING),
+                                         (config.SEND_BUTTON_IMAGE, CopilotUIState.IDLE)):
+                recognizer.reset_frame_gate()
+                frame = cv2.cvtColor(_make_frame(template_path), cv2.COLOR_BGR2GRAY)
+                status = recognizer.detect_copilot_state(frame[roi[1]:roi[3], roi[0]:roi[2]],
+                                                         origin=roi[:2], screen_size=(1920, 1080))
+                assert status.state == state and status.classified == state.value
+                assert status.box("stop_button" if state == CopilotUIState.RESPONDING else "send_button")
+
+            # 錯誤訊息：沒有錯誤模板可判斷類別時視為 transient，由等待迴圈重試
+            recognizer.reset_frame_gate()
+            frame = cv2.cvtColor(_banner_frame(), cv2.COLOR_BGR2GRAY)
+            status = recognizer.detect_copilot_state(frame[roi[1]:roi[3], roi[0]:roi[2]],
+                                                     origin=roi[:2], screen_size=(1920, 1080))
+            assert status.classified == ERROR_BANNER
+            assert status.state == CopilotUIState.ERROR_BANNER and status.error == "transient"
+        finally:
+            config.UI_CLASSIFIER_ENABLED, config.UI_CLASSIFIER_MODEL = original_enabled, original_model
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試 UI 狀態分類器...")
+    try:
+        test_nearest_neighbour()
+        print("✅ 最近鄰分類正確")
+        test_train_save_and_detect()
+        print("✅ 由錄製畫面訓練並用於檢測")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+測試畫面等待模式（SMART_WAIT_MODE = "visual"）
+驗證只依 stop / send 按鈕與回應區域畫面判斷完成，等待期間不做剪貼簿複製探測，並記錄階段耗時
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition, CaptureBackend
+from src.copilot_handler import CopilotHandler
+from src.project_manager import ProjectManager, ProjectInfo
+from src.logger import get_logger
+from main import HybridUIAutomationScript
+from test_detection_replay import _make_frame
+
+class ScriptedBackend(CaptureBackend):
+    """依經過時間返回畫面：先回應中（stop 按鈕、回應區域持續變化），之後完成（send 按鈕）"""
+
+    name = "scripted"
+
+    def __init__(self, responding_seconds: float, show_stop: bool = True):
+        self.start = time.monotonic()
+        self.responding_seconds = responding_seconds
+        self.stop_frame = _make_frame(config.STOP_BUTTON_IMAGE if show_stop else config.SEND_BUTTON_IMAGE)
+        self.send_frame = _make_frame(config.SEND_BUTTON_IMAGE)
+        cv2.putText(self.send_frame, "final answer", (1300, 700), cv2.FONT_HERSHEY_SIMPLEX, 1.0,
+                    (220, 220, 220), 2)
+
+    def grab(self, region=None):
+        elapsed = time.monotonic() - self.start
+        if elapsed < self.responding_seconds:
+            frame = self.stop_frame.copy()
+            # 回應逐字輸出：文字區域隨時間變長
+            cv2.putText(frame, "x" * (1 + int(elapsed * 20) % 30), (1300, 500 + int(elapsed * 100) % 300),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (220, 220, 220), 2)
+        else:
+            frame = self.send_frame.copy()
+        if region is None:
+            return frame
+        left, top, width, height = region
+        return frame[top:top + height, left:left + width].copy()
+
+    def screen_size(self):
+        return self.send_frame.shape[1], self.send_frame.shape[0]
+
+def _run_visual_wait(backend: ScriptedBackend, timeout: float = 10) -> tuple:
+    """以畫面等待模式等待，返回 (結果, 耗時, 階段耗時)"""
+    overrides = {
+        'SMART_WAIT_MODE': "visual",
+        'STATE_MONITOR_ENABLED': False,
+        'SMART_WAIT_VISUAL_INTERVAL': 0.05,
+        'CHAT_PROGRESS_STABLE_SECONDS': 0.4,
+        'STATE_MONITOR_START_TIMEOUT': 1.0,
+    }
+    saved = {name: getattr(config, name) for name in overrides}
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = ImageRecognition(learned_roi_file=Path(tmp) / "rois.json")
+        recognizer.capture_backend = backend
+        handler = CopilotHandler()
+        handler.image_recognition = recognizer
+        try:
+            for name, value in overrides.items():
+                setattr(config, name, value)
+            backend.start = time.monotonic()
+            start = time.monotonic()
+            result = handler.wait_for_response(timeout=timeout, use_smart_wait=True)
+            return result, time.monotonic() - start, handler.get_stage_timings()
+        finally:
+            for name, value in saved.items():
+                setattr(config, name, value)
+
+def test_visual_wait_completes_without_clipboard():
+    """回應結束（send 按鈕出現且回應區域穩定）後完成，期間沒有剪貼簿探測"""
+    result, elapsed, timings = _run_visual_wait(ScriptedBackend(responding_seconds=1.0))
+    assert result
+    assert 1.0 + 0.4 <= elapsed < 4.0, elapsed
+    assert timings['wait_mode'] == "visual"
+    assert timings['clipboard_probes'] == 0
+
+def test_visual_wait_requires_start_or_timeout():
+    """沒有看到 stop 按鈕時，send 按鈕需持續到 STATE_MONITOR_START_TIMEOUT 之後才視為完成"""
+    result, elapsed, timings = _run_visual_wait(ScriptedBackend(responding_seconds=0.0, show_stop=False))
+    assert result
+    assert elapsed >= 1.0, elapsed
+    assert timings['clipboard_probes'] == 0
+
+def test_stage_timings_in_report():
+    """階段耗時寫入專案狀態與摘要報告"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ProjectManager(Path(tmp))
+        manager.projects = [ProjectInfo(name="demo", path=str(Path(tmp) / "demo"))]
+        timings = {'wait_mode': "clipboard", 'wait_response': 42.0,
+                   'clipboard_probes': 12, 'clipboard_probe_time': 30.5}
+        assert manager.record_stage_timings("demo", timings)
+        assert not manager.record_stage_timings("missing", timings)
+
+        report = manager.generate_summary_report()
+        assert report["階段耗時"]["demo"]["clipboard_probes"] == 12
+        assert report["剪貼簿探測總耗時"] == "30.50秒"
+
+class CloseHandler:
+    """記錄關閉前是否再次複製回應"""
+
+    def __init__(self, wait_mode):
+        self.stage_timings = {'wait_mode': wait_mode}
+        self.copies = 0
+
+    def get_stage_timings(self):
+        return dict(self.stage_timings)
+
+    def copy_response(self):
+        self.copies += 1
+        return ""
+
+def test_close_skips_copy_after_single_capture():
+    """依實際使用的等待方式決定關閉前是否再複製：只有剪貼簿探測的等待方式需要最後確認"""
+    closed = []
+    for wait_mode, copies in (("visual", 0), ("session", 0), ("atspi", 0), ("copilot_log", 0),
+                              ("monitor", 0), ("clipboard", 1)):
+        handler = CloseHandler(wait_mode)
+        script = SimpleNamespace(use_smart_wait=True, logger=get_logger("TestClose"), copilot_handler=handler,
+                                 vscode_controller=SimpleNamespace(
+                                     close_current_project=lambda force: closed.append(force) or True))
+        assert HybridUIAutomationScript._smart_close_project(script)
+        assert handler.copies == copies, wait_mode
+    assert closed == [False] * 6
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試畫面等待模式...")
+    try:
+        test_visual_wait_completes_without_clipboard()
+        print("✅ 回應完成後結束等待，期間不做剪貼簿探測")
+        test_visual_wait_requires_start_or_timeout()
+        print("✅ 未看到 stop 按鈕時等待開始超時後才完成")
+        test_stage_timings_in_report()
+        print("✅ 階段耗時寫入摘要報告")
+        test_close_skips_copy_after_single_capture()
+        print("✅ 回應只取得一次的等待方式關閉前不再複製")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+測試以 VS Code 視窗範圍截圖
+驗證依 PID 選擇視窗，以及設定視窗範圍後全畫面檢測只截取該範圍
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src import x11_windows
+from src.x11_windows import WindowInfo, find_window_for_pids
+from src.image_recognition import ImageRecognition, CaptureBackend, CopilotUIState
+from test_detection_replay import _make_frame
+
+class RecordingBackend(CaptureBackend):
+    """由固定畫面截圖並記錄每次截圖範圍的後端"""
+
+    name = "recording"
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.regions = []
+
+    def grab(self, region=None):
+        self.regions.append(region)
+        if region is None:
+            return self.frame.copy()
+        left, top, width, height = region
+        return self.frame[top:top + height, left:left + width].copy()
+
+    def screen_size(self):
+        return self.frame.shape[1], self.frame.shape[0]
+
+def test_find_window_for_pids():
+    """只選擇屬於指定進程的視窗，多個時取面積最大者"""
+    windows = [
+        WindowInfo(1, 100, "terminal", 0, 0, 800, 600),
+        WindowInfo(2, 200, "tooltip", 10, 10, 50, 20),
+        WindowInfo(3, 200, "project - Visual Studio Code", 1920, 0, 1920, 1080),
+    ]
+    original = x11_windows.list_client_windows
+    try:
+        x11_windows.list_client_windows = lambda display_name=None: windows
+        assert find_window_for_pids({200, 201}).window_id == 3
+        assert find_window_for_pids({300}) is None
+        assert find_window_for_pids(set()) is None
+    finally:
+        x11_windows.list_client_windows = original
+    assert windows[2].rect == (1920, 0, 3840, 1080)
+
+def test_capture_limited_to_window():
+    """第二個 VS Code 視窗位於大型虛擬螢幕右半部時，只截取該視窗並回報螢幕座標"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = ImageRecognition(learned_roi_file=Path(tmp) / "rois.json")
+        screen = np.full((1080, 3840, 3), 30, dtype=np.uint8)
+        screen[:, 1920:] = _make_frame(config.SEND_BUTTON_IMAGE)
+        backend = RecordingBackend(screen)
+        recognizer.capture_backend = backend
+        recognizer.set_capture_bounds((1920, 0, 3840, 1080))
+
+        status = recognizer.detect_copilot_state()
+        assert status.state == CopilotUIState.IDLE
+        assert backend.regions[0] == (1920, 0, 1920, 1080)
+        assert status.box("send_button").left == 1920 + 1920 - 400
+
+        # 之後只截取學習到的聊天區域（視窗內的子矩形）
+        recognizer.reset_frame_gate()
+        recognizer.detect_copilot_state()
+        left, top, width, height = backend.regions[-1]
+        assert left >= 1920 and width < 1920
+
+        # 清除範圍後恢復截取整個螢幕
+        recognizer.set_capture_bounds(None)
+        assert recognizer.capture_bounds is None
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試以 VS Code 視窗範圍截圖...")
+    try:
+        test_find_window_for_pids()
+        print("✅ 依 PID 選擇視窗正確")
+        test_capture_limited_to_window()
+        print("✅ 全畫面檢測只截取視窗範圍")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
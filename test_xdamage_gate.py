@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+測試 XDamage 重繪事件閘門
+以假的截圖後端模擬損壞矩形，驗證聊天區域沒有被重繪時不截圖、直接沿用上次結果
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.image_recognition import ImageRecognition, CaptureBackend, CopilotUIState
+from test_detection_replay import _make_frame
+
+class FakeDamage:
+    """模擬 DamageTracker：測試直接指定被重繪的矩形"""
+
+    def __init__(self):
+        self.rects = []
+
+    def consume(self, rect=None) -> bool:
+        rects, self.rects = self.rects, []
+        return any(rect is None or (r[0] < rect[2] and rect[0] < r[2] and r[1] < rect[3] and rect[1] < r[3])
+                   for r in rects)
+
+class FakeDamageBackend(CaptureBackend):
+    """由固定畫面截圖並計算截圖次數的後端"""
+
+    name = "fake-xdamage"
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.damage = FakeDamage()
+        self.grabs = 0
+
+    def grab(self, region=None):
+        self.grabs += 1
+        if region is None:
+            return self.frame.copy()
+        left, top, width, height = region
+        return self.frame[top:top + height, left:left + width].copy()
+
+    def screen_size(self):
+        return self.frame.shape[1], self.frame.shape[0]
+
+def test_undamaged_chat_roi_skips_capture():
+    """聊天區域沒有被重繪時不截圖；被重繪後重新檢測到新狀態"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = ImageRecognition(learned_roi_file=Path(tmp) / "rois.json")
+        backend = FakeDamageBackend(_make_frame(config.STOP_BUTTON_IMAGE))
+        recognizer.capture_backend = backend
+
+        # 第一次檢測：尚未學習到聊天區域，截取全螢幕並學習位置
+        assert recognizer.detect_copilot_state().state == CopilotUIState.RESPONDING
+        grabs = backend.grabs
+
+        # 沒有任何重繪
+        status = recognizer.detect_copilot_state()
+        assert status.from_cache and status.state == CopilotUIState.RESPONDING
+        assert backend.grabs == grabs
+
+        # 只有聊天區域以外被重繪
+        backend.damage.rects = [(0, 0, 200, 200)]
+        assert recognizer.detect_copilot_state().from_cache
+        assert backend.grabs == grabs
+
+        # 按鈕變為 send 並重繪聊天區域
+        backend.frame = _make_frame(config.SEND_BUTTON_IMAGE)
+        backend.damage.rects = [(0, 0, backend.frame.shape[1], backend.frame.shape[0])]
+        status = recognizer.detect_copilot_state()
+        assert not status.from_cache and status.state == CopilotUIState.IDLE
+        assert backend.grabs > grabs
+
+def test_expired_cache_recaptures():
+    """沿用結果超過 FRAME_GATE_MAX_AGE 時仍重新截圖"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = ImageRecognition(learned_roi_file=Path(tmp) / "rois.json")
+        backend = FakeDamageBackend(_make_frame(config.SEND_BUTTON_IMAGE))
+        recognizer.capture_backend = backend
+        recognizer.detect_copilot_state()
+        grabs = backend.grabs
+
+        recognizer._gate_matched_at -= config.FRAME_GATE_MAX_AGE + 1
+        recognizer.detect_copilot_state()
+        assert backend.grabs > grabs
+
+def main():
+    """主測試函數"""
+    print("🚀 開始測試 XDamage 重繪事件閘門...")
+    try:
+        test_undamaged_chat_roi_skips_capture()
+        print("✅ 聊天區域未重繪時不截圖")
+        test_expired_cache_recaptures()
+        print("✅ 快取過期時重新截圖")
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print("🎉 所有測試通過！")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
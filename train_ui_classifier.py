@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+UI 狀態分類器訓練工具
+從錄製的檢測畫面（config.DETECTION_RECORD_ENABLED，且 DETECTION_RECORD_ROI_ONLY）取出聊天區域畫面作為範例，
+寫入 config.UI_CLASSIFIER_MODEL；設定 UI_CLASSIFIER_ENABLED = True 後檢測時使用
+
+標註來源：資料夾內的 labels.json（檔名 -> 狀態），或加上 --use-recorded-decisions 以錄製當下的判斷作為標註
+可用的標註：idle、responding、error_banner、notification_overlay
+
+用法：
+    python train_ui_classifier.py ExecutionResult/DetectionFrames/*
+    python train_ui_classifier.py <資料夾> --use-recorded-decisions --dry-run
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+sys.path.append(str(Path(__file__).parent))
+
+from config.config import config
+from src.ui_state_classifier import LABELS, train_from_corpus
+
+def main():
+    """主函數"""
+    parser = argparse.ArgumentParser(description="以錄製畫面訓練 UI 狀態分類器")
+    parser.add_argument("sessions", nargs="+", type=Path, help="錄製資料夾（包含 index.jsonl）")
+    parser.add_argument("--use-recorded-decisions", action="store_true",
+                        help="沒有人工標註的畫面以錄製當下的判斷作為標註")
+    parser.add_argument("--output", type=Path, default=config.UI_CLASSIFIER_MODEL, help="模型檔案路徑")
+    parser.add_argument("--dry-run", action="store_true", help="只顯示評估結果，不寫入模型檔案")
+    args = parser.parse_args()
+
+    sessions = [session for session in args.sessions if (session / "index.jsonl").exists()]
+    for session in set(args.sessions) - set(sessions):
+        print(f"⚠️ 找不到錄製索引: {session}")
+
+    classifier = train_from_corpus(sessions, args.use_recorded_decisions)
+    if not len(classifier):
+        print("❌ 沒有已標註的聊天區域畫面可供訓練")
+        return 1
+
+    result = classifier.evaluate()
+    print("=" * 60)
+    print(f"UI 狀態分類器 (範例: {result['exemplars']}, 縮圖: {classifier.size[0]}x{classifier.size[1]})")
+    print("=" * 60)
+    for label, count in sorted(result.get('labels', {}).items()):
+        marker = "" if label in LABELS else " ⚠️ 未知標籤"
+        print(f"  {label}: {count}{marker}")
+    if result['accuracy'] is not None:
+        print(f"\n留一法準確度: {result['accuracy']:.2%}")
+        for error, count in result['errors'].items():
+            print(f"  誤判 {error}: {count}")
+
+    if args.dry_run:
+        print("\n(--dry-run，未寫入模型檔案)")
+        return 0
+
+    path = classifier.save(args.output)
+    print(f"\n📄 已寫入分類器: {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())